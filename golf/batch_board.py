@@ -0,0 +1,428 @@
+# Class to play many boards of golf in lockstep - the game state lives in numpy arrays
+import numpy as np
+from random import shuffle
+
+from hand import COLUMN_SCORES as HAND_COLUMN_SCORES, UNKNOWN_CARD as HAND_UNKNOWN_CARD
+from golf.players.batch_player_base import BatchPlayerAdapter
+
+
+# Phase 1 decisions are encoded as integers so a whole batch can be handed back as one array
+FACE_UP_CARD = 0
+FACE_DOWN_CARD = 1
+KNOCK = 2
+PHASE_1_MOVES = ('face_up_card', 'face_down_card', 'knock',)
+
+# Phase 2 decisions are the hand index to swap into (col * 2 + row) or RETURN_TO_DECK
+RETURN_TO_DECK = -1
+
+# Unknown cards are represented by -1 in the card arrays handed to players
+UNKNOWN_CARD = -1
+
+# Same forfeit limit used by Board.play_game
+MAX_TURNS = 1000
+
+
+# The Hand column score lookup table as an array, indexed by [top code, bottom code]
+COLUMN_SCORES = np.array(HAND_COLUMN_SCORES, dtype=np.int16)
+
+
+def score_cards(cards):
+    ''' Score a (n, num_cols * 2) array of cards, skipping cards marked as UNKNOWN_CARD '''
+
+    cards = np.where(np.asarray(cards) == UNKNOWN_CARD, HAND_UNKNOWN_CARD, cards)
+    return COLUMN_SCORES[cards[:, 0::2], cards[:, 1::2]].sum(axis=1)
+
+
+def card_counts(cards):
+    ''' Return a (n, 13) histogram of the known cards in each row of a card array '''
+
+    counts = np.zeros((cards.shape[0], 14), dtype=np.int16)
+    for col in range(cards.shape[1]):
+        counts[np.arange(cards.shape[0]), cards[:, col] + 1] += 1
+
+    return counts[:, 1:]
+
+
+def pile_counts(piles, lengths):
+    ''' Return a (n, 13) histogram of the first lengths[i] cards of each row of a card array '''
+
+    n, size = piles.shape
+    cards = np.where(np.arange(size) < np.asarray(lengths).reshape(-1, 1), piles.astype(np.int32) + 1, 0)
+    offsets = (np.arange(n) * 14).reshape(-1, 1)
+    return np.bincount((cards + offsets).ravel(), minlength=n * 14).reshape(n, 14)[:, 1:].astype(np.int16)
+
+
+def random_decks(num_decks, rng=np.random):
+    ''' Generate shuffled 52 card decks in bulk - modeling the cards as 0 -> 12 like Board does '''
+
+    return (np.argsort(rng.random_sample((num_decks, 52)), axis=1) % 13).astype(np.int8)
+
+
+class BatchState(object):
+    ''' Batched view of the game from one seat's perspective, for a subset of boards
+        Attributes:
+            boards: int array of board indices this state describes
+            seat: which seat (0 or 1) is making the decision
+            self_cards: (n, num_cols * 2) array of own cards, UNKNOWN_CARD for unseen cards
+            opp_cards: (n, num_cols * 2) array of the opponent's cards visible to us
+            self_score: (n,) score of the known own cards
+            opp_score: (n,) score of the known opponent cards
+            face_up: (n,) the face up card
+            known_counts: (n, 13) histogram of every card this seat has seen -
+                          own and opponent visible cards along with the discard pile
+            has_knocked: (n,) booleans
+            card: (n,) card in hand during phase 2, otherwise None
+            can_return: (n,) booleans - True if the card in hand may go back to the deck
+    '''
+
+    def __init__(self, board, boards, seat, card=None, can_return=None):
+        self.board = board
+        self.boards = boards
+        self.seat = seat
+        self.card = card
+        self.can_return = can_return
+
+        hands = board.hands[boards]
+        self.self_cards = np.where(board.self_revealed[boards, seat], hands[:, seat], UNKNOWN_CARD)
+        self.opp_cards = np.where(board.opp_revealed[boards, 1 - seat], hands[:, 1 - seat], UNKNOWN_CARD)
+        self.self_score = score_cards(self.self_cards)
+        self.opp_score = score_cards(self.opp_cards)
+        self.face_up = board.deck_up[boards, board.up_len[boards] - 1]
+        self.known_counts = board.up_counts[boards] + card_counts(self.self_cards) + card_counts(self.opp_cards)
+        self.has_knocked = board.has_knocked[boards]
+
+
+    def __len__(self):
+        return len(self.boards)
+
+
+    def get_state_for_player(self, i):
+        ''' Dict state - identical to Board.get_state_for_player - for the i-th board of the batch '''
+
+        return self.board.get_state_for_player(self.boards[i], self.seat)
+
+
+class BatchBoard(object):
+    ''' Play N independent games of golf in lockstep. Every call to step() advances each
+        unfinished board by one turn (phase 1 then phase 2), asking the players for their
+        decisions on all boards at once.  Rules mirror Board.play_game exactly.
+    '''
+
+    def __init__(self, players, num_boards, num_cols=2, decks=None, seed=None):
+        ''' Args:
+                players: pair of players - batch players are used directly, regular players
+                         are wrapped in a BatchPlayerAdapter
+                num_boards: number of games to play concurrently
+                num_cols: game board layout
+                decks: optional (num_boards, 52) array of deck orders, otherwise decks are shuffled
+                seed: optional seed for the deck and reshuffle random state
+        '''
+
+        self.players = [p if getattr(p, 'is_batch', False) else BatchPlayerAdapter(p) for p in players]
+        self.num_boards = num_boards
+        self.num_cols = num_cols
+        self.num_slots = num_cols * 2
+
+        if seed is None:
+            rng = np.random
+            self._shuffle = shuffle
+        else:
+            rng = np.random.RandomState(seed)
+            self._shuffle = np.random.RandomState(seed + 1).shuffle
+
+        if decks is None:
+            decks = random_decks(num_boards, rng)
+
+        # Optional per board reshuffle functions - otherwise every board shares self._shuffle
+        self.board_shuffles = None
+
+        self.deck_down = np.zeros((num_boards, 52), dtype=np.int8)
+        self.deck_up = np.zeros((num_boards, 52), dtype=np.int8)
+        self.up_len = np.zeros(num_boards, dtype=np.int32)
+        self.up_counts = np.zeros((num_boards, 13), dtype=np.int16)
+        self.hands = np.zeros((num_boards, 2, self.num_slots), dtype=np.int8)
+        self.down_pos = np.zeros(num_boards, dtype=np.int32)
+        self.down_len = np.zeros(num_boards, dtype=np.int32)
+        self.self_revealed = np.zeros((num_boards, 2, self.num_slots), dtype=bool)
+        self.opp_revealed = np.zeros((num_boards, 2, self.num_slots), dtype=bool)
+
+        self.turn = np.zeros(num_boards, dtype=np.int32)
+        self.has_knocked = np.zeros(num_boards, dtype=bool)
+        self.end_game = np.zeros(num_boards, dtype=bool)
+        self.done = np.zeros(num_boards, dtype=bool)
+        self.scores = np.zeros((num_boards, 2), dtype=np.int32)
+
+        # The card in hand between the two phases of a turn, and whether it came from the face down deck
+        self.card = np.full(num_boards, UNKNOWN_CARD, dtype=np.int8)
+        self.drew_face_down = np.zeros(num_boards, dtype=bool)
+
+        self.deal(np.arange(num_boards), decks)
+
+
+    def deal(self, boards, decks):
+        ''' Start new games on some boards
+            Args:
+                boards: int array of board indices
+                decks: (len(boards), 52) array of deck orders
+        '''
+
+        decks = np.array(decks, dtype=np.int8).reshape(len(boards), 52)
+        self.deck_down[boards] = decks
+        self.up_len[boards] = 0
+        self.up_counts[boards] = 0
+
+        # The first card of each deck is turned face up, then the hands are dealt alternately
+        # just as in Board._deal_hands
+        dealt = decks[:, 1:1 + self.num_slots * 2]
+        self.hands[boards] = np.stack([dealt[:, 0::2], dealt[:, 1::2]], axis=1)
+        self._push_up(boards, decks[:, 0])
+        self.down_pos[boards] = 1 + self.num_slots * 2
+        self.down_len[boards] = 52
+
+        # We start off with the bottom cards revealed to us
+        self.self_revealed[boards] = False
+        self.self_revealed[boards, :, 0::2] = True
+        self.opp_revealed[boards] = False
+
+        self.turn[boards] = 0
+        self.has_knocked[boards] = False
+        self.end_game[boards] = False
+        self.done[boards] = False
+        self.scores[boards] = 0
+        self.card[boards] = UNKNOWN_CARD
+        self.drew_face_down[boards] = False
+
+
+    def set_position(self, boards, hands, deck_down, down_len, deck_up, up_len, self_revealed, opp_revealed,
+                     has_knocked=False, card=None, drew_face_down=False):
+        ''' Start the boards from a position part way through a game rather than a deal - the player
+            to move sits in seat 0, and every argument is broadcast over the boards
+            Args:
+                boards: int array of board indices
+                hands: (n, 2, num_slots) cards in each seat's hand
+                deck_down: (n, 52) face down decks - down_len cards drawn from the front
+                deck_up: (n, 52) face up piles, the top card last - up_len cards
+                self_revealed: (n, 2, num_slots) cards each seat has seen in its own hand
+                opp_revealed: (n, 2, num_slots) cards of each seat's hand its opponent has seen
+                has_knocked: the opponent of the player to move has knocked - this turn is the last
+                card: for a position in phase 2 - the card already drawn into hand, the turn having started
+                drew_face_down: the card in hand came from the face down deck
+        '''
+
+        n = len(boards)
+        self.hands[boards] = hands
+        self.deck_down[boards] = deck_down
+        self.down_pos[boards] = 0
+        self.down_len[boards] = down_len
+        self.deck_up[boards] = deck_up
+        self.up_len[boards] = up_len
+        self.up_counts[boards] = pile_counts(self.deck_up[boards], self.up_len[boards])
+        self.self_revealed[boards] = self_revealed
+        self.opp_revealed[boards] = opp_revealed
+
+        self.has_knocked[boards] = has_knocked
+        self.done[boards] = False
+        self.scores[boards] = 0
+
+        if card is None:
+            self.turn[boards] = 0
+            self.end_game[boards] = False
+            self.card[boards] = UNKNOWN_CARD
+            self.drew_face_down[boards] = False
+        else:
+            # Phase 1 has been played - start_turn already saw any knock
+            self.turn[boards] = 1
+            self.end_game[boards] = has_knocked
+            self.card[boards] = np.broadcast_to(card, (n,))
+            self.drew_face_down[boards] = drew_face_down
+
+
+    def _push_up(self, boards, cards):
+        ''' Place cards on top of the face up piles of the given boards '''
+
+        self.deck_up[boards, self.up_len[boards]] = cards
+        self.up_len[boards] += 1
+        self.up_counts[boards, cards] += 1
+
+
+    def _pop_up(self, boards):
+        ''' Take the top face up card from the given boards '''
+
+        self.up_len[boards] -= 1
+        cards = self.deck_up[boards, self.up_len[boards]]
+        self.up_counts[boards, cards] -= 1
+        return cards
+
+
+    def _reshuffle(self, board):
+        ''' The face down deck ran out - shuffle all but the top face up card to make a new one '''
+
+        top = self.up_len[board] - 1
+        deck_down = self.deck_up[board, :top].tolist()
+        if self.board_shuffles is not None:
+            self.board_shuffles[board](deck_down)
+        else:
+            self._shuffle(deck_down)
+
+        self.deck_down[board, :top] = deck_down
+        self.down_pos[board] = 0
+        self.down_len[board] = top
+        self.deck_up[board, 0] = self.deck_up[board, top]
+        self.up_len[board] = 1
+        self.up_counts[board] = 0
+        self.up_counts[board, self.deck_up[board, 0]] = 1
+
+
+    def _decide(self, method, mask, seats, *args):
+        ''' Collect one decision per board in mask from the player sitting in each seat '''
+
+        decisions = np.zeros(self.num_boards, dtype=np.int32)
+        for seat, player in enumerate(self.players):
+            boards = np.flatnonzero(mask & (seats == seat))
+            if len(boards):
+                extra = [a[boards] for a in args]
+                state = BatchState(self, boards, seat, *extra)
+                decisions[boards] = getattr(player, method)(state)
+
+        return decisions
+
+
+    def step(self):
+        ''' Play a single turn on every unfinished board '''
+
+        active = ~self.done
+        if not active.any():
+            return
+
+        self.play_turn(active)
+
+
+    def play_turn(self, active, phase_1=None):
+        ''' Play a single turn on the active boards - asking the players for every decision
+            Args:
+                phase_1: optional phase 1 decisions to play instead of asking the players
+        '''
+
+        self.start_turn(active)
+        seats = self.turn % 2
+
+        decisions = self._decide('turn_phase_1', active, seats) if phase_1 is None else phase_1
+        draw = self.play_phase_1(active, decisions)
+
+        moves = self._decide('turn_phase_2', draw, seats, self.card, self.drew_face_down)
+        self.play_phase_2(draw, seats, moves)
+
+        self.end_turn(active)
+
+
+    def start_turn(self, active):
+        ''' A turn is starting on the active boards - if the other player already knocked it is the last '''
+
+        self.end_game |= active & self.has_knocked
+
+
+    def play_phase_1(self, active, decisions):
+        ''' Apply the phase 1 decisions of the active boards - knocks, or drawing a card into self.card
+            Returns:
+                boolean array of the boards that drew a card and so have a phase 2
+        '''
+
+        self.turn[active] += 1
+
+        knock = active & (decisions == KNOCK)
+        self.has_knocked |= knock
+
+        draw = active & ~knock
+        face_up = draw & (decisions == FACE_UP_CARD)
+        face_down = draw & (decisions != FACE_UP_CARD)
+        cards = np.full(self.num_boards, UNKNOWN_CARD, dtype=np.int8)
+
+        boards = np.flatnonzero(face_up)
+        cards[boards] = self._pop_up(boards)
+
+        boards = np.flatnonzero(face_down)
+        cards[boards] = self.deck_down[boards, self.down_pos[boards]]
+        self.down_pos[boards] += 1
+
+        self.card[draw] = cards[draw]
+        self.drew_face_down[draw] = face_down[draw]
+        return draw
+
+
+    def play_phase_2(self, draw, seats, moves):
+        ''' Apply the phase 2 moves of the boards that drew a card - swapping the card in hand
+            into the hand index of each move, or returning it to the deck
+        '''
+
+        cards = self.card
+        face_up = draw & ~self.drew_face_down
+
+        # Swap the card in hand into the chosen position, the replaced card gets discarded
+        discards = cards.copy()
+        boards = np.flatnonzero(draw & (moves != RETURN_TO_DECK))
+        seat = seats[boards]
+        position = moves[boards]
+        discards[boards] = self.hands[boards, seat, position]
+        self.hands[boards, seat, position] = cards[boards]
+        self.self_revealed[boards, seat, position] = True
+        self.opp_revealed[boards, seat, position] = face_up[boards]
+
+        boards = np.flatnonzero(draw)
+        self._push_up(boards, discards[boards])
+
+        # Here we need to handle the possibility that the deck goes around an Nth time
+        for board in np.flatnonzero(draw & (self.down_pos >= self.down_len)):
+            self._reshuffle(board)
+
+        self.card[draw] = UNKNOWN_CARD
+
+
+    def end_turn(self, active):
+        ''' The turn is over on the active boards - score the boards whose game has finished '''
+
+        finished = active & (self.end_game | (self.turn >= MAX_TURNS))
+        if finished.any():
+            self.done |= finished
+
+            # Boards that hit the turn limit are a forfeit and score [0, 0]
+            scored = finished & (self.turn < MAX_TURNS)
+            boards = np.flatnonzero(scored)
+            for seat in range(2):
+                self.scores[boards, seat] = score_cards(self.hands[boards, seat])
+
+
+    def play(self):
+        ''' Play every board to completion
+            Returns:
+                (num_boards, 2) array of scores in seat order - matching Board.play_game
+        '''
+
+        while not self.done.all():
+            self.step()
+
+        return self.scores
+
+
+    def _hand_state(self, board, seat, is_self):
+        ''' Dict state for a single hand - identical to Hand.get_state '''
+
+        revealed = self.self_revealed[board, seat] if is_self else self.opp_revealed[board, seat]
+        raw_cards = [int(c) if r else None for c, r in zip(self.hands[board, seat], revealed)]
+        score = score_cards(np.array([[UNKNOWN_CARD if c is None else c for c in raw_cards]]))[0]
+
+        return {'score': int(score),
+                'visible': [bool(a) for a in self.self_revealed[board, seat]],
+                'raw_cards': raw_cards,
+                'num_rows': 2,
+                'num_cols': self.num_cols}
+
+
+    def get_state_for_player(self, board, seat):
+        ''' Get game state for a single board from a player's perspective - same form as Board '''
+
+        state = BatchState(self, np.array([board]), seat)
+        return {'self': self._hand_state(board, seat, True),
+                'opp': [self._hand_state(board, 1 - seat, False)],
+                'deck_up': self.deck_up[board, :self.up_len[board]].tolist(),
+                'has_knocked': bool(self.has_knocked[board]),
+                'known_cards': state.known_counts[0].tolist()}
@@ -1,16 +1,104 @@
 ''' Run a benchmark comparison between players '''
+import math
 from match import Match
 
-def benchmark_player(player1, player2, num_matches=10):
+
+class BenchmarkResult(tuple):
+    ''' Matches won by each player - a tuple, which also says why the benchmark stopped and how
+        confident the result is
+    '''
+
+    def __new__(cls, results, stop_reason, num_matches):
+        ''' Args:
+                results: matches won by each player
+                stop_reason: 'num_matches' for a fixed benchmark, 'player1' or 'player2' when a
+                             sequential benchmark found that player better, or 'max_matches'
+                num_matches: number of matches played
+        '''
+
+        result = super(BenchmarkResult, cls).__new__(cls, results)
+        result.stop_reason = stop_reason
+        result.num_matches = num_matches
+        result.confidence = win_confidence(*results[:2])
+        return result
+
+
+    def __getnewargs__(self):
+        return (tuple(self), self.stop_reason, self.num_matches,)
+
+
+def win_confidence(wins_1, wins_2):
+    ''' Confidence that the two players do not win equally often - one minus the two sided
+        exact binomial p-value of the decisive (not drawn) matches
+    '''
+
+    decisive = wins_1 + wins_2
+    if not decisive:
+        return 0.0
+
+    extreme = min(wins_1, wins_2)
+    tail = sum([math.exp(math.lgamma(decisive + 1) - math.lgamma(a + 1) - math.lgamma(decisive - a + 1) - decisive * math.log(2))
+                for a in range(extreme + 1)])
+
+    return max(0.0, 1.0 - min(1.0, 2 * tail))
+
+
+def sprt_decision(wins_1, wins_2, confidence=0.95, margin=0.1):
+    ''' Wald's sequential probability ratio test on the decisive matches so far - player 1 winning
+        with probability 0.5 + margin against 0.5 - margin, with both error rates 1 - confidence
+        Returns:
+            'player1' or 'player2' once that player is found better, otherwise None
+    '''
+
+    error = 1.0 - confidence
+    log_ratio = (wins_1 - wins_2) * math.log((0.5 + margin) / (0.5 - margin))
+
+    if log_ratio >= math.log((1 - error) / error):
+        return 'player1'
+    if log_ratio <= math.log(error / (1 - error)):
+        return 'player2'
+
+    return None
+
+
+def benchmark_player(player1, player2, num_matches=10, processes=None, seed=None, sequential=False, max_matches=100,
+                     confidence=0.95, margin=0.1):
     ''' Run a benchmark match via the match functionality
         Args:
             player1: A golf player
             player2: A golf player
+            num_matches: number of matches to play - or with sequential, the number played between tests
+            processes: optional number of processes to spread the matches across
+            seed: optional base seed to make the results reproducible
+            sequential: Boolean - keep playing num_matches at a time until a sequential probability
+                        ratio test finds one player better, or max_matches have been played
+            max_matches: cap on the matches played by a sequential benchmark
+            confidence: sequential test - one minus the chance of calling the wrong player better
+            margin: sequential test - the smallest difference from a 50% win rate worth detecting
         Returns:
-            list with results in the order of players given
+            BenchmarkResult with results in the order of players given
     '''
 
     m = Match(player1, player2)
 
-    results = m.play_k_matches(num_matches)
-    return results
\ No newline at end of file
+    kwargs = {}
+    if processes:
+        kwargs['processes'] = processes
+    if seed is not None:
+        kwargs['seed'] = seed
+
+    if not sequential:
+        results = m.play_k_matches(num_matches, **kwargs)
+        return BenchmarkResult(results, 'num_matches', num_matches)
+
+    played = 0
+    while True:
+        batch = max(min(num_matches, max_matches - played), 1)
+        results = m.play_k_matches(batch, first_match=played, **kwargs)
+        played += batch
+
+        winner = sprt_decision(results[0], results[1], confidence=confidence, margin=margin)
+        if winner:
+            return BenchmarkResult(results, winner, played)
+        if played >= max_matches:
+            return BenchmarkResult(results, 'max_matches', played)
@@ -1,70 +1,294 @@
 # Class to represent the playing board for golf
-from random import shuffle
+import numpy as np
+from deck import Deck
 from hand import Hand
+from game_state import GameState
+from profiling import clock
+
+
+# Games still going after this many turns are called a forfeit
+MAX_TURNS = 1000
+
+# A snapshot of a position is a single int16 array:
+#     [num_cols, turn, has knocked, face down cards left, face up cards,
+#      owner mask and opponent mask of hand 0, the same of hand 1,
+#      cards of hand 0, cards of hand 1,
+#      face down cards - top first, face up cards - top last]
+# where the masks are Hand.masks() bitmasks of the cards each player has seen
+SNAPSHOT_HEADER = 9
+
+
+def hidden_places(snapshot, seat):
+    ''' Indexes into a snapshot of the cards the player in seat has not seen - their own unseen
+        cards, the opponent's cards they have not seen, then the face down deck
+    '''
+
+    num_cols, down_len = int(snapshot[0]), int(snapshot[3])
+    slots = num_cols * 2
+    own_mask = int(snapshot[5 + seat * 2])
+    opp_mask = int(snapshot[5 + (1 - seat) * 2 + 1])
+
+    own = SNAPSHOT_HEADER + seat * slots
+    opp = SNAPSHOT_HEADER + (1 - seat) * slots
+    deck = SNAPSHOT_HEADER + 2 * slots
+
+    return np.array([own + i for i in range(slots) if not own_mask >> i & 1] +
+                    [opp + i for i in range(slots) if not opp_mask >> i & 1] +
+                    range(deck, deck + down_len), dtype=np.intp)
+
+
+def substitute_hidden(snapshot, seat, cards):
+    ''' A copy of a snapshot with the cards hidden from the player in seat replaced
+        Args:
+            cards: new cards for the hidden_places, in order - the same cards in any order, so
+                   the position stays consistent with everything the player has seen
+    '''
+
+    places = hidden_places(snapshot, seat)
+    cards = np.asarray(cards, dtype=np.int16)
+    if len(cards) != len(places) or sorted(cards.tolist()) != sorted(snapshot[places].tolist()):
+        raise ValueError('Substituted cards must be the hidden cards in some order')
+
+    snapshot = snapshot.copy()
+    snapshot[places] = cards
+    return snapshot
+
+
+def shuffle_hidden(snapshot, seat, rng=np.random):
+    ''' A copy of a snapshot with the cards hidden from the player in seat shuffled - a determinization '''
+
+    places = hidden_places(snapshot, seat)
+    snapshot = snapshot.copy()
+    snapshot[places] = snapshot[places[rng.permutation(len(places))]]
+    return snapshot
 
-from hand import Hand
 
 class Board(object):
     # Assemble a board - model game play for a single round
 
-    def __init__(self, players, num_cols, verbose=False):
+    def __init__(self, players, num_cols, verbose=False, timer=None, recorder=None, deck=None, detect_cycles=None,
+                 player_ids=None):
         ''' Args:
                 players: set of players
                 num_cols: game board layout
+                timer: optional profiling.PhaseTimer to record time spent in each phase of the game
+                recorder: optional game_record.GameRecorder to record the deck, decisions and scores
+                deck: optional order of the 52 cards to deal from (e.g. a row of batch_board.random_decks) -
+                      otherwise the deck is shuffled
+                detect_cycles: end a game as a forfeit once a position repeats - by default only
+                               when every player is deterministic, as otherwise it may not loop
+                player_ids: optional index of each seat's player in the match - the timer keys
+                            players by it, as the seats swap from hole to hole
         '''
 
-        self.players = players
         self.num_cols = num_cols
+        self.detect_cycles = detect_cycles
+        self.verbose = verbose
+        self.timer = timer
+        self.recorder = recorder
+        self.deck = Deck()
+        self.reset(players, deck, player_ids)
+
+
+    def reset(self, players=None, deck=None, player_ids=None):
+        ''' Set the board up for a new game - so one board can play every hole of a match
+            Args:
+                players: optional new set of players (e.g. with the seats swapped)
+                deck: optional order of the 52 cards to deal from - otherwise the deck is shuffled
+                player_ids: optional match index of each new player - by default their seats
+        '''
+
+        if players is not None:
+            self.players = players
+            self.player_ids = player_ids or range(len(players))
 
-        # A little cheat here - we're modeling a deck as 0 -> 12
-        # In this scenario, a King = 0, Ace = 1, and
-        self.deck_down = (range(13) * 4)
-        shuffle(self.deck_down)
-        self.deck_up = []
+        self.deck.reset(deck)
         self.hands = []
-        self.verbose = verbose
+
+        # The face up cards, knock flag and hand states live in the game state - which is
+        # updated in place as the game is played and handed to players as read-only views
+        self.state = GameState(self.hands)
         self.has_knocked = False
 
+        # Turn at which the last game was found to be looping - None when it was not
+        self.cycle_turn = None
+
+        # Number of turns played so far in the game - kept up to date for snapshots
+        self.turn = 0
+
+
+    @property
+    def deck_down(self):
+        ''' The face down cards left to draw, top first - a copy '''
+        return self.deck.remaining()
+
+
+    @deck_down.setter
+    def deck_down(self, cards):
+        self.deck.load(cards)
+
+
+    @property
+    def deck_up(self):
+        return self.state.deck_up
+
 
     @property
     def deck_visible(self):
         return self.deck_up
 
 
+    @property
+    def has_knocked(self):
+        return self.state.has_knocked
+
+
+    @has_knocked.setter
+    def has_knocked(self, value):
+        self.state.has_knocked = value
+
+
+    def snapshot(self):
+        ''' The position at the start of a turn - whose turn, the knock flag, both hands and what each
+            player has seen of them, and the order of both piles - packed into an int16 array (see
+            SNAPSHOT_HEADER).  Taken between turns, or while a player decides phase 1.
+        '''
+
+        deck = self.deck
+        down = deck.cards[deck.cursor:deck.size]
+        up = self.state.deck_up
+        header = [self.num_cols, self.turn, self.has_knocked, len(down), len(up)]
+        for hand in self.hands:
+            header.extend(hand.masks())
+
+        return np.array(header + self.hands[0].cards + self.hands[1].cards + down + up, dtype=np.int16)
+
+
+    def restore(self, snapshot):
+        ''' Set the board to a snapshot position - play_game(resume=True) then carries on from it '''
+
+        values = snapshot.tolist()
+        num_cols, turn, has_knocked, down_len, up_len = values[:5]
+        slots = num_cols * 2
+        start = SNAPSHOT_HEADER + 2 * slots
+
+        self.num_cols = num_cols
+        self.hands[:] = [Hand.restore(values[SNAPSHOT_HEADER + i * slots:SNAPSHOT_HEADER + (i + 1) * slots],
+                                      values[5 + i * 2], values[6 + i * 2]) for i in range(2)]
+        self.deck.load(values[start:start + down_len])
+        self.state.reset_up(values[start + down_len:start + down_len + up_len])
+        self.state.hand_changed()
+        self.has_knocked = bool(has_knocked)
+        self.turn = turn
+        self.cycle_turn = None
+
+
+    def fork(self, players=None, seat=None, hidden=None):
+        ''' An independent board at the same position - play_game(resume=True) plays it out
+            without touching this board
+            Args:
+                players: optional players for the fork, in the same seats - otherwise these players, with
+                         trainable players replaced by frozen copies (see TrainablePlayer.frozen_copy), so
+                         playing the fork out never updates their weights
+                seat / hidden: optional cards to substitute for those hidden from the player in seat
+                               (see substitute_hidden)
+        '''
+
+        snapshot = self.snapshot()
+        if hidden is not None:
+            snapshot = substitute_hidden(snapshot, seat, hidden)
+
+        if players is None:
+            players = [player.frozen_copy() if getattr(player, 'is_trainable', False) else player for player in self.players]
+
+        board = Board(players, self.num_cols, verbose=self.verbose, deck=self.deck.cards[:self.deck.size],
+                      detect_cycles=self.detect_cycles, player_ids=self.player_ids)
+        board.restore(snapshot)
+        return board
+
+
     def _deal_hands(self):
         # Deal the hands to the players - respecting the player - dealing rotation
 
         if self.verbose:
             print '\n ************ Starting hole ************ \n'
 
-        dealt = self.deck_down[:self.num_cols*4]
-        self.deck_down = self.deck_down[self.num_cols * 4:]
+        dealt = self.deck.deal(self.num_cols * 4)
         if self.verbose:
             print 'Player 0 hand: {}'.format([dealt[i] for i in range(len(dealt)) if i % 2 == 0])
             print 'Player 1 hand: {}'.format([dealt[i] for i in range(len(dealt)) if i % 2 != 0])
 
         self.hands.append(Hand([dealt[i] for i in range(len(dealt)) if i % 2 == 0]))
         self.hands.append(Hand([dealt[i] for i in range(len(dealt)) if i % 2 != 0]))
+        self.state.hand_changed()
+
+
+    def play_game(self, resume=False):
+        ''' Initially the top face down card becomes the face up card, then thing proceed
+            Args:
+                resume: Boolean - carry on from the current position (see restore) rather than dealing
+        '''
+
+        # Timing is opt-in - when there is no timer the only cost is the checks below
+        timer = self.timer
+        recorder = self.recorder
+
+        if resume:
+            if recorder:
+                raise ValueError('A resumed game can not be recorded - its deal is not known')
 
+            turn = self.turn
+        else:
+            if timer:
+                start = clock()
 
-    def play_game(self):
-        ''' Initially the top face down card becomes the face up card, then thing proceed '''
+            if recorder:
+                recorder.start_game(self.num_cols, self.deck_down)
+
+            self.state.push_up(self.deck.draw())
+            self._deal_hands()
+
+            if timer:
+                timer.add('deal', None, clock() - start)
+
+            self.has_knocked = False
+            turn = 0
 
-        deck_up = self.deck_down.pop(0)
-        self.deck_up.append(deck_up)
-        self._deal_hands()
         end_game = False
-        self.has_knocked = False
-        turn = 0
+        self.cycle_turn = None
+
+        detect_cycles = self.detect_cycles
+        if detect_cycles is None:
+            detect_cycles = all([getattr(player, 'is_deterministic', False) for player in self.players])
+
+        # Positions seen since the last card was drawn from the face down deck - drawing moves
+        # the deck on, so no earlier position can come round again.  Until the next draw only
+        # the top of the discard pile can change, so it stands in for the whole pile.
+        seen = set()
+        seen_cursor = None
 
         # Need to set a maximum number of iterations - after which we'll call the game a forfeit.
-        while not end_game and turn < 1000:
+        while not end_game and turn < MAX_TURNS:
             # Check to see if the other player already knocked
             if self.has_knocked:
                 # this makes sure that this is the last turn
                 end_game = True
 
             cur_turn = turn % 2
+            self.turn = turn
+
+            if detect_cycles and not end_game:
+                if self.deck.cursor != seen_cursor:
+                    seen.clear()
+                    seen_cursor = self.deck.cursor
+
+                position = (cur_turn, self.deck_up[-1],) + tuple([hand.position_key() for hand in self.hands])
+                if position in seen:
+                    # Deterministic players will go round this loop until the turn limit
+                    self.cycle_turn = turn
+                    break
+
+                seen.add(position)
 
             if self.verbose:
                 print '\n{} {} turn phase 1'.format(self.players[cur_turn], cur_turn)
@@ -78,8 +302,14 @@ class Board(object):
                 print 'Face Up Card: {}'.format(state['deck_up'][-1])
                 print 'Deck down: {}'.format(self.deck_down)
 
+            if timer:
+                start = clock()
+
             decision = self.players[cur_turn].turn_phase_1(self.get_state_for_player(cur_turn), options)
 
+            if timer:
+                timer.add('phase_1', self.players[cur_turn], clock() - start, self.player_ids[cur_turn])
+
             if self.verbose:
                 print 'Decision phase 1: {} \n'.format(decision)
 
@@ -90,16 +320,25 @@ class Board(object):
                 # then the player has no turn phase 2
                 self.has_knocked = True
                 if hasattr(self.players[cur_turn], 'is_trainable') and self.players[cur_turn].is_trainable:
+                    if timer:
+                        start = clock()
+
                     self.players[cur_turn].update_weights(self.get_state_for_player(cur_turn), card=None, reward=0, possible_moves=['knock'])
 
+                    if timer:
+                        timer.add('update_weights', self.players[cur_turn], clock() - start, self.player_ids[cur_turn])
+
+                if recorder:
+                    recorder.record_turn(decision)
+
                 continue
 
             if decision == 'face_up_card':
-                card = self.deck_up.pop()
+                card = self.state.pop_up()
                 #print 'face up {}'.format(card)
                 possible_moves = ('swap',)
             else:
-                card = self.deck_down.pop(0)
+                card = self.deck.draw()
                 #print 'face down {}'.format(card)
 
                 possible_moves = ('swap', 'return_to_deck',)
@@ -115,24 +354,46 @@ class Board(object):
 
             # This is where we need to update the weights if the player with the current turn is "trainable"
             if hasattr(self.players[cur_turn], 'is_trainable') and self.players[cur_turn].is_trainable:
+                if timer:
+                    start = clock()
+
                 self.players[cur_turn].update_weights(new_state, card, reward=0, possible_moves=possible_moves)
 
+                if timer:
+                    timer.add('update_weights', self.players[cur_turn], clock() - start, self.player_ids[cur_turn])
+
+            if timer:
+                start = clock()
+
             decision_two = self.players[cur_turn].turn_phase_2(card,
                                                                new_state,
                                                                possible_moves)
 
+            if timer:
+                timer.add('phase_2', self.players[cur_turn], clock() - start, self.player_ids[cur_turn])
+
             if self.verbose:
                 print 'Decision phase 2: {}'.format(decision_two)
 
+            if recorder:
+                recorder.record_turn(decision, decision_two)
+
             if decision_two[0] == 'swap':
                 card_ret = self.hands[cur_turn % 2].swap(decision_two[1],
                                                          decision_two[2],
                                                          card,
                                                          decision == 'face_up_card')
+                if timer:
+                    start = clock()
+
+                self.state.hand_changed(cur_turn % 2)
+
+                if timer:
+                    timer.add('state', None, clock() - start)
             else:
                 card_ret = card
 
-            self.deck_up.append(card_ret)
+            self.state.push_up(card_ret)
 
             if self.verbose:
                 state = self.get_state_for_player(cur_turn)
@@ -141,20 +402,36 @@ class Board(object):
 
 
             # Here we need to handle the possibility that the deck goes around an Nth time
-            if len(self.deck_down) <= 0:
-                cur_up = self.deck_up.pop()
-                self.deck_down = list(self.deck_up)
-                shuffle(self.deck_down)
-                self.deck_up = [cur_up]
+            if not len(self.deck):
+                if timer:
+                    start = clock()
+
+                cur_up = self.state.pop_up()
+                self.deck.refill(self.deck_up)
+                self.state.reset_up([cur_up])
+
+                if recorder:
+                    recorder.record_reshuffle(self.deck_down)
+
+                if timer:
+                    timer.add('reshuffle', None, clock() - start)
 
             # Here we're just going to update the current players score - a final update will happen at the end of the
             # game as a sort of 'exit' move
             if hasattr(self.players[cur_turn], 'is_trainable') and self.players[cur_turn].is_trainable:
+                if timer:
+                    start = clock()
+
                 self.players[cur_turn].update_weights(self.get_state_for_player(cur_turn), card=None, reward=0, possible_moves=['knock'])
 
+                if timer:
+                    timer.add('update_weights', self.players[cur_turn], clock() - start, self.player_ids[cur_turn])
 
-        if turn >= 1000:
+
+        if turn >= MAX_TURNS or self.cycle_turn is not None:
             # in this case we're quitting because the players are in some loop state
+            if recorder:
+                recorder.end_game([0,0])
             return [0,0]
 
         # Since the game is over, we will need to make a final weight update to any trainable players with their proper reward
@@ -165,7 +442,14 @@ class Board(object):
 
                 reward = self.hands[i % 2].score() - float(self.hands[(i+1) % 2].score())
                 new_state = self.get_state_for_player(i%2)
-                player.update_weights(new_state, card=None, reward=reward, possible_moves=['knock'])
+
+                if timer:
+                    start = clock()
+
+                player.update_weights(new_state, card=None, reward=reward, possible_moves=['knock'], terminal=True)
+
+                if timer:
+                    timer.add('update_weights', player, clock() - start, self.player_ids[i])
 
 
         if self.verbose:
@@ -173,14 +457,15 @@ class Board(object):
                 print '{}: {} Hand {} Score {}'.format(self.players[i], i, hand.cards, hand.score())
 
 
-        return [hand.score() for hand in self.hands]
+        scores = [hand.score() for hand in self.hands]
+        if recorder:
+            recorder.end_game(scores)
 
-    def get_state_for_player(self, player_id):
-        ''' Get game state from a player's perspective '''
+        return scores
 
+    def get_state_for_player(self, player_id):
+        ''' Get game state from a player's perspective - a read-only dict with the keys
+            'self', 'opp', 'deck_up' and 'has_knocked' that stays current as the game goes on
+        '''
 
-        # State would need to describe both players situations
-        return {'self': self.hands[player_id].get_state(is_self=True),
-                'opp': [self.hands[p].get_state(is_self=False) for p in range(len(self.hands)) if p != player_id],
-                'deck_up': self.deck_up,
-                'has_knocked': self.has_knocked}
+        return self.state.view(player_id)
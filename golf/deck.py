@@ -0,0 +1,102 @@
+# The face down deck - a cursor over a preallocated list of cards
+from random import random
+
+
+# A little cheat here - we're modeling a deck as 0 -> 12
+# In this scenario, a King = 0, Ace = 1, and
+FULL_DECK = range(13) * 4
+
+
+def shuffle_region(cards, count):
+    ''' Shuffle the first count cards of a list in place - the same Fisher-Yates shuffle (and
+        use of the random number generator) as random.shuffle on a list of those cards
+    '''
+
+    for i in reversed(xrange(1, count)):
+        j = int(random() * (i + 1))
+        cards[i], cards[j] = cards[j], cards[i]
+
+
+class Deck(object):
+    ''' Cards are drawn by moving a cursor along a list that is allocated once - drawing never
+        moves the remaining cards, and a reshuffle writes the discard pile over the drawn cards
+    '''
+
+    __slots__ = ('cards', 'cursor', 'size', 'shuffle')
+
+    def __init__(self, cards=None):
+        ''' Args:
+                cards: optional order of cards to draw from - otherwise a full deck, unshuffled
+        '''
+
+        self.cards = list(FULL_DECK)
+        self.cursor = 0
+        self.size = len(self.cards)
+
+        # Shuffles the first count cards in place - replays substitute the recorded order
+        self.shuffle = shuffle_region
+
+        if cards is not None:
+            self.load(cards)
+
+
+    def __len__(self):
+        return self.size - self.cursor
+
+
+    def __iter__(self):
+        return iter(self.remaining())
+
+
+    def remaining(self):
+        ''' The cards left to draw, in order - a copy '''
+
+        return self.cards[self.cursor:self.size]
+
+
+    def draw(self):
+        ''' Take the top card '''
+
+        card = self.cards[self.cursor]
+        self.cursor += 1
+        return card
+
+
+    def deal(self, count):
+        ''' Take the top count cards '''
+
+        cursor = self.cursor
+        self.cursor = cursor + count
+        return self.cards[cursor:cursor + count]
+
+
+    def load(self, cards):
+        ''' Draw from the given order of cards from now on '''
+
+        cards = [int(a) for a in cards]
+        self.cards[:len(cards)] = cards
+        self.size = len(cards)
+        self.cursor = 0
+
+
+    def reset(self, cards=None):
+        ''' Start a new game - from the given order of cards, or a freshly shuffled full deck '''
+
+        if cards is not None:
+            self.load(cards)
+            return
+
+        self.cards[:] = FULL_DECK
+        self.size = len(FULL_DECK)
+        self.cursor = 0
+        self.shuffle(self.cards, self.size)
+
+
+    def refill(self, discard):
+        ''' The deck has run out - shuffle the discard pile into a new deck, written over the drawn cards '''
+
+        count = len(discard)
+        self.cards[:count] = discard
+        self.size = count
+        self.cursor = 0
+        self.shuffle(self.cards, count)
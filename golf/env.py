@@ -0,0 +1,266 @@
+''' Reset / step environments for learning to play golf against a fixed opponent
+
+    The game is played on a BatchBoard - the rules are those of Board - but the decisions of
+    the agent's seat come from step() rather than from a player.  Each step is one decision:
+        phase 1 - FACE_UP_CARD, FACE_DOWN_CARD or KNOCK
+        phase 2 - the hand index (col * 2 + row) to swap the card in hand into, or the
+                  return action (num_slots) when the card came from the face down deck
+    The opponent's turns are played in between, so every observation is a decision for the agent.
+
+    Observations are int16 arrays from the agent's seat:
+        [phase (0 or 1), card in hand, face up card, has knocked,
+         own cards..., opponent's cards..., known card counts (13)]
+    with UNKNOWN_CARD for cards the agent has not seen, and for the card in hand during phase 1.
+    Rewards are 0 until the game ends - then the opponent's score minus the agent's, which is 0
+    for a forfeit.
+'''
+import numpy as np
+from batch_board import BatchBoard, BatchState, random_decks, FACE_UP_CARD, FACE_DOWN_CARD, KNOCK, RETURN_TO_DECK, UNKNOWN_CARD
+from golf.players.batch_player_base import BatchPlayer
+
+
+# Columns of the observation before the hands
+PHASE = 0
+CARD_IN_HAND = 1
+FACE_UP = 2
+HAS_KNOCKED = 3
+NUM_HEADER = 4
+
+
+def observation_size(num_cols=2):
+    ''' Length of an observation for a board of num_cols columns '''
+
+    return NUM_HEADER + (num_cols * 4) + 13
+
+
+class _AgentSeat(BatchPlayer):
+    ''' Placeholder for the agent at the BatchBoard - its decisions are passed to step() '''
+
+    def __repr__(self):
+        return 'Environment Agent'
+
+
+    def turn_phase_1(self, batch_state):
+        raise RuntimeError('Agent decisions are made through step()')
+
+
+    def turn_phase_2(self, batch_state):
+        raise RuntimeError('Agent decisions are made through step()')
+
+
+class VecGolfEnv(object):
+    ''' num_envs independent games stepped together - a finished game is reset straight away,
+        with the final observation and scores passed back in its info dict
+    '''
+
+    def __init__(self, num_envs, opponent, num_cols=2, seeds=None, agent_seat=0):
+        ''' Args:
+                num_envs: number of games
+                opponent: player for the other seat - a batch player, or a regular player
+                          (which makes its decisions one board at a time)
+                num_cols: game board layout
+                seeds: optional seed per game for its decks and reshuffles - a game plays out
+                       the same for the same actions whatever the other games do.  Otherwise
+                       decks come from numpy's and reshuffles from python's global random state.
+                agent_seat: seat of the agent - 0 takes the first turn
+        '''
+
+        self.num_envs = num_envs
+        self.num_cols = num_cols
+        self.num_slots = num_cols * 2
+        self.num_actions = max(3, self.num_slots + 1)
+        self.return_action = self.num_slots
+        self.agent_seat = agent_seat
+
+        self.rngs = None
+        if seeds is not None:
+            if len(seeds) != num_envs:
+                raise ValueError('Expected {} seeds, got {}'.format(num_envs, len(seeds)))
+            self.rngs = [np.random.RandomState(a) for a in seeds]
+
+        players = [None, None]
+        players[agent_seat] = _AgentSeat()
+        players[1 - agent_seat] = opponent
+
+        envs = np.arange(num_envs)
+        self.board = BatchBoard(players, num_envs, num_cols, decks=self._new_decks(envs))
+        if self.rngs is not None:
+            self.board.board_shuffles = [a.shuffle for a in self.rngs]
+
+        # 1 or 2 - the phase of the agent's turn each game is waiting on
+        self.phase = np.ones(num_envs, dtype=np.int8)
+
+        # Games finished since the environments were created
+        self.games = 0
+
+
+    def _new_decks(self, envs):
+        if self.rngs is None:
+            return random_decks(len(envs))
+
+        return np.concatenate([random_decks(1, self.rngs[i]) for i in envs])
+
+
+    def _advance(self, mask):
+        ''' Play the opponent's turns on the masked games until it is the agent's turn or the game is over '''
+
+        board = self.board
+        pending = mask & ~board.done
+        while pending.any():
+            agent_turn = pending & (board.turn % 2 == self.agent_seat)
+            board.start_turn(agent_turn)
+            self.phase[agent_turn] = 1
+
+            opponent_turn = pending & ~agent_turn
+            if opponent_turn.any():
+                board.play_turn(opponent_turn)
+
+            pending = opponent_turn & ~board.done
+
+
+    def _deal(self, envs, decks=None):
+        ''' Start new games - then play up to the agent's first decision '''
+
+        if decks is None:
+            decks = self._new_decks(envs)
+
+        self.board.deal(envs, decks)
+        mask = np.zeros(self.num_envs, dtype=bool)
+        mask[envs] = True
+        self._advance(mask)
+
+
+    def reset(self, decks=None):
+        ''' Start a new game in every environment
+            Args:
+                decks: optional (num_envs, 52) deck orders - otherwise decks are shuffled
+            Returns:
+                (num_envs, observation_size) array of observations
+        '''
+
+        self._deal(np.arange(self.num_envs), decks)
+        return self.observe()
+
+
+    def observe(self):
+        ''' Observations of every game from the agent's seat '''
+
+        board = self.board
+        envs = np.arange(self.num_envs)
+        state = BatchState(board, envs, self.agent_seat)
+
+        obs = np.empty((self.num_envs, observation_size(self.num_cols)), dtype=np.int16)
+        obs[:, PHASE] = self.phase - 1
+        obs[:, CARD_IN_HAND] = np.where(self.phase == 2, board.card, UNKNOWN_CARD)
+        # The face up pile is empty after taking its only card, straight after a reshuffle
+        obs[:, FACE_UP] = np.where(board.up_len > 0, state.face_up, UNKNOWN_CARD)
+        obs[:, HAS_KNOCKED] = state.has_knocked
+        obs[:, NUM_HEADER:NUM_HEADER + self.num_slots] = state.self_cards
+        obs[:, NUM_HEADER + self.num_slots:NUM_HEADER + self.num_slots * 2] = state.opp_cards
+        obs[:, NUM_HEADER + self.num_slots * 2:] = state.known_counts
+        return obs
+
+
+    def action_masks(self):
+        ''' (num_envs, num_actions) booleans - the legal actions in every game '''
+
+        masks = np.zeros((self.num_envs, self.num_actions), dtype=bool)
+        phase_1 = self.phase == 1
+        masks[phase_1, FACE_UP_CARD] = True
+        masks[phase_1, FACE_DOWN_CARD] = True
+        masks[phase_1, KNOCK] = True
+
+        phase_2 = ~phase_1
+        masks[phase_2, :self.num_slots] = True
+        masks[phase_2, self.return_action] = self.board.drew_face_down[phase_2]
+        return masks
+
+
+    def get_state(self, env):
+        ''' Dict state of one game from the agent's seat - the form Board gives its players '''
+
+        return self.board.get_state_for_player(env, self.agent_seat)
+
+
+    def step(self, actions):
+        ''' Take one decision in every game
+            Args:
+                actions: an action index per game
+            Returns:
+                (observations, rewards, dones, infos) - finished games are reset, so their
+                observation is the start of the next game and their info holds the
+                'terminal_observation' and the 'scores' in seat order
+        '''
+
+        actions = np.asarray(actions, dtype=np.int32).reshape(self.num_envs)
+        if (actions < 0).any() or (actions >= self.num_actions).any() or \
+                not self.action_masks()[np.arange(self.num_envs), actions].all():
+            raise ValueError('Illegal actions: {}'.format(actions.tolist()))
+
+        board = self.board
+        seats = np.full(self.num_envs, self.agent_seat, dtype=np.int32)
+        phase_1 = self.phase == 1
+        phase_2 = ~phase_1
+
+        draw = board.play_phase_1(phase_1, actions)
+        knocked = phase_1 & ~draw
+        board.end_turn(knocked)
+
+        board.play_phase_2(phase_2, seats, np.where(actions == self.return_action, RETURN_TO_DECK, actions))
+        board.end_turn(phase_2)
+
+        self.phase[draw] = 2
+        self._advance(knocked | phase_2)
+
+        dones = board.done.copy()
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        infos = [{} for _ in range(self.num_envs)]
+
+        finished = np.flatnonzero(dones)
+        if len(finished):
+            scores = board.scores[finished]
+            rewards[finished] = scores[:, 1 - self.agent_seat] - scores[:, self.agent_seat]
+
+            terminal = self.observe()
+            for i, env in enumerate(finished):
+                infos[env] = {'terminal_observation': terminal[env],
+                              'scores': scores[i].tolist(),
+                              'turns': int(board.turn[env])}
+
+            self.games += len(finished)
+            self._deal(finished)
+
+        return self.observe(), rewards, dones, infos
+
+
+class GolfEnv(object):
+    ''' A single game - VecGolfEnv with one environment, without the batch dimension '''
+
+    def __init__(self, opponent, num_cols=2, seed=None, agent_seat=0):
+        self.env = VecGolfEnv(1, opponent, num_cols=num_cols, seeds=None if seed is None else [seed],
+                              agent_seat=agent_seat)
+        self.num_actions = self.env.num_actions
+        self.return_action = self.env.return_action
+
+
+    def reset(self, deck=None):
+        ''' Start a new game - from deck when given - returning the first observation '''
+
+        return self.env.reset(None if deck is None else [deck])[0]
+
+
+    def step(self, action):
+        ''' Returns:
+                (observation, reward, done, info)
+        '''
+
+        obs, rewards, dones, infos = self.env.step([action])
+        return obs[0], rewards[0], dones[0], infos[0]
+
+
+    def action_mask(self):
+        return self.env.action_masks()[0]
+
+
+    def get_state(self):
+        return self.env.get_state(0)
@@ -0,0 +1,280 @@
+''' Compact records of played games - everything needed to replay a game exactly without the players
+
+    A record is a single int16 array:
+        [num_cols,
+         52 cards - the deck order before the first card was turned face up,
+         number of turns, one code per turn (see encode_turn),
+         number of reshuffled cards, the new face down deck after every reshuffle - concatenated,
+         score of player 0, score of player 1]
+
+    Records are written in chunks - each chunk is a pair of .npy arrays (record offsets and the
+    concatenated records) appended to the same file.
+'''
+import numpy as np
+from board import Board, MAX_TURNS
+from batch_board import PHASE_1_MOVES, KNOCK, RETURN_TO_DECK
+
+
+class ReplayStopped(Exception):
+    ''' Raised inside a replayed game once it reaches the requested turn '''
+    pass
+
+
+def encode_decision(decision):
+    ''' Code for a decision as returned by a player - phase 1 moves are indexes into PHASE_1_MOVES,
+        phase 2 moves are the hand index swapped into or RETURN_TO_DECK
+    '''
+
+    if decision in PHASE_1_MOVES:
+        return PHASE_1_MOVES.index(decision)
+
+    if decision[0] == 'swap':
+        return decision[2] * 2 + decision[1]
+
+    return RETURN_TO_DECK
+
+
+def encode_turn(phase_1, phase_2=RETURN_TO_DECK):
+    ''' Pack the codes of both phases of a turn into one integer '''
+
+    return phase_1 * 8 + phase_2 + 1
+
+
+def decode_turn(code):
+    ''' Unpack a turn code into (phase 1 code, phase 2 code) '''
+
+    return code / 8, code % 8 - 1
+
+
+class GameRecord(object):
+    ''' A single recorded game '''
+
+    def __init__(self, num_cols, deck, turns, reshuffles, scores):
+        ''' Args:
+                num_cols: game board layout
+                deck: the 52 card deck order at the start of the game
+                turns: list of turn codes
+                reshuffles: cards of every reshuffled face down deck, concatenated
+                scores: final scores as returned by Board.play_game
+        '''
+
+        self.num_cols = num_cols
+        self.deck = list(deck)
+        self.turns = list(turns)
+        self.reshuffles = list(reshuffles)
+        self.scores = list(scores)
+
+
+    def __len__(self):
+        return len(self.turns)
+
+
+    def ended_in_cycle(self):
+        ''' Whether the game was cut short as a forfeit because a position repeated '''
+
+        return len(self.turns) < MAX_TURNS and KNOCK not in [decode_turn(a)[0] for a in self.turns]
+
+
+    def decisions(self):
+        ''' The decisions of every turn as the players made them - (phase 1 move, phase 2 move or None) '''
+
+        for code in self.turns:
+            phase_1, phase_2 = decode_turn(code)
+            if phase_1 == KNOCK:
+                yield ('knock', None)
+            elif phase_2 == RETURN_TO_DECK:
+                yield (PHASE_1_MOVES[phase_1], ('return_to_deck',))
+            else:
+                yield (PHASE_1_MOVES[phase_1], ('swap', phase_2 % 2, phase_2 / 2,))
+
+
+    def to_array(self):
+        ''' Pack the record into an int16 array '''
+
+        return np.array([self.num_cols] + self.deck +
+                        [len(self.turns)] + self.turns +
+                        [len(self.reshuffles)] + self.reshuffles +
+                        self.scores, dtype=np.int16)
+
+
+    @classmethod
+    def from_array(cls, array):
+        ''' Unpack a record made by to_array '''
+
+        values = array.tolist()
+        num_turns = values[53]
+        pos = 54 + num_turns
+        num_reshuffled = values[pos]
+
+        return cls(num_cols=values[0],
+                   deck=values[1:53],
+                   turns=values[54:pos],
+                   reshuffles=values[pos + 1:pos + 1 + num_reshuffled],
+                   scores=values[pos + 1 + num_reshuffled:])
+
+
+class GameRecorder(object):
+    ''' Collects a record of every game played on boards it is handed to - the records are
+        kept in memory, or written in chunks when a GameRecordWriter is given
+    '''
+
+    def __init__(self, writer=None):
+        self.writer = writer
+        self.records = []
+        self._game = None
+
+
+    def __getstate__(self):
+        # Copies sent to other processes collect their records in memory, to be merged back
+        return {'writer': None, 'records': self.records, '_game': None}
+
+
+    def start_game(self, num_cols, deck):
+        ''' A board is about to deal from deck '''
+
+        self._game = {'num_cols': num_cols, 'deck': list(deck), 'turns': [], 'reshuffles': []}
+
+
+    def record_turn(self, phase_1, phase_2=None):
+        ''' Record the decisions of a turn as the player returned them - phase_2 is None after a knock '''
+
+        phase_2 = RETURN_TO_DECK if phase_2 is None else encode_decision(phase_2)
+        self._game['turns'].append(encode_turn(encode_decision(phase_1), phase_2))
+
+
+    def record_reshuffle(self, deck_down):
+        ''' The face down deck was rebuilt from the discard pile '''
+
+        self._game['reshuffles'].extend(deck_down)
+
+
+    def end_game(self, scores):
+        ''' The game finished with the scores Board.play_game returns '''
+
+        self.add(GameRecord(scores=scores, **self._game))
+        self._game = None
+
+
+    def add(self, record):
+        ''' Keep a finished record - or hand it to the writer '''
+
+        if self.writer is not None:
+            self.writer.write(record)
+        else:
+            self.records.append(record)
+
+
+    def merge(self, other):
+        ''' Add the records collected by another recorder - e.g. one filled in a worker process '''
+
+        for record in other.records:
+            self.add(record)
+
+
+class GameRecordWriter(object):
+    ''' Write records to a file in chunks of chunk_size games '''
+
+    def __init__(self, path, chunk_size=1000):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._chunk = []
+        self._file = open(path, 'wb')
+
+
+    def write(self, record):
+        self._chunk.append(record.to_array())
+        if len(self._chunk) >= self.chunk_size:
+            self.flush()
+
+
+    def flush(self):
+        ''' Write out the buffered records as a chunk '''
+
+        if not self._chunk:
+            return
+
+        offsets = np.cumsum([0] + [len(a) for a in self._chunk]).astype(np.int64)
+        np.save(self._file, offsets)
+        np.save(self._file, np.concatenate(self._chunk))
+        self._file.flush()
+        self._chunk = []
+
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_records(path):
+    ''' Iterate over the records in a file written by GameRecordWriter '''
+
+    with open(path, 'rb') as infile:
+        while True:
+            try:
+                offsets = np.load(infile)
+            except (IOError, ValueError):
+                # End of the file
+                return
+
+            data = np.load(infile)
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                yield GameRecord.from_array(data[start:end])
+
+
+class _ScriptedPlayer(object):
+    ''' Plays the recorded decisions - both seats share the same script '''
+
+    def __init__(self, script, stop_turn):
+        self.script = script
+        self.stop_turn = stop_turn
+        self.turn = 0
+        self.phase_2 = None
+
+
+    def turn_phase_1(self, state, possible_moves=None):
+        if self.stop_turn is not None and self.turn >= self.stop_turn:
+            raise ReplayStopped()
+
+        phase_1, self.phase_2 = next(self.script)
+        self.turn += 1
+        return phase_1
+
+
+    def turn_phase_2(self, card, state, possible_moves=None):
+        return self.phase_2
+
+
+def replay(record, turn=None):
+    ''' Rebuild a recorded game without the players
+        Args:
+            record: GameRecord
+            turn: optional - stop at the start of this turn (0 is the state just after dealing)
+        Returns:
+            (board, scores) - the Board as of the requested turn (or the end of the game), and
+            the final scores when the game was replayed to the end, otherwise None
+    '''
+
+    player = _ScriptedPlayer(record.decisions(), turn)
+    board = Board([player, player], record.num_cols, deck=record.deck, detect_cycles=record.ended_in_cycle())
+
+    reshuffles = iter(record.reshuffles)
+
+    def recorded_shuffle(cards, count):
+        cards[:count] = [next(reshuffles) for _ in range(count)]
+
+    board.deck.shuffle = recorded_shuffle
+
+    try:
+        scores = board.play_game()
+    except ReplayStopped:
+        return board, None
+
+    return board, scores
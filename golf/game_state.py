@@ -0,0 +1,165 @@
+# Game state that the board keeps up to date in place as the game is played
+
+class FrozenList(list):
+    ''' A list that players can read but not modify - the owner changes it through the
+        list methods directly (e.g. list.append(frozen, card))
+    '''
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('Game state is read-only, copy it before making changes')
+
+    append = extend = insert = pop = remove = reverse = sort = _read_only
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = __imul__ = _read_only
+
+    def __reduce__(self):
+        # Copies and pickles of the state come back as plain lists
+        return (list, (list(self),))
+
+
+class FrozenDict(dict):
+    ''' A dict that players can read but not modify '''
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('Game state is read-only, copy it before making changes')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class GameState(object):
+    ''' Holds the discard pile, knock flag and a read-only state per player - Board tells it
+        about every change so that player states are updated in place rather than rebuilt.
+        Player states are dicts of the form:
+            {'self': hand state (see Hand.get_state),
+             'opp': list of opponent hand states,
+             'deck_up': list of cards in the discard pile,
+             'has_knocked': Boolean,
+             'known_cards': list of 13 counts - how many of each card the player has seen in
+                            their own hand, the opponents' hands and the discard pile}
+        and always reflect the current game state.
+    '''
+
+    def __init__(self, hands):
+        ''' Args:
+                hands: the board's list of Hand objects - shared, not copied
+        '''
+
+        self.hands = hands
+        self.deck_up = FrozenList()
+        self._has_knocked = False
+
+        # histogram of the discard pile, kept in step with deck_up
+        self.deck_up_counts = [0] * 13
+
+        # hand states keyed by (hand index, is_self) and the per player states built from them
+        self._hand_states = {}
+        self._views = {}
+
+
+    @property
+    def has_knocked(self):
+        return self._has_knocked
+
+
+    @has_knocked.setter
+    def has_knocked(self, value):
+        self._has_knocked = value
+        for view in self._views.values():
+            dict.__setitem__(view, 'has_knocked', value)
+
+
+    def view(self, player_id):
+        ''' Get the read-only state for a player - the same object for the whole game '''
+
+        try:
+            return self._views[player_id]
+        except KeyError:
+            view = self._views[player_id] = FrozenDict({'deck_up': self.deck_up,
+                                                        'has_knocked': self._has_knocked,
+                                                        'known_cards': FrozenList([0] * 13)})
+            self._refresh_view(player_id)
+            return view
+
+
+    def hand_state(self, index, is_self=False):
+        ''' Get the state of a hand, only recalculated after the hand has changed '''
+
+        key = (index, is_self)
+        try:
+            return self._hand_states[key]
+        except KeyError:
+            state = self.hands[index].get_state(is_self=is_self)
+            state['visible'] = FrozenList(state['visible'])
+            state['raw_cards'] = FrozenList(state['raw_cards'])
+            state = self._hand_states[key] = FrozenDict(state)
+            return state
+
+
+    def _refresh_view(self, player_id):
+        ''' Point a player's state at the current hand states '''
+
+        view = self._views[player_id]
+        self_state = self.hand_state(player_id, is_self=True)
+        opp_states = FrozenList([self.hand_state(p, is_self=False) for p in range(len(self.hands)) if p != player_id])
+        dict.__setitem__(view, 'self', self_state)
+        dict.__setitem__(view, 'opp', opp_states)
+
+        known_cards = list(self.deck_up_counts)
+        for state in [self_state] + opp_states:
+            for card in state['raw_cards']:
+                if card != None:
+                    known_cards[card] += 1
+
+        list.__setitem__(view['known_cards'], slice(None), known_cards)
+
+
+    def hand_changed(self, index=None):
+        ''' A hand has changed (or all hands when index is None) - update the player states '''
+
+        if index is None:
+            self._hand_states.clear()
+        else:
+            self._hand_states.pop((index, True), None)
+            self._hand_states.pop((index, False), None)
+
+        for player_id in self._views:
+            self._refresh_view(player_id)
+
+
+    def push_up(self, card):
+        ''' Place a card on top of the discard pile '''
+
+        list.append(self.deck_up, card)
+        self._count_up(card, 1)
+
+
+    def pop_up(self):
+        ''' Take the top card of the discard pile '''
+
+        card = list.pop(self.deck_up)
+        self._count_up(card, -1)
+        return card
+
+
+    def reset_up(self, cards):
+        ''' Replace the whole discard pile - after the deck has been reshuffled '''
+
+        for card in self.deck_up:
+            self._count_up(card, -1)
+
+        list.__delitem__(self.deck_up, slice(None))
+        list.extend(self.deck_up, cards)
+
+        for card in cards:
+            self._count_up(card, 1)
+
+
+    def _count_up(self, card, change):
+        ''' Keep the discard pile histogram and every player's known cards in step '''
+
+        self.deck_up_counts[card] += change
+        for view in self._views.values():
+            known_cards = view['known_cards']
+            list.__setitem__(known_cards, card, known_cards[card] + change)
@@ -18,8 +18,45 @@ class GolfHandOutOfIndexError(GolfHandExceptionBase):
 
 
 
+# Cards are coded 0 -> 12 (King = 0, Ace = 1, ...) with UNKNOWN_CARD standing in for a card
+# that has not been seen - None in the card lists handed to players
+UNKNOWN_CARD = 13
+CARD_CODES = dict([(a, a) for a in range(13)] + [(None, UNKNOWN_CARD)])
+
+
+def _column_score(top, bottom):
+    ''' Score a single column of card codes - matching known cards cancel out '''
+
+    if top == bottom and top != UNKNOWN_CARD:
+        return 0
+
+    return sum([min(10, a) for a in (top, bottom) if a != UNKNOWN_CARD])
+
+
+# Precomputed column scores indexed by [top code][bottom code]
+COLUMN_SCORES = tuple(tuple(_column_score(top, bottom) for bottom in range(14)) for top in range(14))
+
+
+def _score_any_cards(cards):
+    ''' Score cards that can not be coded - players substitute float estimates for unknown cards '''
+
+    score = 0
+    for a in range(0, len(cards), 2):
+        pair = (cards[a], cards[a + 1])
+        if pair[0] == pair[1] and pair[0] != None and pair[1] != None:
+            continue
+        for p in pair:
+            if p != None:
+                score += min(10, p)
+
+    return score
+
+
 class Hand(object):
 
+    # Revealed cards are kept as bitmasks, bit i set when card i is revealed
+    __slots__ = ('cards', 'num_cols', '_self_mask', '_opp_mask')
+
     def __init__(self, cards_dealt):
         # Cards are encoded as a single array
         # with i % 2 == 0 cards in the bottom row
@@ -33,8 +70,41 @@ class Hand(object):
         self.num_cols = len(cards_dealt) / 2
 
         # We start off with the bottom cards revealed to us
-        self.self_revealed = [c % 2 == 0 for c in range(len(self.cards))]
-        self.opp_revealed = [False] * len(self.cards)
+        self._self_mask = sum([1 << c for c in range(0, len(self.cards), 2)])
+        self._opp_mask = 0
+
+
+    @classmethod
+    def restore(cls, cards, self_mask, opp_mask):
+        ''' A hand part way through a game - as packed by masks()
+            Args:
+                cards: list of cards - used as is, not copied
+                self_mask: bitmask of the cards the owner has seen
+                opp_mask: bitmask of the cards the opponent has seen
+        '''
+
+        hand = cls.__new__(cls)
+        hand.cards = cards
+        hand.num_cols = len(cards) / 2
+        hand._self_mask = self_mask
+        hand._opp_mask = opp_mask
+        return hand
+
+
+    def masks(self):
+        ''' What each player has seen - (owner bitmask, opponent bitmask), bit i set when card i is revealed '''
+
+        return (self._self_mask, self._opp_mask,)
+
+
+    @property
+    def self_revealed(self):
+        return [bool(self._self_mask >> i & 1) for i in range(len(self.cards))]
+
+
+    @property
+    def opp_revealed(self):
+        return [bool(self._opp_mask >> i & 1) for i in range(len(self.cards))]
 
 
     def visible(self, is_self=False):
@@ -46,17 +116,23 @@ class Hand(object):
                 A generator that yields either the card present or None if the card is not visible
         '''
 
+        mask = self._self_mask if is_self else self._opp_mask
         for i, card in enumerate(self.cards):
-            if is_self:
-                if self.self_revealed[i]:
-                    yield card
-                else:
-                    yield None
+            if mask >> i & 1:
+                yield card
             else:
-                if self.opp_revealed[i]:
-                    yield card
-                else:
-                    yield None
+                yield None
+
+
+    def position_key(self):
+        ''' Compact key for the hand - the cards and what each player has seen, packed into an int '''
+
+        key = 0
+        for card in self.cards:
+            key = (key << 4) | card
+
+        size = len(self.cards)
+        return (((key << size) | self._self_mask) << size) | self._opp_mask
 
 
     def get_state(self, is_self=False):
@@ -74,20 +150,11 @@ class Hand(object):
                                       }
         '''
 
-        # Initialize these to some sensible defaults - we'll refine them later
-        score = 10 * self.num_cols * 2 # max score
-        visible = [a != None for a in self.visible(is_self=True)]
-        raw_cards = []
-
-        # First iterate through the cards - and create an array that represents the
-        # calling players view of the world - visibility, raw_cards, and player_has_seen
-        # can be calculated here - then the raw_cards can be passed to the score function
-
-        for i, card in enumerate(self.visible(is_self=is_self)):
-            raw_cards.append(card)
+        mask = self._self_mask if is_self else self._opp_mask
+        raw_cards = [card if mask >> i & 1 else None for i, card in enumerate(self.cards)]
 
         return {'score': self.score(raw_cards),
-                'visible': visible,
+                'visible': self.self_revealed,
                 'raw_cards': raw_cards,
                 'num_rows': 2,
                 'num_cols': self.num_cols}
@@ -95,24 +162,20 @@ class Hand(object):
 
 
     def score(self, cards=None):
-        # Score the current hand according to the rules
+        # Score the current hand according to the rules - each column is looked up
+        # in the precomputed table, unknown cards (None) count for nothing
 
         if not cards:
             cards = self.cards
 
-        # First we should split the hand into pairs (the columns)
-        columns = [(cards[a], cards[a+1]) for a in range(len(cards)) if a % 2 == 0]
+        codes = CARD_CODES
         score = 0
-
-        for pair in columns:
-            if pair[0] == pair[1] and pair[0] != None and pair[1] != None:
-                continue
-            for p in pair:
-                try:
-                    score += min(10, p)
-                except TypeError:
-                    # happens when an unknown card represented by None is attempting to be added
-                    pass
+        try:
+            for a in range(0, len(cards), 2):
+                score += COLUMN_SCORES[codes[cards[a]]][codes[cards[a + 1]]]
+        except (KeyError, TypeError):
+            # happens when a card is not a plain card value - such as an estimated average card
+            return _score_any_cards(cards)
 
         return score
 
@@ -151,8 +214,12 @@ class Hand(object):
 
     def swap(self, row, col, new_card, source_revealed = False):
         # swap the card by row and column with the newly given card
-        old_card = self.cards[self._coords_to_index(row, col)]
-        self.cards[self._coords_to_index(row, col)] = new_card
-        self.self_revealed[self._coords_to_index(row, col)] = True
-        self.opp_revealed[self._coords_to_index(row, col)] = source_revealed
+        index = self._coords_to_index(row, col)
+        old_card = self.cards[index]
+        self.cards[index] = new_card
+        self._self_mask |= 1 << index
+        if source_revealed:
+            self._opp_mask |= 1 << index
+        else:
+            self._opp_mask &= ~(1 << index)
         return old_card
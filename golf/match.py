@@ -1,31 +1,154 @@
 import sys
 import getopt
 import json
-from board import Board
+import hashlib
+import random
+import os
+import multiprocessing
+import collections
+import numpy as np
+from board import Board, MAX_TURNS
+from batch_board import random_decks
+from profiling import PhaseTimer, profile_call
+from game_record import GameRecorder, GameRecordWriter
+
+
+def match_seed(base_seed, match_index):
+    ''' Derive the seed for a single match from the (base_seed, match_index) pair, so a
+        match plays out the same no matter which process or in which order it is run
+    '''
+
+    return int(hashlib.sha1('{}-{}'.format(base_seed, match_index)).hexdigest()[:8], 16)
+
+
+def seed_match(base_seed, match_index):
+    ''' Seed the random number generators used by the board and the players for one match '''
+
+    seed = match_seed(base_seed, match_index)
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def _play_seeded_match(args):
+    ''' Play a single match of a Match, seeding it first if a seed was given, and
+        profiling it if the match has a profile directory
+        Returns:
+            tuple of the match scores, the match timer, the match recorder and the number of
+            looping games ended early with the turns that saved
+    '''
+
+    match, match_num, seed = args
+    if seed is not None:
+        seed_match(seed, match_num)
+
+    if match.profile_dir:
+        profile_path = os.path.join(match.profile_dir, 'match_{}.prof'.format(match_num))
+        scores = profile_call(profile_path, match.play_match, match_num)
+    else:
+        scores = match.play_match(match_num)
+
+    return scores, match.timer, match.recorder, (match.cycles, match.cycle_turns_saved,)
+
+
+def _play_pooled_match(args):
+    ''' Pool worker - the timer, recorder and cycle counts are fresh ones so only this match's times,
+        games and cycles are sent back
+    '''
+
+    match = args[0]
+    match.cycles = 0
+    match.cycle_turns_saved = 0
+    if match.timer:
+        match.timer = PhaseTimer()
+    if match.recorder:
+        match.recorder = GameRecorder()
+
+    return _play_seeded_match(args)
+
+
+# Result of duplicate deals - differences are player 1's total score minus player 2's over both
+# plays of a deal, so negative differences favour player 1
+DuplicateResult = collections.namedtuple('DuplicateResult', ['deals', 'wins', 'mean', 'variance', 'std_error'])
 
 
 class Match(object):
 
-    def __init__(self, player1, player2, holes=9, verbose=False):
+    def __init__(self, player1, player2, holes=9, verbose=False, timer=None, profile_dir=None, recorder=None):
+        ''' Args:
+                player1, player2: golf players
+                holes: number of holes per match
+                verbose: print the details of every game
+                timer: optional profiling.PhaseTimer to record time spent in each phase of every game
+                profile_dir: optional directory - every match is run under cProfile and the stats
+                             are dumped to match_<match number>.prof
+                recorder: optional game_record.GameRecorder to record every game played
+        '''
+
         self.players = [player1, player2,]
         self.scores = [0,0]
         self.total_holes = holes # Since we're 0 indexed
         self.verbose = verbose
+        self.timer = timer
+        self.profile_dir = profile_dir
+        self.recorder = recorder
         self.matches = [0] * len(self.players)
 
+        # looping games ended early (see Board.play_game) and the turns not played because of it
+        self.cycles = 0
+        self.cycle_turns_saved = 0
+
+        # scores of every match played, in match order
+        self.match_scores = []
+
         if self.verbose:
             # let's introduce the players
             print 'Player 0 {}'.format(self.players[0])
             print 'Player 1 {}'.format(self.players[1])
 
 
-    def play_k_matches(self, k):
-        ''' Play a lot of independent matches for a more fair comparison '''
+    def play_k_matches(self, k, processes=None, seed=None, first_match=0):
+        ''' Play a lot of independent matches for a more fair comparison
+            Args:
+                k: number of matches
+                processes: if more than 1, spread the matches across a pool of this many processes -
+                           trainable players will not keep weight updates made inside the pool
+                seed: base seed - every match is seeded from (seed, match number), which makes
+                      the results reproducible regardless of the number of processes
+                first_match: number of the first match - so further matches can be added to
+                             earlier ones without repeating their seeds
+            Returns:
+                tuple of the matches won by each player over every call on this match
+        '''
+
+        tasks = [(self, first_match + i, seed) for i in range(k)]
+
+        if processes and processes > 1:
+            pool = multiprocessing.Pool(processes)
+            try:
+                all_scores = pool.map(_play_pooled_match, tasks, chunksize=max(1, k / (processes * 4)))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            all_scores = None
+
         for i in range(k):
 
-            if self.verbose:
-                print('\n **** Starting Match # {} **** \n'.format(i))
-            scores = self.play_match(i)
+            if all_scores:
+                scores, timer, recorder, (cycles, turns_saved) = all_scores[i]
+                if timer:
+                    self.timer.merge(timer)
+                if recorder:
+                    self.recorder.merge(recorder)
+                self.cycles += cycles
+                self.cycle_turns_saved += turns_saved
+            else:
+                if self.verbose:
+                    print('\n **** Starting Match # {} **** \n'.format(first_match + i))
+                # timings, games and cycles are already added to this match
+                scores = _play_seeded_match(tasks[i])[0]
+
+            self.match_scores.append(scores)
 
             if scores[0] > scores[1]:
                 self.matches[1] += 1
@@ -33,23 +156,95 @@ class Match(object):
                 self.matches[0] += 1
 
             if self.verbose or True:
-                print '\nMatch {} Results:'.format(i)
+                print '\nMatch {} Results:'.format(first_match + i)
                 print 'Player 1 Score: {} Player 2 Score: {}'.format(scores[0], scores[1])
                 print 'Player 0: {}, Player 1: {}'.format(self.matches[0], self.matches[1])
 
         print 'Player 0: {} matches, Player 1: {} matches'.format(self.matches[0], self.matches[1])
+        if self.cycles:
+            print 'Ended {} looping games early - {} turns saved'.format(self.cycles, self.cycle_turns_saved)
+
         return (self.matches[0], self.matches[1])
 
 
-    def play_match(self, match_num):
-        ''' Play all of the holes for a single match '''
+    def play_duplicate(self, k, seed=None):
+        ''' Compare the players on the same luck of the deal - every deal (a deck for each hole) is
+            played twice with the players in swapped seats, and the random number generators are
+            reset to the same state before both plays so reshuffles also match
+            Args:
+                k: number of deals - 2 * k matches are played
+                seed: base seed for the decks and the random number generators
+            Returns:
+                DuplicateResult - the deals won by each player and the mean, variance and standard
+                error of the paired score differences
+        '''
+
+        decks = random_decks(k * self.total_holes, np.random.RandomState(seed)).reshape(k, self.total_holes, 52)
+        base_seed = seed if seed is not None else random.getrandbits(32)
+
+        differences = []
+        wins = [0, 0]
+        for deal in range(k):
+            totals = [0, 0]
+            for match_num in range(2):
+                seed_match(base_seed, deal)
+                scores = self.play_match(match_num, decks=decks[deal])
+                totals = [a + b for a, b in zip(totals, scores)]
+
+            difference = totals[0] - totals[1]
+            differences.append(difference)
+            if difference < 0:
+                wins[0] += 1
+            elif difference > 0:
+                wins[1] += 1
+
+            if self.verbose:
+                print 'Deal {} Player 1 Score: {} Player 2 Score: {}'.format(deal, totals[0], totals[1])
+
+        differences = np.array(differences, dtype=np.float64)
+        variance = differences.var(ddof=1) if k > 1 else 0.0
+        result = DuplicateResult(deals=k, wins=tuple(wins), mean=differences.mean(), variance=variance,
+                                 std_error=np.sqrt(variance / k))
+
+        print 'Player 0: {} deals, Player 1: {} deals - mean difference {:.2f} +/- {:.2f}'.format(
+            wins[0], wins[1], result.mean, result.std_error)
+        return result
+
+
+    def play_match(self, match_num, decks=None):
+        ''' Play all of the holes for a single match
+            Args:
+                match_num: number of the match - the players alternate seats by hole, starting
+                           with player 1 in the first seat for even match numbers
+                decks: optional deck to deal for each hole - otherwise each hole is shuffled
+        '''
 
         scores = [0,0]
 
+        kwargs = {'verbose': self.verbose}
+        if self.timer:
+            kwargs['timer'] = self.timer
+        if self.recorder:
+            kwargs['recorder'] = self.recorder
+
+        # One board plays every hole - reset with the seats swapped and a new deck
+        board = None
         for turn in range(self.total_holes):
-            board = Board([self.players[(turn + match_num) % 2], self.players[((turn + match_num) + 1) % 2]], 2, verbose=self.verbose)
+            player_ids = [(turn + match_num) % 2, ((turn + match_num) + 1) % 2]
+            players = [self.players[i] for i in player_ids]
+            deck = decks[turn] if decks is not None else None
+
+            if board is None:
+                if deck is not None:
+                    kwargs['deck'] = deck
+                board = Board(players, 2, player_ids=player_ids, **kwargs)
+            else:
+                board.reset(players, deck, player_ids)
 
             game_scores = board.play_game()
+            if board.cycle_turn is not None:
+                self.cycles += 1
+                self.cycle_turns_saved += MAX_TURNS - board.cycle_turn
             for i, score in enumerate(scores):
                 scores[(turn + match_num + i) % 2] += game_scores[i]
 
@@ -65,14 +260,25 @@ def main(argv):
     player2_args = {'init': {}}
     verbose = False
     holes = None
+    processes = None
+    seed = None
+    profile = False
+    profile_dir = None
+    record = None
+    duplicate = False
 
     try:
-        opts, args = getopt.getopt(argv, "hm:v", ["player1=", "player2=", "player1_args=", "player2_args=", "matches=", "holes=", "verbose"])
+        opts, args = getopt.getopt(argv, "hm:v", ["player1=", "player2=", "player1_args=", "player2_args=", "matches=", "holes=", "verbose", "processes=", "seed=",
+                                                   "profile", "profile_dir=", "record=", "duplicate"])
     except:
-        print 'python match.py --player1=<player1> --player1_args=<player1_args> --player2=<player2> --player2_args=<player2_args> -m <number of matches> -holes <number of holes> -v <verbose>'
+        print 'python match.py --player1=<player1> --player1_args=<player1_args> --player2=<player2> --player2_args=<player2_args> -m <number of matches> -holes <number of holes> -v <verbose> ' \
+              '--processes=<number of processes> --seed=<base seed> --profile <print phase timings> --profile_dir=<directory for cProfile stats> ' \
+              '--record=<game record file> --duplicate <play every deal twice with the seats swapped>'
     for opt, arg in opts:
         if opt == '-h':
-            print 'python match.py --player1=<player1> --player1_args=<player1_args> --player2=<player2> --player2_args=<player2_args> -m <number of matches> -holes <number of holes> -v <verbose>'
+            print 'python match.py --player1=<player1> --player1_args=<player1_args> --player2=<player2> --player2_args=<player2_args> -m <number of matches> -holes <number of holes> -v <verbose> ' \
+                  '--processes=<number of processes> --seed=<base seed> --profile <print phase timings> --profile_dir=<directory for cProfile stats> ' \
+                  '--record=<game record file> --duplicate <play every deal twice with the seats swapped>'
             sys.exit(2)
         elif opt in ("--player1"):
             player1 = arg
@@ -94,6 +300,18 @@ def main(argv):
                 pass
         elif opt in ("-v", "--verbose"):
             verbose = True
+        elif opt in ("--processes"):
+            processes = int(arg)
+        elif opt in ("--seed"):
+            seed = int(arg)
+        elif opt == "--profile":
+            profile = True
+        elif opt == "--profile_dir":
+            profile_dir = arg
+        elif opt == "--record":
+            record = arg
+        elif opt == "--duplicate":
+            duplicate = True
 
     # Players need to be specified by file.ClassName
     player1 = player1.split('.')
@@ -108,9 +326,29 @@ def main(argv):
     kwargs = {'verbose': verbose}
     if holes:
         kwargs['holes'] = holes
+    if profile:
+        kwargs['timer'] = PhaseTimer()
+    if profile_dir:
+        kwargs['profile_dir'] = profile_dir
+    if record:
+        kwargs['recorder'] = GameRecorder(GameRecordWriter(record))
 
     match = Match(player1, player2, **kwargs)
-    match.play_k_matches(num_matches)
+    if duplicate:
+        match.play_duplicate(num_matches, seed=seed)
+    else:
+        match.play_k_matches(num_matches, processes=processes, seed=seed)
+
+    if record:
+        match.recorder.writer.close()
+
+    # Players with decision caches keep them for the next run
+    for player in (player1, player2):
+        if hasattr(player, 'save_cache'):
+            player.save_cache()
+
+    if profile:
+        print match.timer
 
 
 if __name__ == '__main__':
@@ -0,0 +1,165 @@
+''' Fit QWatkinsPlayer weights offline from stored transitions
+
+    QWatkinsPlayer scores a q-state as dot(offset - features, weights), so with
+    phi = offset - features every method here is linear in the weights and only needs the
+    sums phi'phi, phi'phi_next and phi'reward over all transitions.  These are accumulated in
+    a single streaming pass over replay buffer files (see players.replay_buffer) - after that
+    fitting is a handful of small linear solves, however many transitions there are.
+
+    The next q-state stored with each transition is the best move under the weights at the time
+    it was recorded, so fitted Q iteration here re-values that move rather than re-maximizing.
+'''
+import sys
+import getopt
+import cPickle
+import numpy as np
+from golf.players.replay_buffer import ReplayBuffer
+
+
+class TransitionStats(object):
+    ''' Running sums over transitions - everything the fitting methods need '''
+
+    def __init__(self, num_features=5):
+        self.num_features = num_features
+        self.count = 0
+        self.phi_phi = np.zeros((num_features, num_features))
+        self.phi_next_phi = np.zeros((num_features, num_features))
+        self.phi_reward = np.zeros(num_features)
+
+
+    def add(self, transitions):
+        ''' Add a chunk of transitions - a structured array as stored by ReplayBuffer '''
+
+        phi = transitions['offset'][:, np.newaxis] - transitions['features']
+        phi_next = transitions['next_offset'][:, np.newaxis] - transitions['next_features']
+        phi_next[transitions['terminal']] = 0
+
+        self.count += len(transitions)
+        self.phi_phi += np.dot(phi.T, phi)
+        self.phi_next_phi += np.dot(phi.T, phi_next)
+        self.phi_reward += np.dot(phi.T, transitions['reward'])
+
+
+def stream_transitions(paths, chunk_size=65536):
+    ''' Iterate over the transitions in memory-mapped replay buffer files, chunk_size at a time '''
+
+    for path in paths:
+        transitions = ReplayBuffer.open(path).transitions()
+        for start in range(0, len(transitions), chunk_size):
+            # Copy the chunk out of the memory map so only one chunk is resident at a time
+            yield np.array(transitions[start:start + chunk_size])
+
+
+def collect_stats(chunks, num_features=5):
+    ''' Accumulate TransitionStats over an iterable of transition chunks '''
+
+    stats = TransitionStats(num_features)
+    for chunk in chunks:
+        stats.add(chunk)
+
+    return stats
+
+
+def fit_lstd(stats, discount=0.7, regularization=1e-6):
+    ''' Least-squares temporal difference - the fixed point of the TD update in one solve
+        Returns:
+            weights as a float64 array
+    '''
+
+    a = stats.phi_phi - (discount * stats.phi_next_phi)
+    a += regularization * np.eye(stats.num_features)
+    return np.linalg.solve(a, stats.phi_reward)
+
+
+def fit_fqi(stats, discount=0.7, regularization=1e-6, iterations=100, tolerance=1e-10, weights=None):
+    ''' Fitted Q iteration - repeatedly regress the q-values on reward + discount * next q-value
+        Args:
+            weights: optional starting weights, otherwise zeros
+        Returns:
+            weights as a float64 array
+    '''
+
+    if weights is None:
+        weights = np.zeros(stats.num_features)
+
+    gram = stats.phi_phi + (regularization * np.eye(stats.num_features))
+    for _ in range(iterations):
+        new_weights = np.linalg.solve(gram, stats.phi_reward + (discount * np.dot(stats.phi_next_phi, weights)))
+        converged = np.abs(new_weights - weights).max() < tolerance
+        weights = new_weights
+        if converged:
+            break
+
+    return weights
+
+
+METHODS = {'lstd': fit_lstd,
+           'fqi': fit_fqi}
+
+
+def fit(paths, method='lstd', discount=0.7, regularization=1e-6, chunk_size=65536, **kwargs):
+    ''' Fit weights from replay buffer files
+        Returns:
+            (weights, number of transitions used)
+    '''
+
+    stats = collect_stats(stream_transitions(paths, chunk_size))
+    if not stats.count:
+        raise ValueError('No transitions found in {}'.format(', '.join(paths)))
+
+    return METHODS[method](stats, discount=discount, regularization=regularization, **kwargs), stats.count
+
+
+def save_weights(weights, path):
+    ''' Save weights as a checkpoint QWatkinsPlayer can load with model_file '''
+
+    with open(path, 'wb') as outfile:
+        cPickle.dump(weights, outfile)
+
+
+def main(argv):
+    paths = []
+    output = None
+    method = 'lstd'
+    discount = 0.7
+    regularization = 1e-6
+    chunk_size = 65536
+
+    usage = 'python offline_fit.py --replay_file=<replay buffer file> [--replay_file=...] --output=<checkpoint pkl> ' \
+            '--method=<lstd or fqi> --discount=<discount> --regularization=<ridge penalty> --chunk_size=<transitions per chunk>'
+
+    try:
+        opts, args = getopt.getopt(argv, "h", ["replay_file=", "output=", "method=", "discount=", "regularization=", "chunk_size="])
+    except getopt.GetoptError:
+        print usage
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print usage
+            sys.exit(2)
+        elif opt in ("--replay_file"):
+            paths.append(arg)
+        elif opt in ("--output"):
+            output = arg
+        elif opt in ("--method"):
+            method = arg
+        elif opt in ("--discount"):
+            discount = float(arg)
+        elif opt in ("--regularization"):
+            regularization = float(arg)
+        elif opt in ("--chunk_size"):
+            chunk_size = int(arg)
+
+    if not paths or not output or method not in METHODS:
+        print usage
+        sys.exit(2)
+
+    weights, count = fit(paths, method, discount=discount, regularization=regularization, chunk_size=chunk_size)
+    save_weights(weights, output)
+    print 'Fit {} transitions with {} - weights: {}'.format(count, method, weights)
+    print 'Saved checkpoint: {}'.format(output)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,141 @@
+''' Train a player in many processes at once - Hogwild style
+
+    The trainable player's weights are kept in a shared memory array.  Every worker process plays
+    whole training matches against the opponent with its own copy of both players, and adds its
+    weight updates straight into the shared array - without waiting on the other workers, or under
+    a single lock when asked to.  The parent process keeps the epoch accounting of Trainer (one
+    epoch is one match): it updates the learning rate handed to the workers with each match,
+    evaluates and saves checkpoints from a snapshot of the shared weights, and merges the phase
+    timings of every match into its timer when it has one.
+'''
+import random
+import collections
+import multiprocessing
+import numpy as np
+from trainer import Trainer
+from match import seed_match
+from profiling import PhaseTimer
+
+
+# The worker process's trainer - set up once per process by _init_worker
+_worker = {}
+
+
+def _init_worker(players, trainable_player, holes, buffer, lock, profile=False):
+    ''' Pool initializer - train the worker's copy of the player on the shared weights
+        Args:
+            profile: Boolean - time the phases of every match played
+    '''
+
+    players[trainable_player].share_weights(buffer, lock)
+    _worker['trainer'] = Trainer(players[0], players[1], trainable_player='player{}'.format(trainable_player + 1), holes=holes,
+                                 timer=PhaseTimer() if profile else None)
+
+    # Forked workers start with the parent's random state - without this they would all play the same games
+    random.seed()
+    np.random.seed()
+
+
+def _train_match(args):
+    ''' Pool worker - play the training match of one epoch
+        Returns:
+            (the match scores, the match's timer - None when not profiling)
+    '''
+
+    match_num, learning_rate, seed = args
+    trainer = _worker['trainer']
+    if seed is not None:
+        seed_match(seed, match_num)
+
+    # A fresh timer so only this match's times are sent back
+    if trainer.timer:
+        trainer.timer = PhaseTimer()
+
+    trainer.players[trainer.trainable_player].learning_rate = learning_rate
+    return trainer.play_match(match_num), trainer.timer
+
+
+class ParallelTrainer(Trainer):
+    ''' Trainer whose training matches are played by worker processes sharing the trainable player's weights '''
+
+    def __init__(self, player1, player2, trainable_player=None, processes=None, lock=False, seed=None, **kwargs):
+        ''' Args:
+                processes: number of worker processes - defaults to the number of cores
+                lock: Boolean - hold a lock for each weight update, rather than updating lock free
+                seed: optional base seed for the deal of each training match - updates from the
+                      workers still interleave differently from run to run
+                kwargs: as Trainer
+        '''
+
+        super(ParallelTrainer, self).__init__(player1, player2, trainable_player=trainable_player, **kwargs)
+
+        if self.trainable_player is None or not 0 <= self.trainable_player < len(self.players):
+            raise ValueError('Parallel training needs a trainable player')
+
+        player = self.players[self.trainable_player]
+        if not hasattr(player, 'share_weights'):
+            raise ValueError('{} cannot share its weights between processes'.format(player))
+
+        replay = getattr(player, 'replay', None)
+        if replay is not None and replay.path is not None:
+            raise ValueError('Worker processes cannot share a memory-mapped replay buffer - each keeps its own in memory')
+
+        self.processes = processes or multiprocessing.cpu_count()
+        self.seed = seed
+
+        # The weights, then a count of the updates made to them
+        shared = multiprocessing.Array('d', len(player.weights) + 1, lock=lock)
+        self._lock = shared.get_lock() if lock else None
+        self._buffer = shared.get_obj() if lock else shared
+        np.frombuffer(self._buffer, dtype=np.float64)[:-1] = player.weights
+
+
+    @property
+    def num_updates(self):
+        ''' Weight updates made by the workers so far - lock free updates can lose a count '''
+
+        return int(np.frombuffer(self._buffer, dtype=np.float64)[-1])
+
+
+    def sync_weights(self):
+        ''' Give the trainable player a snapshot of the shared weights '''
+
+        self.players[self.trainable_player].weights = np.array(np.frombuffer(self._buffer, dtype=np.float64)[:-1])
+
+
+    def _play_epochs(self, k, first_epoch=0):
+        ''' Keep a match in flight for every worker - epochs are handed back in order, each with
+            the trainable player synced to the shared weights
+            Returns:
+                generator of (epoch, scores)
+        '''
+
+        player = self.players[self.trainable_player]
+        pool = multiprocessing.Pool(self.processes, _init_worker,
+                                    (self.players, self.trainable_player, self.total_holes, self._buffer, self._lock,
+                                     self.timer is not None,))
+
+        try:
+            pending = collections.deque()
+            next_epoch = first_epoch
+            for i in range(first_epoch, first_epoch + k):
+                # Matches take the learning rate as it is when they start
+                while next_epoch < first_epoch + k and len(pending) < self.processes:
+                    if self.verbose or True:
+                        print('\n **** Starting epoch # {} **** \n'.format(next_epoch))
+
+                    pending.append(pool.apply_async(_train_match, ((next_epoch, player.learning_rate, self.seed,),)))
+                    next_epoch += 1
+
+                scores, timer = pending.popleft().get()
+                if timer:
+                    self.timer.merge(timer)
+
+                self.sync_weights()
+                yield i, scores
+        finally:
+            pool.terminate()
+            pool.join()
+
+        if self.verbose:
+            print 'Workers made {} weight updates'.format(self.num_updates)
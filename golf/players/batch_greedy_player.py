@@ -0,0 +1,71 @@
+''' A quick greedy player for the batch board - the default policy for rollouts
+
+    Like the Bayesball player every unknown card is valued at the average of the cards this seat
+    has not seen, but every decision is made for the whole batch with a handful of array operations.
+'''
+import numpy as np
+from golf.players.batch_player_base import BatchPlayer
+from golf.batch_board import score_cards, FACE_UP_CARD, FACE_DOWN_CARD, KNOCK, RETURN_TO_DECK, UNKNOWN_CARD
+
+
+# Card values as used for averages - King = 0, Ace = 1 and so on, face cards are worth 10
+CARD_VALUES = np.minimum(np.arange(13), 10)
+
+
+class BatchGreedyPlayer(BatchPlayer):
+
+    def __init__(self, min_distance=8, card_margin=1, *args, **kwargs):
+        ''' Args:
+                min_distance: knock once the estimated score is this far below the opponent's
+                card_margin: take the face up card when it lowers the estimated score by at least this much
+        '''
+
+        super(BatchGreedyPlayer, self).__init__(*args, **kwargs)
+        self.min_distance = min_distance
+        self.card_margin = card_margin
+
+
+    def __repr__(self):
+        return 'Batch Greedy Player'
+
+
+    def _estimates(self, batch_state, cards):
+        ''' Scores of a (n, num_slots) card array with the unknown cards valued at the unseen average '''
+
+        counts = batch_state.known_counts
+        average = (300.0 - np.dot(counts, CARD_VALUES)) / np.maximum(52 - counts.sum(axis=1), 1)
+        return score_cards(cards) + ((cards == UNKNOWN_CARD).sum(axis=1) * average)
+
+
+    def _best_swap(self, batch_state, card):
+        ''' Hand index to swap each card into, and how much it would lower the estimated score '''
+
+        cards = batch_state.self_cards
+        current = self._estimates(batch_state, cards)
+
+        estimates = []
+        for position in range(cards.shape[1]):
+            swapped = cards.copy()
+            swapped[:, position] = card
+            estimates.append(self._estimates(batch_state, swapped))
+
+        estimates = np.stack(estimates, axis=1)
+        best = estimates.argmin(axis=1)
+        return best, current - estimates[np.arange(len(best)), best]
+
+
+    def turn_phase_1(self, batch_state):
+        """ Knock when far enough ahead, otherwise take the face up card when it helps enough """
+
+        lead = self._estimates(batch_state, batch_state.opp_cards) - self._estimates(batch_state, batch_state.self_cards)
+        position, gain = self._best_swap(batch_state, batch_state.face_up)
+
+        decisions = np.where(gain >= self.card_margin, FACE_UP_CARD, FACE_DOWN_CARD)
+        return np.where(lead >= self.min_distance, KNOCK, decisions)
+
+
+    def turn_phase_2(self, batch_state):
+        """ Swap into the position that lowers the estimated score most - or return the card when nothing improves """
+
+        position, gain = self._best_swap(batch_state, batch_state.card)
+        return np.where(batch_state.can_return & (gain <= 0), RETURN_TO_DECK, position)
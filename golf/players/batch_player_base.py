@@ -0,0 +1,84 @@
+''' Base class for players that make decisions for many boards at once '''
+
+
+class BatchPlayer(object):
+    ''' Batch players receive a golf.batch_board.BatchState describing a set of boards
+        and return one decision per board as an array
+    '''
+
+    is_batch = True
+
+    def __init__(self, verbose=False, *args, **kwargs):
+        self.verbose = verbose
+
+
+    def __repr__(self):
+        return 'Batch Player'
+
+
+    def turn_phase_1(self, batch_state):
+        """ Phase 1 of the turn for every board in the batch
+            Args:
+                batch_state: BatchState for the boards where it is this player's turn
+            Return:
+                int array with one of FACE_UP_CARD, FACE_DOWN_CARD, KNOCK per board
+        """
+        raise NotImplementedError
+
+
+    def turn_phase_2(self, batch_state):
+        """ Phase 2 of the turn for every board in the batch - batch_state.card holds the
+            card in hand and batch_state.can_return whether it may go back to the deck
+            Return:
+                int array with the hand index to swap into (col * 2 + row) or RETURN_TO_DECK
+        """
+        raise NotImplementedError
+
+
+class BatchPlayerAdapter(BatchPlayer):
+    ''' Wrap a regular Player so that it can sit at a BatchBoard - decisions are made
+        one board at a time with the same dict state Board would have given it
+    '''
+
+    phase_1_moves = ('face_up_card', 'face_down_card', 'knock',)
+
+    def __init__(self, player, *args, **kwargs):
+        super(BatchPlayerAdapter, self).__init__(*args, **kwargs)
+        self.player = player
+
+
+    def __repr__(self):
+        return 'Batch {}'.format(self.player)
+
+
+    def turn_phase_1(self, batch_state):
+        decisions = []
+        for i in range(len(batch_state)):
+            decision = self.player.turn_phase_1(batch_state.get_state_for_player(i), self.phase_1_moves)
+
+            # Anything that is not knock or face up card is treated as the face down card, just like Board
+            if decision in ('face_up_card', 'knock'):
+                decisions.append(self.phase_1_moves.index(decision))
+            else:
+                decisions.append(1)
+
+        return decisions
+
+
+    def turn_phase_2(self, batch_state):
+        decisions = []
+        for i in range(len(batch_state)):
+            if batch_state.can_return[i]:
+                possible_moves = ('swap', 'return_to_deck',)
+            else:
+                possible_moves = ('swap',)
+
+            decision = self.player.turn_phase_2(int(batch_state.card[i]),
+                                                batch_state.get_state_for_player(i),
+                                                possible_moves)
+            if decision[0] == 'swap':
+                decisions.append((decision[2] * 2) + decision[1])
+            else:
+                decisions.append(-1)
+
+        return decisions
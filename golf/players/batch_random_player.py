@@ -0,0 +1,31 @@
+# A Random player for the batch board - who makes their choice randomly at every step, on every board
+import numpy as np
+from golf.players.batch_player_base import BatchPlayer
+
+class BatchRandomPlayer(BatchPlayer):
+
+
+    def __init__(self, seed=None, *args, **kwargs):
+        super(BatchRandomPlayer, self).__init__(*args, **kwargs)
+        self.rng = np.random.RandomState(seed)
+
+
+    def __repr__(self):
+
+        return 'Batch Random Player'
+
+
+    def turn_phase_1(self, batch_state):
+        """ face_up_card, face_down_card or knock - with equal probability """
+
+        return self.rng.randint(0, 3, len(batch_state))
+
+
+    def turn_phase_2(self, batch_state):
+        """ Return the card half of the time when that is allowed, otherwise swap at random """
+
+        n = len(batch_state)
+        positions = self.rng.randint(0, batch_state.self_cards.shape[1], n)
+        returned = batch_state.can_return & (self.rng.randint(0, 2, n) == 1)
+
+        return np.where(returned, -1, positions)
@@ -1,6 +1,7 @@
 ''' Player based solely on probabilities '''
 from golf.players.player_base import Player
 from golf.players.player_utils import PlayerUtils
+from golf.players.decision_cache import DecisionCache
 import math
 
 class BayesballPlayer(Player, PlayerUtils):
@@ -30,9 +31,17 @@ class BayesballPlayer(Player, PlayerUtils):
         }
     '''
 
+    is_deterministic = True
 
-    def __init__(self, min_distance=8, card_margin=1, unknown_card_margin=1, num_cols=2, *args, **kwargs):
-        ''' Initialize player and set a minimum distance between scores to knock '''
+
+    def __init__(self, min_distance=8, card_margin=1, unknown_card_margin=1, num_cols=2,
+                 cache_size=0, cache_file=None, *args, **kwargs):
+        ''' Initialize player and set a minimum distance between scores to knock
+            Decisions are a pure function of the state, so they can be kept in an LRU cache of
+            cache_size entries - optionally snapshotted to cache_file.  Caching is off by default:
+            keys include the average unseen card, so in real play few decisions repeat and the
+            lookups cost about what they save - it pays off for replaying the same states.
+        '''
 
         super(BayesballPlayer, self).__init__(*args, **kwargs)
         self.min_distance = min_distance
@@ -48,6 +57,12 @@ class BayesballPlayer(Player, PlayerUtils):
         # our unknown cards are
         self.unknown_card_margin = unknown_card_margin
 
+        self.decision_cache = None
+        if cache_size:
+            self.decision_cache = DecisionCache(cache_size,
+                                                path=cache_file,
+                                                params=(min_distance, card_margin, unknown_card_margin, num_cols,))
+
 
     def __repr__(self):
         return 'Bayesball_Player'
@@ -65,7 +80,59 @@ class BayesballPlayer(Player, PlayerUtils):
 
 
 
+    def save_cache(self):
+        ''' Snapshot the decision cache to its cache file, if it has one '''
+
+        if self.decision_cache is not None and self.decision_cache.path:
+            self.decision_cache.save()
+
+
     def turn_phase_1(self, state, possible_moves=['face_up_card', 'face_down_card', 'knock']):
+        ''' Phase 1 decision - from the cache when the same decision has been made before '''
+
+        avg_card = self._calc_average_card(state)
+        if self.decision_cache is None:
+            return self._turn_phase_1(state, possible_moves, avg_card)
+
+        # The decision only depends on the known cards through their average, and on the opponents
+        # through their known score and number of unknown cards
+        self_state = state['self']
+        key = (1,
+               tuple(self_state['raw_cards']),
+               self_state['score'],
+               self_state['visible'].count(True),
+               tuple([(a['score'], a['raw_cards'].count(None)) for a in state['opp']]),
+               avg_card,
+               state['deck_up'][-1],
+               state['has_knocked'],
+               tuple(possible_moves))
+
+        decision = self.decision_cache.get(key)
+        if decision is None:
+            decision = self._turn_phase_1(state, possible_moves, avg_card)
+            self.decision_cache.put(key, decision)
+
+        return decision
+
+
+    def turn_phase_2(self, card, state, possible_moves=['return_to_deck', 'swap']):
+        ''' Phase 2 decision - from the cache when the same decision has been made before '''
+
+        avg_card = self._calc_average_card(state, card_in_hand=card)
+        if self.decision_cache is None:
+            return self._turn_phase_2(card, state, possible_moves, avg_card)
+
+        key = (2, card, tuple(state['self']['raw_cards']), avg_card, 'return_to_deck' in possible_moves)
+
+        decision = self.decision_cache.get(key)
+        if decision is None:
+            decision = self._turn_phase_2(card, state, possible_moves, avg_card)
+            self.decision_cache.put(key, decision)
+
+        return decision
+
+
+    def _turn_phase_1(self, state, possible_moves, avg_card):
         """ Let's calculate an assumption for the opponents hand and then make a decision -
             If we believe our hand to be better, than lets know -
             Otherwise we should take whichever card we think is better, the face-up or face down card
@@ -74,7 +141,6 @@ class BayesballPlayer(Player, PlayerUtils):
             so we'll take that possibility away.
         """
 
-        avg_card = self._calc_average_card(state)
         score_diff = self._calc_score_diff(state, avg_card)
 
         # remove knock from possible_moves if has_knocked == True in state
@@ -124,10 +190,9 @@ class BayesballPlayer(Player, PlayerUtils):
             return action_scores[0][0]
 
 
-    def turn_phase_2(self, card, state, possible_moves=['return_to_deck', 'swap']):
+    def _turn_phase_2(self, card, state, possible_moves, avg_card):
         """ Alternative turn_phase_2 method """
 
-        avg_card = self._calc_average_card(state, card_in_hand=card)
         pos_scores = []
 
         # Let's try replacing the card_in_hand at every position -
@@ -0,0 +1,108 @@
+''' Bounded least-recently-used cache of player decisions, with an optional snapshot on disk '''
+import os
+import cPickle
+
+
+class DecisionCache(object):
+    ''' Map canonical state keys to decisions, holding at most max_size of them.
+
+        Entries are kept in two generations of plain dicts - new and recently used entries go
+        into the current generation, and once it holds half of max_size the previous generation
+        is dropped and the current one takes its place.  This approximates least-recently-used
+        eviction without the per-lookup bookkeeping of an ordered dict.
+
+        A snapshot written by save() is only loaded again by a cache created with the same
+        params, so decisions from differently configured players never mix.
+    '''
+
+    def __init__(self, max_size=65536, path=None, params=None):
+        ''' Args:
+                max_size: maximum number of decisions held
+                path: optional snapshot file - loaded now if it exists, written by save()
+                params: anything picklable that identifies how the decisions were made
+        '''
+
+        self.max_size = max_size
+        self.path = path
+        self.params = params
+        self.hits = 0
+        self.misses = 0
+        self._current = {}
+        self._previous = {}
+
+        if path and os.path.isfile(path):
+            self.load(path)
+
+
+    def __len__(self):
+        return len(self._current) + len([a for a in self._previous if a not in self._current])
+
+
+    def __contains__(self, key):
+        return key in self._current or key in self._previous
+
+
+    def get(self, key, default=None):
+        ''' Look up a decision, counting the hit or miss '''
+
+        try:
+            value = self._current[key]
+        except KeyError:
+            try:
+                value = self._previous[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            # Used again - move it into the current generation
+            self.put(key, value)
+
+        self.hits += 1
+        return value
+
+
+    def put(self, key, value):
+        ''' Store a decision, dropping the oldest generation when the current one is full '''
+
+        self._current[key] = value
+
+        if len(self._current) >= max(self.max_size / 2, 1):
+            self._previous = self._current
+            self._current = {}
+
+
+    def items(self):
+        ''' All entries, the least recently used first '''
+
+        return [a for a in self._previous.items() if a[0] not in self._current] + self._current.items()
+
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.0
+
+
+    def save(self, path=None):
+        ''' Write a snapshot of the cache - the most recently used entries last '''
+
+        path = path or self.path
+        with open(path, 'wb') as outfile:
+            cPickle.dump({'params': self.params, 'entries': self.items()}, outfile, cPickle.HIGHEST_PROTOCOL)
+
+
+    def load(self, path):
+        ''' Add the entries of a snapshot made with the same params
+            Returns:
+                Boolean - whether the snapshot was used
+        '''
+
+        with open(path, 'rb') as infile:
+            snapshot = cPickle.load(infile)
+
+        if snapshot['params'] != self.params:
+            return False
+
+        for key, value in snapshot['entries']:
+            self.put(key, value)
+
+        return True
@@ -0,0 +1,146 @@
+''' Player that looks ahead - every candidate move is valued by Monte Carlo rollouts of the rest of the hole '''
+import time
+import multiprocessing
+import numpy as np
+from golf.players.player_base import Player
+from golf.players.player_utils import PlayerUtils
+from golf.players.batch_greedy_player import BatchGreedyPlayer
+from golf.rollout import RolloutEngine, PHASE_1_ACTIONS, _evaluate_in_worker
+from golf.batch_board import RETURN_TO_DECK
+
+class MonteCarloPlayer(Player, PlayerUtils):
+    ''' Samples the cards it has not seen (determinizations) and plays the hole out from each one
+        after every candidate move, with a greedy batch policy in both seats - then takes the move
+        with the best average result.  Every move is rolled out from the same determinizations.
+    '''
+
+    def __init__(self, rollouts=2000, time_budget=None, batch_size=256, processes=None, min_distance=8, card_margin=1,
+                 num_cols=2, seed=None, *args, **kwargs):
+        ''' Args:
+                rollouts: rollouts per decision, over all the candidate moves - None for no limit
+                time_budget: optional seconds per decision - the search stops at whichever budget runs out first
+                batch_size: rollouts played at once
+                processes: optional number of worker processes to split each decision's rollouts across
+                min_distance: rollout policy - knock once this far ahead
+                card_margin: rollout policy - take the face up card when it helps by at least this much
+                seed: optional seed for the rollouts - otherwise they use numpy's global random
+                      state, so seeded matches (match.seed_match) play out the same
+        '''
+
+        super(MonteCarloPlayer, self).__init__(*args, **kwargs)
+        self.rollouts = rollouts
+        self.time_budget = time_budget
+        self.processes = processes
+        self.num_cols = num_cols
+
+        self.policy = BatchGreedyPlayer(min_distance=min_distance, card_margin=card_margin)
+        self.engine = RolloutEngine(self.policy, batch_size=batch_size, num_cols=num_cols, seed=seed)
+
+        # Seeds the worker processes' rollouts for each decision
+        self.seed = seed
+        self.rng = np.random if seed is None else np.random.RandomState(seed)
+        self._pool = None
+
+        # Mean rollout value of each candidate in the latest decision
+        self.last_values = None
+
+        # Totals over every decision, for rollouts per second
+        self.decisions = 0
+        self.total_rollouts = 0
+        self.search_seconds = 0.0
+
+
+    def __repr__(self):
+        return 'Monte Carlo Player'
+
+
+    def __getstate__(self):
+        # The pool stays with this process - copies (e.g. sent to match workers) start their own
+        state = dict(self.__dict__)
+        state['_pool'] = None
+
+        # As does numpy's global random state
+        if self.seed is None:
+            del state['rng']
+
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.seed is None:
+            self.rng = np.random
+
+
+    @property
+    def rollouts_per_second(self):
+        ''' Rollouts per second of search, over every decision so far '''
+
+        return self.total_rollouts / self.search_seconds if self.search_seconds else 0.0
+
+
+    def close(self):
+        ''' Shut down the worker processes '''
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+    def _search(self, state, actions, card=None, drew_face_down=False):
+        ''' Roll out every action within the budget
+            Returns:
+                index of the action with the best average result
+        '''
+
+        start = time.time()
+        if self.processes and self.processes > 1:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.processes)
+
+            rollouts = None if self.rollouts is None else -(-self.rollouts // self.processes)
+            engine_args = (self.policy, self.engine.batch_size, self.num_cols,)
+            tasks = [(engine_args, self.rng.randint(2 ** 31 - 1), state, actions, card, drew_face_down, rollouts, self.time_budget,)
+                     for _ in range(self.processes)]
+
+            results = self._pool.map(_evaluate_in_worker, tasks, chunksize=1)
+            sums = sum([a[0] for a in results])
+            counts = sum([a[1] for a in results])
+        else:
+            sums, counts = self.engine.evaluate(state, actions, card, drew_face_down, self.rollouts, self.time_budget)
+
+        elapsed = time.time() - start
+        self.decisions += 1
+        self.total_rollouts += int(counts.sum())
+        self.search_seconds += elapsed
+
+        self.last_values = sums / counts
+        if self.verbose:
+            print 'Rollout values: {} - {} rollouts in {:.3f}s ({:.0f} rollouts/s)'.format(
+                self.last_values, counts.sum(), elapsed, counts.sum() / max(elapsed, 1e-9))
+
+        return int(np.argmax(self.last_values))
+
+
+    def turn_phase_1(self, state, possible_moves=['face_up_card', 'face_down_card', 'knock']):
+        ''' Roll out each of the possible moves '''
+
+        best = self._search(state, [PHASE_1_ACTIONS[a] for a in possible_moves])
+        return possible_moves[best]
+
+
+    def turn_phase_2(self, card, state, possible_moves=['return_to_deck', 'swap']):
+        ''' Roll out swapping the card into every position - and returning it when that is allowed '''
+
+        actions = range(self.num_cols * 2)
+        drew_face_down = 'return_to_deck' in possible_moves
+        if drew_face_down:
+            actions.append(RETURN_TO_DECK)
+
+        best = actions[self._search(state, actions, card, drew_face_down)]
+        if best == RETURN_TO_DECK:
+            return ('return_to_deck',)
+
+        row, col = self._calc_row_col_for_index(best)
+        return ('swap', row, col,)
@@ -2,6 +2,10 @@
 
 class Player(object):
 
+    # Players whose decisions depend only on the state they are given - a board with only
+    # deterministic players ends a game as soon as a position repeats, since it would loop forever
+    is_deterministic = False
+
     def __init__(self, verbose=False, *args, **kwargs):
         self.verbose = verbose
 
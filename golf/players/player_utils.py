@@ -10,18 +10,19 @@ class PlayerUtils(object):
     def _calc_known_cards(self, state, card_in_hand=None):
         ''' return an index of known cards '''
 
-        # Let's index the cards from 0-12 and just keep track of the cards that appear first
-        cards = [0] * 13
-
-        h = [a for a in state['self']['raw_cards'] if a != None] + \
-                    [a for a in sum([b['raw_cards'] for b in state['opp']], []) if a != None] + \
-                    state['deck_up']
-
-        # Let's iterate through the self, opp, and deck_up cards and increment the index for them
-        for card in [a for a in state['self']['raw_cards'] if a != None] + \
-                    [a for a in sum([b['raw_cards'] for b in state['opp']], []) if a != None] + \
-                    state['deck_up']:
-            cards[card] += 1
+        # Board keeps a running count of the known cards in the state - when it is there
+        # we only need to add the card in hand
+        if 'known_cards' in state:
+            cards = list(state['known_cards'])
+        else:
+            # Let's index the cards from 0-12 and just keep track of the cards that appear first
+            cards = [0] * 13
+
+            # Let's iterate through the self, opp, and deck_up cards and increment the index for them
+            for card in [a for a in state['self']['raw_cards'] if a != None] + \
+                        [a for a in sum([b['raw_cards'] for b in state['opp']], []) if a != None] + \
+                        state['deck_up']:
+                cards[card] += 1
 
         if card_in_hand != None:
             cards[card_in_hand] += 1
@@ -40,24 +41,33 @@ class PlayerUtils(object):
         return deck_down
 
 
+    def _calc_unknown_counts(self, known_cards):
+        ''' Calculate how many of each card are still unknown from the known cards '''
+
+        return [4 - a for a in known_cards]
+
+
     def _calc_average_card(self, state, card_in_hand=None):
         ''' Figure out the average card value left in the deck '''
 
         cards = self._calc_known_cards(state, card_in_hand)
-        deck_down = self._calc_unknown_cards(cards)
 
         num_known_cards = sum(cards)
-        known_cards =  sum([[i]*a for i, a in enumerate(cards)], [])
+        known_card_value = sum([min(i, 10) * a for i, a in enumerate(cards)])
 
-        return (300 - sum([min(a, 10) for a in known_cards])) / (52.0 - num_known_cards)
+        return (300 - known_card_value) / (52.0 - num_known_cards)
 
 
     def _calc_std_dev(self, state):
         ''' Calculate the standard deviation of the remaining cards '''
 
-        cards = self._calc_known_cards(state)
-        deck_down = self._calc_unknown_cards(cards)
-        return np.std(deck_down)
+        counts = self._calc_unknown_counts(self._calc_known_cards(state))
+        num_cards = float(sum(counts))
+        if not num_cards:
+            return 0.0
+
+        mean = sum([i * a for i, a in enumerate(counts)]) / num_cards
+        return math.sqrt(sum([a * ((i - mean) ** 2) for i, a in enumerate(counts)]) / num_cards)
 
 
     def _calc_row_col_for_index(self, index):
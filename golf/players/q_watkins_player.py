@@ -9,6 +9,7 @@ import time
 import numpy as np
 from golf.players.trainable_player_base import TrainablePlayer
 from golf.players.player_utils import PlayerUtils
+from golf.players.replay_buffer import ReplayBuffer
 import random
 
 class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
@@ -26,8 +27,20 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
         self._is_trainable = False # This will be over-written if self.setup_trainer() is run
 
         self.epsilon = 0 # Exploration
+        self.replay = None # Experience replay buffer - only used when training
         self.start_model_file = model_file
 
+        # Bumped whenever the weights are replaced, so scores cached for older weights are recomputed
+        self._weights_version = 0
+
+        # The latest evaluation of a (state, card, possible moves) - a trainable player evaluates the
+        # same state and card twice in a row, first in update_weights and then in turn_phase_2
+        self._evaluation = None
+
+        # Set by share_weights - the shared update count, and the optional lock held while updating
+        self._shared_version = None
+        self._shared_lock = None
+
         try:
             with open(model_file, 'rb') as model_file:
                 self.weights = cPickle.load(model_file)
@@ -47,6 +60,61 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
         return 'Q Watkins Player'
 
 
+    @property
+    def weights(self):
+        return self._weights
+
+
+    @weights.setter
+    def weights(self, value):
+        # Weights are replaced rather than changed in place, unless they are shared - see _apply_update
+        self._weights = value
+        self._weights_version = getattr(self, '_weights_version', 0) + 1
+        self._shared_version = None
+        self._shared_lock = None
+
+
+    def share_weights(self, buffer, lock=None):
+        ''' Train on weights held in shared memory, so every process sharing the buffer trains (and
+            plays with) the same weights.  Updates are added to the buffer in place - Hogwild style,
+            without a lock unless one is given.
+            Args:
+                buffer: multiprocessing array of len(weights) + 1 doubles - the weights, then a count
+                        of the updates made to them
+                lock: optional lock held for each update
+        '''
+
+        shared = np.frombuffer(buffer, dtype=np.float64)
+        self._weights = shared[:-1]
+        self._shared_version = shared[-1:]
+        self._shared_lock = lock
+
+
+    def _current_weights_version(self):
+        ''' Changes whenever the weights do - updates from other processes included when the weights are shared '''
+
+        if self._shared_version is None:
+            return self._weights_version
+
+        return self._shared_version[0]
+
+
+    def _apply_update(self, delta):
+        ''' Add delta to the weights - in place when they are shared '''
+
+        if self._shared_version is None:
+            self.weights = self.weights + delta
+            return
+
+        if self._shared_lock is not None:
+            with self._shared_lock:
+                self._weights += delta
+                self._shared_version += 1
+        else:
+            self._weights += delta
+            self._shared_version += 1
+
+
     @property
     def is_trainable(self):
         return self._is_trainable
@@ -73,12 +141,22 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
         self._is_trainable = value
 
 
-    def setup_trainer(self, checkpoint_dir, learning_rate=0.00001, epsilon=0.2, discount=0.7, *args, **kwargs):
+    @property
+    def is_deterministic(self):
+        # Fixed weights and no exploration
+        return not self._is_trainable and not self.epsilon
+
+
+    def setup_trainer(self, checkpoint_dir, learning_rate=0.00001, epsilon=0.2, discount=0.7,
+                      replay_size=0, replay_batch_size=32, replay_file=None, *args, **kwargs):
         ''' Setup the training variable
             Args:
                 checkpoint_dir: string -> Directory to store checkpoint files
                 learning_rate: float -> single rate for now, may change to be a schedule
                 eval_freq: integer -> iterations between running an evaluation
+                replay_size: integer -> transitions kept for experience replay, 0 trains online only
+                replay_batch_size: integer -> transitions sampled for each replayed weight update
+                replay_file: string -> optional file to memory-map the replay buffer to
         '''
 
         self.epsilon = epsilon
@@ -92,6 +170,11 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
         self._is_trainable = True
         self.q_state = None
 
+        self.replay_batch_size = replay_batch_size
+        self.replay = None
+        if replay_size:
+            self.replay = ReplayBuffer(replay_size, num_features=len(self.weights), path=replay_file)
+
         # Introspect the number of epochs from a checkpoint file in proper format
         try:
             self.starting_epochs = int(self.start_model_file.split('_')[-1].split('.')[0])
@@ -110,10 +193,35 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
         with open(file_path, 'wb') as outfile:
             cPickle.dump(self.weights, outfile)
 
+        if self.replay is not None:
+            self.replay.flush()
+
         if self.verbose:
             print 'Saved checkpoint: {}'.format(file_path)
 
 
+    def frozen_copy(self):
+        ''' Copy of the player with training switched off - the replay buffer stays with this player
+            and is flushed so what is on disk matches the checkpoint, and shared weights are copied
+        '''
+
+        replay, self.replay = self.replay, None
+        lock, self._shared_lock = self._shared_lock, None
+        try:
+            player = super(QWatkinsPlayer, self).frozen_copy()
+        finally:
+            self.replay = replay
+            self._shared_lock = lock
+
+        # A snapshot of shared weights - no longer shared
+        player.weights = np.array(self.weights)
+
+        if replay is not None:
+            replay.flush()
+
+        return player
+
+
     def update_learning_rate(self, epochs, eval_results):
         """ Implement a learning rate schedule to encourage convergence """
 
@@ -130,13 +238,14 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
     def turn_phase_1(self, state, possible_moves=['face_up_card', 'face_down_card', 'knock']):
         ''' Takes the state of the board and responds with the turn_phase_1 move recommended '''
 
-        self._cache_state_derivative_values(state)
         turn = self._take_turn(state, possible_moves)
         return turn
 
 
-    def update_weights(self, state, card=None, reward=0, possible_moves=[]):
-        ''' Takes a new state and executes the weight update '''
+    def update_weights(self, state, card=None, reward=0, possible_moves=[], terminal=False):
+        ''' Takes a new state and executes the weight update - when replay is enabled the transition
+            is stored and a minibatch of past transitions is used for the update instead
+        '''
         # It's possible this player gets called before they have ever gone - in that case ignore the results
 
         was_verbose = self.verbose
@@ -146,15 +255,21 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
 
         old_q_state = dict(self.q_state)
 
-        self._cache_state_derivative_values(state, card)
-
         # For the update weights - this needs to be the optimal move - so no epsilon randomness should be used
         self._take_turn(state, possible_moves, card, epsilon=0)
 
-        self._update_weights( q_state_obj=old_q_state,
-                              q_prime_state_obj=self.q_state,
-                              reward=reward, # Since this update will never result from an exit state
-                              learning_rate=self.learning_rate)
+        if self.replay is not None:
+            self.replay.add(old_q_state['raw_features'], old_q_state['offset'], reward,
+                            self.q_state['raw_features'], self.q_state['offset'], terminal)
+
+            if len(self.replay) >= self.replay_batch_size:
+                self._update_weights_batch(self.replay.sample(self.replay_batch_size), self.learning_rate)
+        else:
+            self._update_weights( q_state_obj=old_q_state,
+                                  q_prime_state_obj=self.q_state,
+                                  reward=reward,
+                                  learning_rate=self.learning_rate,
+                                  terminal=terminal)
 
         if was_verbose:
             self.verbose = True
@@ -163,7 +278,6 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
     def turn_phase_2(self, card, state, possible_moves=['return_to_deck', 'swap']):
         ''' Takes the state of the board and responds with the turn phase 2 move recommended '''
 
-        self._cache_state_derivative_values(state, card)
         turn = self._take_turn(state, possible_moves, card)
         return turn
 
@@ -172,7 +286,7 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
         """ Since the general move logic will be the same for the first and the second phase
             of the players turn, let's further abstract that out into this method
         """
-        turn_decisions = self._calc_move_score(state, possible_moves, card)
+        turn_decisions = self._evaluate(state, possible_moves, card)
         turn_decisions.sort(key=lambda x: x['score'], reverse=True)
         # if we're training then we're going to need to save the value of the Q-State for updating weights later
         # Q(s,a) -> calculated value of the Q-State that we're committing to
@@ -192,7 +306,8 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
                 if self.verbose and self.is_trainable:
                     print 'Taking the optimal decision'
 
-            self.q_state = decision
+            # Keep the opponent score the q-state was valued against, so it can be replayed later
+            self.q_state = dict(decision, offset=self.min_opp_score)
         else:
             if self.verbose and self.is_trainable:
                 print 'Taking the optimal decision'
@@ -207,6 +322,46 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
         return decision['action']
 
 
+    def _state_fingerprint(self, state, possible_moves, card_in_hand=None):
+        ''' Everything the evaluation of the moves depends on, other than the weights '''
+
+        deck_up = state['deck_up']
+        return (card_in_hand,
+                tuple(possible_moves),
+                tuple(state['self']['raw_cards']),
+                tuple([tuple(a['raw_cards']) for a in state['opp']]),
+                tuple(self._calc_known_cards(state)),
+                deck_up[-1] if deck_up else None,)
+
+
+    def _evaluate(self, state, possible_moves, card_in_hand=None):
+        ''' Scored moves, as _calc_move_score - the derived values and features are reused when the
+            last evaluation had the same fingerprint, and the scores too when the weights are unchanged
+            Returns:
+                a new list of the move dicts
+        '''
+
+        fingerprint = self._state_fingerprint(state, possible_moves, card_in_hand)
+        evaluation = self._evaluation
+
+        if evaluation is None or evaluation['fingerprint'] != fingerprint:
+            self._cache_state_derivative_values(state, card_in_hand)
+            evaluation = self._evaluation = {'fingerprint': fingerprint,
+                                             'derived': (self.avg_card, self.card_std_dev,
+                                                         self.min_opp_score, self.self_avg_score,),
+                                             'raw_features': self._calc_move_features(state, possible_moves, card_in_hand),
+                                             'weights_version': None}
+        else:
+            self.avg_card, self.card_std_dev, self.min_opp_score, self.self_avg_score = evaluation['derived']
+
+        version = self._current_weights_version()
+        if evaluation['weights_version'] != version:
+            evaluation['moves'] = self._score_moves(possible_moves, evaluation['raw_features'])
+            evaluation['weights_version'] = version
+
+        return list(evaluation['moves'])
+
+
     def _cache_state_derivative_values(self, state, card_in_hand=None):
         """ In order to calculate the features that the model is based on, we'll need to know
             a couple of important values - we should just calculate these once per turn phase
@@ -218,35 +373,42 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
         self.self_avg_score = state['self']['score'] + len([b for b in state['self']['raw_cards'] if b == None]) * self.avg_card
 
 
-    def _extract_features_from_state(self, state, replacement_card=None, location=None):
-        """
-            Calculate the feature vector that we will use.  It is based upon replacing the
-            unknown cards with different "scenarios" - calculated with 1 and 2 std dev intervals
-        """
+    def _calc_substitutions(self):
+        """ Values assumed for unknown cards - the average card +/- 1 and 2 std dev intervals """
 
-        # Calculate the substitution values based on on avg card +/- 1 and 2 sigma values
-        substitutions = np.array([ min(max(self.avg_card + (self.card_std_dev * val), 0), 12) for val in [0, 1, 2, -1, -2]])
-        result = np.array([])
+        substitutions = np.clip(self.avg_card + (self.card_std_dev * np.array([0, 1, 2, -1, -2])), 0, 12)
+        return np.minimum(substitutions, 10)
 
-        for sub in substitutions:
-            result = np.append(result, self._calc_score_with_replacement(state['self']['raw_cards'],
-                                                                         replacement_card,
-                                                                         location,
-                                                                         sub))
 
-        return result
+    def _calc_feature_tensor(self, state, replacements):
+        """
+            Calculate the feature vectors for placing each of the replacement cards at every
+            position of the hand, in a single pass.  A replacement of None leaves the hand as it is.
+            Returns:
+                float64 array of shape (len(replacements), num positions, 5)
+        """
 
+        raw_cards = state['self']['raw_cards']
+        num_positions = self.num_cols * 2
+        num_unknown = len([a for a in raw_cards if a == None])
 
-    def _calc_swap_all_positions(self, state, replacement_card):
-        ''' calculate the features for swapping at all positions '''
+        # Score of the known cards, and number of unknown cards, for every (replacement, position)
+        known_scores = np.empty((len(replacements), num_positions))
+        unknown_cards = np.empty((len(replacements), num_positions))
 
-        # create a blank 2 dimensional array - which we will fill with new values
-        all_features = np.array([[None]*5]*(self.num_cols * 2))
+        for a, card in enumerate(replacements):
+            if card == None:
+                known_scores[a] = self._calc_score_for_cards(raw_cards)
+                unknown_cards[a] = num_unknown
+                continue
 
-        for i in range(self.num_cols * 2):
-            all_features[i] = self._extract_features_from_state(state, replacement_card, i)
+            for i in range(num_positions):
+                cards = list(raw_cards)
+                cards[i] = card
+                known_scores[a, i] = self._calc_score_for_cards(cards)
+                unknown_cards[a, i] = num_unknown - (raw_cards[i] == None)
 
-        return all_features
+        return known_scores[:, :, np.newaxis] + (unknown_cards[:, :, np.newaxis] * self._calc_substitutions())
 
 
     def _calc_scores(self, raw_features):
@@ -266,60 +428,90 @@ class QWatkinsPlayer(TrainablePlayer, PlayerUtils):
             Takes card param from turn_phase_2 when called by that method
         '''
 
+        return self._score_moves(actions, self._calc_move_features(state, actions, card_in_hand))
 
-        features = []
+
+    def _calc_move_features(self, state, actions, card_in_hand=None):
+        ''' Features for every action at every position - (actions x positions x 5) '''
+
+        # The card each action would place in the hand - None when the hand stays as it is
+        replacements = []
         for action in actions:
-            if action in ('face_up_card', 'face_down_card',):
-                # In this case we should try all of the swaps and take the maximum
-                if action == 'face_up_card':
-                    replacement = state['deck_up'][-1]
-                else:
-                    replacement = self.avg_card
+            if action == 'face_up_card':
+                replacements.append(state['deck_up'][-1])
+            elif action == 'face_down_card':
+                replacements.append(self.avg_card)
+            elif action == 'swap':
+                replacements.append(card_in_hand)
+            else:
+                # Not sure the assumed no replacement is 100% representative from a probability
+                # calc standpoint - should it take into account placing the card in hand back on the deck?
+                replacements.append(None)
 
-                raw_features = self._calc_swap_all_positions(state, replacement)
-                result = self._calc_scores(raw_features)
-                max_result = max(result.flatten())
+        return self._calc_feature_tensor(state, replacements)
 
-                features.append({'raw_features': raw_features[list(result.flatten()).index(max_result)],
-                                 'score': max_result,
-                                 'action': action})
 
+    def _score_moves(self, actions, raw_features):
+        ''' Score the features of every action with the current weights - one dict per move '''
+
+        # Scores for every action at every position - (actions x positions)
+        result = self._calc_scores(raw_features)
+
+        features = []
+        for a, action in enumerate(actions):
+            if action in ('face_up_card', 'face_down_card',):
+                # In this case we should try all of the swaps and take the maximum
+                i = np.argmax(result[a])
+                features.append({'raw_features': raw_features[a, i],
+                                 'score': result[a, i],
+                                 'action': action})
 
             elif action in ('knock', 'return_to_deck',):
-                # Send for the single feature calculation with no replacement - not sure this is 100% representative from
-                # a probability calc standpoint - should the assummed no replacement take into account the placing
-                # of the card in hand back on the top of the deck?  Does it already?
-                raw_features = self._extract_features_from_state(state, replacement_card=None, location=None)
-                result = self._calc_scores(raw_features)
-                features.append({'raw_features': raw_features,
-                                 'score': result,
+                features.append({'raw_features': raw_features[a, 0],
+                                 'score': result[a, 0],
                                  'action': action})
 
             elif action == 'swap':
-                # Calculate all of the swap values
-                raw_features = self._calc_swap_all_positions(state, card_in_hand)
-                result = self._calc_scores(raw_features)
-                for i, score in enumerate(result.flatten()):
+                for i, score in enumerate(result[a]):
                     row, col = self._calc_row_col_for_index(i)
-                    features.append({'raw_features': raw_features[i],
+                    features.append({'raw_features': raw_features[a, i],
                                      'score': score,
                                      'action': (action, row, col)})
 
         return features
 
 
-    def _update_weights(self, q_state_obj, q_prime_state_obj, reward, learning_rate):
-        ''' Update the weights associated for a particular Q-State '''
+    def _update_weights(self, q_state_obj, q_prime_state_obj, reward, learning_rate, terminal=False):
+        ''' Update the weights associated for a particular Q-State
+            Args:
+                terminal: Boolean - the hole is over, so there is no Q(s`,a`) to look ahead to
+        '''
 
         # It's possible the weights have changed since the score calculation (in the case of the final weight update
-        # so it's possible we need to re-calculate the score of the old_q_state
-        q_state_obj['score'] = self._calc_scores(q_state_obj['raw_features'])
+        # so it's possible we need to re-calculate the score of the old_q_state - against the opponent score it was
+        # valued with, as a replayed transition is
+        q_state_obj['score'] = np.dot(q_state_obj['offset'] - q_state_obj['raw_features'], self.weights)
 
         # difference = [r + gamma * max Q(s`,a`)] - Q(s,a)
-        difference = (reward + (self.discount * q_prime_state_obj['score'])) - q_state_obj['score']
+        q_prime_score = 0 if terminal else q_prime_state_obj['score']
+        difference = (reward + (self.discount * q_prime_score)) - q_state_obj['score']
 
         # w_i <- w_i + (learning_rate * difference * f_i(s,a) where f_i is feature i
-        self.weights = self.weights + (learning_rate * difference * q_state_obj['raw_features'])
+        self._apply_update(learning_rate * difference * q_state_obj['raw_features'])
+
+
+    def _update_weights_batch(self, transitions, learning_rate):
+        ''' Update the weights from a minibatch of replayed transitions (see replay_buffer.transition_dtype),
+            averaging the same update _update_weights makes for a single transition
+        '''
+
+        features = transitions['features']
+        q_scores = np.dot(transitions['offset'][:, np.newaxis] - features, self.weights)
+        q_prime_scores = np.dot(transitions['next_offset'][:, np.newaxis] - transitions['next_features'], self.weights)
+        q_prime_scores[transitions['terminal']] = 0
+
+        difference = (transitions['reward'] + (self.discount * q_prime_scores)) - q_scores
+        self._apply_update(learning_rate * np.dot(difference, features) / len(transitions))
 
 
     def _initialize_blank_model(self, length=5):
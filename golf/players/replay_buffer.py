@@ -0,0 +1,129 @@
+''' Fixed size store of q-learning transitions, so experience can be replayed in minibatches
+    rather than thrown away after a single online update
+'''
+import os
+import json
+import numpy as np
+
+
+def transition_dtype(num_features):
+    ''' Record layout of a single transition
+        features / offset: the q-state taken - its score is dot(offset - features, weights)
+        reward: reward received for the transition
+        next_features / next_offset: the best q-state available from the next state
+        terminal: True when there is no next state to bootstrap from
+    '''
+
+    return np.dtype([('features', np.float64, (num_features,)),
+                     ('offset', np.float64),
+                     ('reward', np.float64),
+                     ('next_features', np.float64, (num_features,)),
+                     ('next_offset', np.float64),
+                     ('terminal', np.bool_)])
+
+
+class ReplayBuffer(object):
+    ''' Ring buffer of transitions held in a numpy structured array - once full the oldest
+        transitions are overwritten.  When a path is given the array is memory-mapped to that
+        file (with the fill level kept in a small json sidecar) so a buffer can outgrow memory
+        and be picked up again by a later training run.
+    '''
+
+    def __init__(self, capacity, num_features=5, path=None, seed=None):
+        ''' Args:
+                capacity: maximum number of transitions held
+                num_features: length of the feature vectors
+                path: optional file to memory-map the transitions to
+                seed: optional seed for minibatch sampling
+        '''
+
+        self.capacity = capacity
+        self.num_features = num_features
+        self.path = path
+        self.size = 0
+        self.position = 0
+        self._rng = np.random.RandomState(seed) if seed is not None else np.random
+
+        dtype = transition_dtype(num_features)
+        if path is None:
+            self.data = np.zeros(capacity, dtype=dtype)
+        elif os.path.isfile(path):
+            self.data = np.memmap(path, dtype=dtype, mode='r+', shape=(capacity,))
+            self._load_meta()
+        else:
+            self.data = np.memmap(path, dtype=dtype, mode='w+', shape=(capacity,))
+
+
+    @classmethod
+    def open(cls, path):
+        ''' Open an existing memory-mapped buffer, with the shape recorded when it was flushed '''
+
+        with open(path + '.meta', 'r') as infile:
+            meta = json.load(infile)
+
+        return cls(meta['capacity'], num_features=meta['num_features'], path=path)
+
+
+    def __len__(self):
+        return self.size
+
+
+    def _meta_path(self):
+        return self.path + '.meta'
+
+
+    def _load_meta(self):
+        ''' Restore the fill level of an existing memory-mapped buffer '''
+
+        try:
+            with open(self._meta_path(), 'r') as infile:
+                meta = json.load(infile)
+        except IOError:
+            return
+
+        if meta['capacity'] != self.capacity or meta['num_features'] != self.num_features:
+            raise ValueError('Replay file {} was written with a different shape'.format(self.path))
+
+        self.size = meta['size']
+        self.position = meta['position']
+
+
+    def add(self, features, offset, reward, next_features, next_offset, terminal=False):
+        ''' Store a single transition, overwriting the oldest once the buffer is full '''
+
+        self.data[self.position] = (features, offset, reward, next_features, next_offset, terminal)
+
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+
+    def transitions(self):
+        ''' The stored transitions - a view, not a copy, for memory-mapped buffers '''
+
+        return self.data[:self.size]
+
+
+    def sample(self, batch_size):
+        ''' Draw a minibatch of transitions uniformly (with replacement)
+            Returns:
+                structured array of batch_size transitions - a copy, safe to hold on to
+        '''
+
+        if not self.size:
+            raise ValueError('Cannot sample from an empty replay buffer')
+
+        return self.data[self._rng.randint(0, self.size, batch_size)]
+
+
+    def flush(self):
+        ''' Write a memory-mapped buffer and its fill level to disk '''
+
+        if self.path is None:
+            return
+
+        self.data.flush()
+        with open(self._meta_path(), 'w') as outfile:
+            json.dump({'capacity': self.capacity,
+                       'num_features': self.num_features,
+                       'size': self.size,
+                       'position': self.position}, outfile)
@@ -0,0 +1,115 @@
+''' Player that looks every decision up in the tables precomputed by golf.solver '''
+from golf.players.player_base import Player
+from golf.players.player_utils import PlayerUtils
+from golf import solver
+
+
+# Tables solved in this process, keyed by horizon - solving takes a few seconds
+_SOLVED_TABLES = {}
+
+
+class TablePlayer(Player, PlayerUtils):
+    ''' Plays the expected-value-optimal move for the solver's abstraction of the state -
+        each decision is a single lookup into a (memory-mapped) table.
+
+        Knocks when the expected margin over the best opponent from knocking now - their hand
+        as it stands against the opponent's with the one turn they have left - is at least as
+        good as the expected margin from both players playing on for knock_horizon turns.
+    '''
+
+    is_deterministic = True
+
+    def __init__(self, table_dir=None, horizon=3, knock_horizon=2, num_cols=2, *args, **kwargs):
+        ''' Args:
+                table_dir: directory of tables saved by solver.save_tables - when not given the
+                           tables are solved (once per process) on first use
+                horizon: turns left assumed on a normal turn when solving tables - saved tables keep
+                         the horizon they were solved with
+                knock_horizon: turns of play compared against knocking - at most the table horizon
+        '''
+
+        super(TablePlayer, self).__init__(*args, **kwargs)
+
+        if num_cols != 2:
+            raise ValueError('Tables are only solved for the 2 column game')
+
+        if not table_dir and knock_horizon > horizon:
+            raise ValueError('knock_horizon {} is beyond the table horizon {}'.format(knock_horizon, horizon))
+
+        self.num_cols = num_cols
+        self.table_dir = table_dir
+        self.horizon = horizon
+        self.knock_horizon = knock_horizon
+        self._tables = None
+
+        # Saved tables are memory-mapped, so loading them now is cheap - and checks their horizon
+        if table_dir:
+            self.tables
+
+
+    def __repr__(self):
+        return 'Table Player'
+
+
+    @property
+    def tables(self):
+        if self._tables is None:
+            if self.table_dir:
+                tables = solver.load_tables(self.table_dir)
+                if self.knock_horizon >= len(tables['values']):
+                    raise ValueError('knock_horizon {} is beyond the horizon {} of the tables in {}'.format(
+                        self.knock_horizon, len(tables['values']) - 1, self.table_dir))
+                self._tables = tables
+            else:
+                if self.horizon not in _SOLVED_TABLES:
+                    _SOLVED_TABLES[self.horizon] = solver.solve(self.horizon)
+                self._tables = _SOLVED_TABLES[self.horizon]
+
+        return self._tables
+
+
+    def __getstate__(self):
+        # Tables are reloaded (or re-solved) rather than copied to other processes
+        state = dict(self.__dict__)
+        state['_tables'] = None
+        return state
+
+
+    def turn_phase_1(self, state, possible_moves=['face_up_card', 'face_down_card', 'knock']):
+        ''' Knock when playing on is not expected to improve the margin, otherwise take the better draw '''
+
+        tables = self.tables
+        bucket = solver.card_bucket(self._calc_known_cards(state))
+        hand = solver.hand_index(state['self']['raw_cards'])
+
+        if 'knock' in possible_moves and not state['has_knocked']:
+            values = tables['values']
+            opp_hands = [solver.hand_index(a['raw_cards']) for a in state['opp']]
+
+            knock_margin = values[0, bucket, hand] - min([values[1, bucket, a] for a in opp_hands])
+            play_margin = values[self.knock_horizon, bucket, hand] - \
+                          min([values[self.knock_horizon, bucket, a] for a in opp_hands])
+
+            if knock_margin <= play_margin:
+                return 'knock'
+
+        turn = solver.LAST_TURN if state['has_knocked'] else solver.NORMAL_TURN
+        if tables['phase_1'][turn, bucket, hand, state['deck_up'][-1]] == solver.FACE_UP_CARD:
+            return 'face_up_card'
+
+        return 'face_down_card'
+
+
+    def turn_phase_2(self, card, state, possible_moves=['return_to_deck', 'swap']):
+        ''' Swap the card in hand into the best slot, or return it to the deck '''
+
+        bucket = solver.card_bucket(self._calc_known_cards(state, card_in_hand=card))
+        hand = solver.hand_index(state['self']['raw_cards'])
+        turn = solver.LAST_TURN if state['has_knocked'] else solver.NORMAL_TURN
+
+        move = self.tables['phase_2'][turn, bucket, hand, card, int('return_to_deck' in possible_moves)]
+        if move == solver.RETURN_TO_DECK:
+            return ('return_to_deck',)
+
+        row, col = self._calc_row_col_for_index(move)
+        return ('swap', row, col,)
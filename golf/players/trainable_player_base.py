@@ -1,5 +1,6 @@
 ''' Base class for trainable players '''
 
+import copy
 from golf.players.player_base import Player
 
 class TrainablePlayer(Player):
@@ -43,9 +44,9 @@ class TrainablePlayer(Player):
         raise NotImplementedError
 
 
-    def update_weights(self, state, card=None, reward=0, possible_moves=[]):
+    def update_weights(self, state, card=None, reward=0, possible_moves=[], terminal=False):
         """ Trainable players should implement this method so that weight updates
-            can happen after a turn
+            can happen after a turn - terminal is True for the final update once the game is over
         """
 
         raise NotImplementedError
@@ -60,4 +61,14 @@ class TrainablePlayer(Player):
                          always be the first in the pair of results.
         """
 
-        pass
\ No newline at end of file
+        pass
+
+
+    def frozen_copy(self):
+        """ Copy of the player with training switched off - a snapshot of the current weights
+            that can be evaluated and saved while this player carries on training
+        """
+
+        player = copy.deepcopy(self)
+        player.is_trainable = False
+        return player
@@ -0,0 +1,87 @@
+''' Opt-in instrumentation - cumulative wall time and call counts for each phase of a game '''
+import os
+import cProfile
+from collections import defaultdict
+from timeit import default_timer as clock
+
+
+# Phases timed by Board.play_game
+PHASES = ('deal', 'state', 'phase_1', 'phase_2', 'update_weights', 'reshuffle',)
+
+
+class PhaseTimer(object):
+    ''' Collect cumulative wall time and call counts, keyed by (phase, player id, player name).
+        Phases that do not belong to a player (dealing, reshuffling) use an id and player of None.
+        Players are keyed by id and name - the id is the player's index in the match, which stays
+        the same as the seats swap, so the two players of self-play get a row each - and timers
+        filled in worker processes can be merged.
+    '''
+
+    def __init__(self):
+        self.times = defaultdict(float)
+        self.counts = defaultdict(int)
+
+
+    def add(self, phase, player, elapsed, player_id=None):
+        ''' Record one call of a phase that took elapsed seconds
+            Args:
+                player_id: index of the player in the match - None for phases that do not belong to a player
+        '''
+
+        key = (phase, player_id, None if player is None else str(player))
+        self.times[key] += elapsed
+        self.counts[key] += 1
+
+
+    def merge(self, other):
+        ''' Add the times and counts from another timer - e.g. one filled in a worker process '''
+
+        for key, elapsed in other.times.items():
+            self.times[key] += elapsed
+        for key, count in other.counts.items():
+            self.counts[key] += count
+
+
+    def phase_totals(self):
+        ''' Total time per phase, summed over all players '''
+
+        totals = defaultdict(float)
+        for (phase, player_id, player), elapsed in self.times.items():
+            totals[phase] += elapsed
+
+        return dict(totals)
+
+
+    def report(self):
+        ''' Rows of (phase, player id, player, calls, total seconds, microseconds per call), slowest first '''
+
+        rows = []
+        for key, elapsed in self.times.items():
+            phase, player_id, player = key
+            rows.append((phase, player_id, player, self.counts[key], elapsed, 1e6 * elapsed / self.counts[key]))
+
+        rows.sort(key=lambda x: x[4], reverse=True)
+        return rows
+
+
+    def __str__(self):
+        lines = ['{:<16}{:<6}{:<24}{:>10}{:>12}{:>12}'.format('phase', 'id', 'player', 'calls', 'total s', 'us/call')]
+        for phase, player_id, player, calls, elapsed, per_call in self.report():
+            lines.append('{:<16}{:<6}{:<24}{:>10}{:>12.4f}{:>12.2f}'.format(phase, '-' if player_id is None else player_id, player or '-',
+                                                                            calls, elapsed, per_call))
+
+        return '\n'.join(lines)
+
+
+def profile_call(profile_path, func, *args, **kwargs):
+    ''' Run func under cProfile and dump the stats to profile_path '''
+
+    directory = os.path.dirname(profile_path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, *args, **kwargs)
+    finally:
+        profile.dump_stats(profile_path)
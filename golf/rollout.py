@@ -0,0 +1,223 @@
+''' Batched Monte Carlo rollouts from a player's view of a game
+
+    A determinization deals the cards the player has not seen - consistent with
+    PlayerUtils._calc_unknown_cards - into the hidden places of both hands and the face down deck.
+    Each rollout plays a determinization out to the end of the hole on a BatchBoard, with a batch
+    policy in both seats after the candidate action, so a whole batch of rollouts costs about as
+    much as one game of numpy operations per turn.
+
+    What the opponent has seen of the player's hand is not part of the state, so in rollouts the
+    opponent sees only its own bottom row and the cards the player can see.
+'''
+import time
+import numpy as np
+from batch_board import BatchBoard, FACE_UP_CARD, FACE_DOWN_CARD, KNOCK, RETURN_TO_DECK
+from golf.players.batch_greedy_player import BatchGreedyPlayer
+from golf.players.player_utils import PlayerUtils
+
+
+PHASE_1_ACTIONS = {'face_up_card': FACE_UP_CARD, 'face_down_card': FACE_DOWN_CARD, 'knock': KNOCK}
+
+
+class RolloutEngine(PlayerUtils):
+    ''' Runs batches of rollouts for candidate actions - the rollout player is always seat 0 '''
+
+    def __init__(self, policy=None, batch_size=256, num_cols=2, seed=None):
+        ''' Args:
+                policy: batch player for both seats during rollouts - a BatchGreedyPlayer by default
+                batch_size: rollouts played at once
+                num_cols: game board layout
+                seed: optional seed for the determinizations and reshuffles - otherwise they use
+                      numpy's global random state, so match.seed_match covers them
+        '''
+
+        self.policy = policy or BatchGreedyPlayer()
+        self.batch_size = batch_size
+        self.num_cols = num_cols
+        self.num_slots = num_cols * 2
+        self.seed = seed
+        self.rng = np.random if seed is None else np.random.RandomState(seed)
+        self._build_board()
+
+        # Totals over every batch played, for rollouts per second
+        self.rollouts = 0
+        self.seconds = 0.0
+
+
+    def _build_board(self):
+        self.board = BatchBoard([self.policy, self.policy], self.batch_size, self.num_cols, seed=self.rng.randint(2 ** 31 - 1))
+
+        # Reshuffles use the same random state as the determinizations, so seeding it repeats a search
+        self.board.board_shuffles = [self.rng.shuffle] * self.batch_size
+
+
+    def __getstate__(self):
+        # The board holds bound methods of the random state, which do not pickle - copies build their own
+        state = dict(self.__dict__)
+        del state['board']
+
+        # Numpy's global random state is the copy's own process's
+        if self.seed is None:
+            del state['rng']
+
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.seed is None:
+            self.rng = np.random
+
+        self._build_board()
+
+
+    @property
+    def rollouts_per_second(self):
+        return self.rollouts / self.seconds if self.seconds else 0.0
+
+
+    def determinize(self, state, card=None, n=None):
+        ''' Deal n determinizations of the cards unseen in a Board state
+            Args:
+                state: dict state from Board.get_state_for_player
+                card: the card in hand, during phase 2
+            Returns:
+                dict of set_position arguments for n boards
+        '''
+
+        n = n or self.batch_size
+        slots = self.num_slots
+        own = state['self']['raw_cards']
+        opp = state['opp'][0]['raw_cards']
+        deck_up = state['deck_up']
+
+        unseen = np.array(self._calc_unknown_cards(self._calc_known_cards(state, card)), dtype=np.int8)
+
+        own_hidden = [i for i, a in enumerate(own) if a is None]
+        opp_hidden = [i for i, a in enumerate(opp) if a is None]
+        num_hidden = len(own_hidden) + len(opp_hidden)
+
+        # A random order of the unseen cards for every rollout - the hidden cards come off the front
+        orders = unseen[np.argsort(self.rng.random_sample((n, len(unseen))), axis=1)]
+
+        hands = np.zeros((n, 2, slots), dtype=np.int8)
+        hands[:, 0] = [0 if a is None else a for a in own]
+        hands[:, 1] = [0 if a is None else a for a in opp]
+        hands[:, 0, own_hidden] = orders[:, :len(own_hidden)]
+        hands[:, 1, opp_hidden] = orders[:, len(own_hidden):num_hidden]
+
+        deck_down = np.zeros((n, 52), dtype=np.int8)
+        deck_down[:, :len(unseen) - num_hidden] = orders[:, num_hidden:]
+
+        up = np.zeros(52, dtype=np.int8)
+        up[:len(deck_up)] = list(deck_up)
+
+        self_revealed = np.zeros((2, slots), dtype=bool)
+        self_revealed[0] = state['self']['visible']
+        self_revealed[1, 0::2] = True
+        self_revealed[1] |= np.array([a is not None for a in opp])
+
+        opp_revealed = np.zeros((2, slots), dtype=bool)
+        opp_revealed[1] = [a is not None for a in opp]
+
+        return {'hands': hands,
+                'deck_down': deck_down,
+                'down_len': len(unseen) - num_hidden,
+                'deck_up': up,
+                'up_len': len(deck_up),
+                'self_revealed': self_revealed,
+                'opp_revealed': opp_revealed,
+                'has_knocked': bool(state.get('has_knocked', False))}
+
+
+    def rollout(self, position, action, card=None, drew_face_down=False):
+        ''' Play out every determinization of a position after one action
+            Args:
+                position: determinize() result
+                action: a phase 1 action (FACE_UP_CARD, FACE_DOWN_CARD or KNOCK) - or with a card in
+                        hand, the phase 2 hand index to swap into or RETURN_TO_DECK
+            Returns:
+                (n,) array of the opponent's score minus the player's - 0 for a forfeit
+        '''
+
+        start = time.time()
+        board = self.board
+        n = len(position['hands'])
+        boards = np.arange(n)
+
+        board.set_position(boards, card=card, drew_face_down=drew_face_down, **position)
+        board.done[n:] = True
+
+        active = np.zeros(self.batch_size, dtype=bool)
+        active[:n] = True
+        actions = np.full(self.batch_size, action, dtype=np.int32)
+        if card is None:
+            board.play_turn(active, phase_1=actions)
+        else:
+            board.play_phase_2(active, np.zeros(self.batch_size, dtype=np.int32), actions)
+            board.end_turn(active)
+
+        scores = board.play()[:n]
+
+        self.rollouts += n
+        self.seconds += time.time() - start
+        return (scores[:, 1] - scores[:, 0]).astype(np.float64)
+
+
+    def evaluate(self, state, actions, card=None, drew_face_down=False, rollouts=1000, time_budget=None):
+        ''' Estimate the value of every candidate action from the same determinizations - at least
+            one batch is played
+            Args:
+                actions: list of actions, as rollout() takes them
+                rollouts: stop once this many rollouts have been played over all the actions - or None
+                time_budget: optional seconds - stop once this long has passed
+            Returns:
+                (sums of the rollout values, number of rollouts) for each action - arrays
+        '''
+
+        if rollouts is None and time_budget is None:
+            raise ValueError('Rollouts need a rollout or a time budget')
+
+        sums = np.zeros(len(actions))
+        counts = np.zeros(len(actions), dtype=np.int64)
+        start = time.time()
+
+        while rollouts is None or counts.sum() < rollouts:
+            n = self.batch_size
+            if rollouts is not None:
+                n = min(n, -(-(rollouts - counts.sum()) // len(actions)))
+
+            position = self.determinize(state, card, n)
+            for i, action in enumerate(actions):
+                sums[i] += self.rollout(position, action, card, drew_face_down).sum()
+                counts[i] += n
+
+            if time_budget is not None and time.time() - start >= time_budget:
+                break
+
+        return sums, counts
+
+
+# The worker process's engine - built on the first task
+_worker = {}
+
+
+def _evaluate_in_worker(args):
+    ''' Pool worker - evaluate the actions with this process's engine, seeded for the task
+        Returns:
+            (sums, counts, rollouts per second in this worker)
+    '''
+
+    engine_args, seed, state, actions, card, drew_face_down, rollouts, time_budget = args
+    policy, batch_size, num_cols = engine_args
+
+    # The policy arrives as a new copy with every task - the engine is kept while its settings match
+    key = (type(policy), vars(policy), batch_size, num_cols,)
+    engine = _worker.get('engine')
+    if engine is None or _worker.get('key') != key:
+        engine = _worker['engine'] = RolloutEngine(policy, batch_size, num_cols)
+        _worker['key'] = key
+
+    engine.rng.seed(seed)
+    sums, counts = engine.evaluate(state, actions, card, drew_face_down, rollouts, time_budget)
+    return sums, counts, engine.rollouts_per_second
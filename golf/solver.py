@@ -0,0 +1,231 @@
+''' Offline solver for the 2 column game - precomputes expected-value-optimal decisions over
+    an abstraction of a player's information state and stores them as arrays for TablePlayer
+
+    The abstraction is:
+        hand: the player's own 4 slots, each a card code 0 -> 12 or UNKNOWN_CARD for a card they have not seen
+        card: the face up card (phase 1) or the card in hand (phase 2)
+        bucket: the average value of the cards not yet seen, rounded to 0 -> 10
+
+    Unseen cards - in the hand and drawn from the deck - are modeled as independent draws from
+    a distribution over card ranks with the bucket's average value.  Values are solved by backward
+    induction over a fixed number of remaining turns, where each turn the player may take the face
+    up card or draw, and the expected score of a hand is the value with no turns left.
+'''
+import os
+import sys
+import getopt
+import numpy as np
+from hand import COLUMN_SCORES as HAND_COLUMN_SCORES, UNKNOWN_CARD
+
+
+NUM_SLOTS = 4
+NUM_HANDS = 14 ** NUM_SLOTS
+NUM_BUCKETS = 11
+
+# Phase 1 decisions
+FACE_UP_CARD = 0
+FACE_DOWN_CARD = 1
+
+# Phase 2 decisions are the slot to swap into, or RETURN_TO_DECK
+RETURN_TO_DECK = NUM_SLOTS
+
+# Tables are solved for a normal turn and for the last turn (after the opponent knocked)
+NORMAL_TURN = 0
+LAST_TURN = 1
+
+TABLE_NAMES = ('values', 'phase_1', 'phase_2',)
+
+# Point value of each card rank
+CARD_VALUES = np.minimum(np.arange(13), 10).astype(np.float64)
+COLUMN_SCORES = np.array(HAND_COLUMN_SCORES, dtype=np.float64)
+
+
+def hand_index(raw_cards):
+    ''' Table index for a hand - raw_cards as handed to players, None for unseen cards '''
+
+    index = 0
+    for card in raw_cards:
+        index = index * 14 + (UNKNOWN_CARD if card is None else card)
+
+    return index
+
+
+def card_bucket(known_cards):
+    ''' Bucket for the average value of the unseen cards, given the 13 counts of seen cards '''
+
+    num_unknown = 52 - sum(known_cards)
+    if num_unknown <= 0:
+        return NUM_BUCKETS / 2
+
+    unknown_value = 300 - sum([CARD_VALUES[i] * a for i, a in enumerate(known_cards)])
+    return int(min(max(round(unknown_value / num_unknown), 0), NUM_BUCKETS - 1))
+
+
+def rank_distribution(mean):
+    ''' Distribution over the 13 card ranks with the given average value - the full deck
+        exponentially tilted towards higher or lower cards
+    '''
+
+    def tilted(theta):
+        weights = np.exp(theta * (CARD_VALUES - 5))
+        return weights / weights.sum()
+
+    # Bisection on the tilt - the average value increases with theta
+    low, high = -50.0, 50.0
+    for _ in range(100):
+        theta = (low + high) / 2
+        if np.dot(tilted(theta), CARD_VALUES) < mean:
+            low = theta
+        else:
+            high = theta
+
+    return tilted((low + high) / 2)
+
+
+def expected_column_scores(p):
+    ''' Expected score of every column [top code, bottom code], unseen cards drawn from p '''
+
+    # Distribution over codes for every code - known cards are certain, UNKNOWN_CARD follows p
+    codes = np.eye(14)[:, :13]
+    codes[UNKNOWN_CARD] = p
+
+    return np.dot(np.dot(codes, COLUMN_SCORES[:13, :13]), codes.T)
+
+
+def _hand_codes():
+    ''' (NUM_HANDS, 4) array of the card code in each slot of every hand index '''
+
+    return np.array(np.unravel_index(np.arange(NUM_HANDS), (14,) * NUM_SLOTS)).T
+
+
+def _swap_indices(codes):
+    ''' (NUM_HANDS, 4, 13) array of the hand index after placing each card in each slot '''
+
+    place = 14 ** np.arange(NUM_SLOTS - 1, -1, -1)
+    indices = np.arange(NUM_HANDS)[:, np.newaxis, np.newaxis] + \
+              (np.arange(13)[np.newaxis, np.newaxis, :] - codes[:, :, np.newaxis]) * place[np.newaxis, :, np.newaxis]
+
+    return indices.astype(np.int32)
+
+
+def _solve_turn(values, swaps, p):
+    ''' One step of backward induction
+        Args:
+            values: (NUM_HANDS,) expected final score of every hand with the remaining turns
+            swaps: hand indices from _swap_indices
+            p: distribution of unseen cards
+        Returns:
+            (values with one more turn, phase 1 table, phase 2 table)
+    '''
+
+    # Value of every (hand, card, slot) placement, then of the options for each card in hand
+    swapped = values[swaps]
+    options = np.concatenate([swapped, np.repeat(values[:, np.newaxis, np.newaxis], 13, axis=2)], axis=1)
+
+    phase_2 = np.empty((NUM_HANDS, 13, 2), dtype=np.int8)
+    phase_2[:, :, 0] = swapped.argmin(axis=1)
+    phase_2[:, :, 1] = options.argmin(axis=1)
+
+    face_up = swapped.min(axis=1)
+    face_down = np.dot(options.min(axis=1), p)
+
+    phase_1 = np.where(face_up <= face_down[:, np.newaxis], FACE_UP_CARD, FACE_DOWN_CARD).astype(np.int8)
+
+    # The next face up card is modeled as another draw from the unseen cards
+    return np.dot(np.minimum(face_up, face_down[:, np.newaxis]), p), phase_1, phase_2
+
+
+def solve(horizon=3):
+    ''' Solve the tables
+        Args:
+            horizon: number of turns a player is assumed to have left on a normal turn
+        Returns:
+            dict of arrays -
+                values: (horizon + 1, NUM_BUCKETS, NUM_HANDS) float32 - expected final score of a hand
+                        [turns left, bucket, hand]
+                phase_1: (2, NUM_BUCKETS, NUM_HANDS, 13) int8 - FACE_UP_CARD or FACE_DOWN_CARD
+                         for [turn type, bucket, hand, face up card]
+                phase_2: (2, NUM_BUCKETS, NUM_HANDS, 13, 2) int8 - slot to swap into or RETURN_TO_DECK
+                         for [turn type, bucket, hand, card in hand, can return to deck]
+    '''
+
+    codes = _hand_codes()
+    swaps = _swap_indices(codes)
+
+    tables = {'values': np.empty((horizon + 1, NUM_BUCKETS, NUM_HANDS), dtype=np.float32),
+              'phase_1': np.empty((2, NUM_BUCKETS, NUM_HANDS, 13), dtype=np.int8),
+              'phase_2': np.empty((2, NUM_BUCKETS, NUM_HANDS, 13, 2), dtype=np.int8)}
+
+    for bucket in range(NUM_BUCKETS):
+        p = rank_distribution(bucket)
+        columns = expected_column_scores(p)
+        values = columns[codes[:, 0], codes[:, 1]] + columns[codes[:, 2], codes[:, 3]]
+        tables['values'][0, bucket] = values
+
+        for turn in range(horizon):
+            next_values, phase_1, phase_2 = _solve_turn(values, swaps, p)
+            tables['values'][turn + 1, bucket] = next_values
+
+            if turn == 0:
+                # With no turns to follow this is the decision for the last turn
+                tables['phase_1'][LAST_TURN, bucket] = phase_1
+                tables['phase_2'][LAST_TURN, bucket] = phase_2
+
+            if turn == horizon - 1:
+                tables['phase_1'][NORMAL_TURN, bucket] = phase_1
+                tables['phase_2'][NORMAL_TURN, bucket] = phase_2
+
+            values = next_values
+
+    return tables
+
+
+def save_tables(tables, directory):
+    ''' Save solved tables as .npy files in a directory '''
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    for name in TABLE_NAMES:
+        np.save(os.path.join(directory, '{}.npy'.format(name)), tables[name])
+
+
+def load_tables(directory, mmap=True):
+    ''' Load tables saved by save_tables - memory-mapped (read-only) by default '''
+
+    mmap_mode = 'r' if mmap else None
+    return dict([(name, np.load(os.path.join(directory, '{}.npy'.format(name)), mmap_mode=mmap_mode))
+                 for name in TABLE_NAMES])
+
+
+def main(argv):
+    output = None
+    horizon = 3
+
+    usage = 'python solver.py --output=<table directory> --horizon=<turns left on a normal turn>'
+
+    try:
+        opts, args = getopt.getopt(argv, "h", ["output=", "horizon="])
+    except getopt.GetoptError:
+        print usage
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print usage
+            sys.exit(2)
+        elif opt in ("--output"):
+            output = arg
+        elif opt in ("--horizon"):
+            horizon = int(arg)
+
+    if not output:
+        print usage
+        sys.exit(2)
+
+    save_tables(solve(horizon), output)
+    print 'Saved tables to {}'.format(output)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,290 @@
+''' Hyperparameter sweeps over the train args of a trainable player (setup_trainer)
+
+    Trials are taken from a search space - every combination of a grid, or random draws - and
+    trained concurrently in a process pool, successive halving style: every trial trains for
+    min_epochs and is scored by its Trainer.process_checkpoint evaluation, then the best 1 / eta
+    carry on training for eta times as many epochs in total, and so on for each rung.  Every
+    evaluation is a row of a single csv results table.
+
+    A search space is a json dict of setup_trainer arg name to values - a list of values, or for a
+    random search {"uniform": [low, high]} or {"log_uniform": [low, high]}, e.g.
+        {"learning_rate": {"log_uniform": [1e-6, 1e-3]}, "epsilon": [0.1, 0.2], "discount": [0.7, 0.9]}
+'''
+import os
+import sys
+import csv
+import math
+import getopt
+import json
+import itertools
+import multiprocessing
+import numpy as np
+from trainer import Trainer
+from tournament import load_player
+from match import seed_match
+
+
+RESULT_FIELDS = ['trial', 'rung', 'epochs', 'score', 'wins', 'losses', 'status']
+
+
+def grid_trials(space):
+    ''' Every combination of the listed values - in a fixed order '''
+
+    names = sorted(space.keys())
+    for name in names:
+        if not isinstance(space[name], list):
+            raise ValueError('A grid search needs a list of values for {}'.format(name))
+
+    return [dict(zip(names, values)) for values in itertools.product(*[space[name] for name in names])]
+
+
+def _draw(values, rng):
+    if isinstance(values, list):
+        return values[rng.randint(len(values))]
+    if 'uniform' in values:
+        low, high = values['uniform']
+        return float(rng.uniform(low, high))
+    if 'log_uniform' in values:
+        low, high = values['log_uniform']
+        return float(math.exp(rng.uniform(math.log(low), math.log(high))))
+
+    raise ValueError('Unknown search space entry: {}'.format(values))
+
+
+def random_trials(space, num_trials, seed=None):
+    ''' num_trials random draws from the space '''
+
+    rng = np.random.RandomState(seed)
+    names = sorted(space.keys())
+    return [dict([(name, _draw(space[name], rng)) for name in names]) for _ in range(num_trials)]
+
+
+def _train_trial(args):
+    ''' Pool worker - train one trial from first_epoch for epochs more, then evaluate and checkpoint it
+        Returns:
+            (weights, evaluation result with the trial's wins first)
+    '''
+
+    player_spec, opponent_spec, train_args, weights, first_epoch, epochs, holes, eval_matches, seed = args
+    if seed is not None:
+        seed_match(seed, first_epoch)
+
+    player = load_player(player_spec)
+    if weights is not None:
+        player.weights = np.array(weights)
+    player.setup_trainer(**train_args)
+
+    trainer = Trainer(player, load_player(opponent_spec), trainable_player='player1', holes=holes)
+    trainer.benchmark_kwargs['num_matches'] = eval_matches
+    trainer.train_k_epochs(epochs, first_epoch=first_epoch)
+
+    return list(player.weights), trainer.eval_results[-1]
+
+
+class Sweep(object):
+    ''' Successive halving over a list of trials '''
+
+    def __init__(self, player_spec, opponent_spec, trials, train_args=None, output_dir='sweep', holes=9,
+                 min_epochs=10, eta=3, rungs=3, eval_matches=10, seed=0, results_path=None):
+        ''' Args:
+                player_spec: spec of the player to train - {"player": "file.ClassName", "args": {"init": {init args}}}
+                opponent_spec: spec of the player it trains against
+                trials: list of dicts of train args to try
+                train_args: train args shared by every trial
+                output_dir: every trial saves its checkpoints to a directory here
+                holes: holes per match
+                min_epochs: epochs every trial trains for before its first evaluation
+                eta: 1 / eta of the trials carry on after each rung, training eta times as many epochs in total
+                rungs: number of rounds of evaluation - the last keeps every remaining trial
+                eval_matches: matches played by each evaluation
+                seed: optional base seed - each trial and rung is seeded from it
+                results_path: csv results table - defaults to results.csv in output_dir
+        '''
+
+        self.player_spec = player_spec
+        self.opponent_spec = opponent_spec
+        self.trials = trials
+        self.train_args = train_args or {}
+        self.output_dir = output_dir
+        self.holes = holes
+        self.min_epochs = min_epochs
+        self.eta = eta
+        self.rungs = rungs
+        self.eval_matches = eval_matches
+        self.seed = seed
+        self.results_path = results_path or os.path.join(output_dir, 'results.csv')
+
+        self.param_names = sorted(set(itertools.chain(*[trial.keys() for trial in trials])))
+
+        # Rows of the results table - one for each evaluation
+        self.results = []
+
+
+    def rung_epochs(self, rung):
+        ''' Epochs a trial has trained for in total by the end of a rung '''
+
+        return self.min_epochs * (self.eta ** rung)
+
+
+    def _task(self, trial, weights, rung):
+        checkpoint_dir = os.path.join(self.output_dir, 'trial_{}'.format(trial))
+        if not os.path.isdir(checkpoint_dir):
+            os.makedirs(checkpoint_dir)
+
+        train_args = dict(self.train_args, checkpoint_dir=checkpoint_dir, **self.trials[trial])
+        first_epoch = self.rung_epochs(rung - 1) if rung else 0
+        seed = None if self.seed is None else '{}-{}'.format(self.seed, trial)
+
+        return (self.player_spec, self.opponent_spec, train_args, weights, first_epoch,
+                self.rung_epochs(rung) - first_epoch, self.holes, self.eval_matches, seed,)
+
+
+    def run(self, processes=None):
+        ''' Run every rung of the sweep, writing the results table as each rung finishes
+            Args:
+                processes: optional number of processes to train trials across
+            Returns:
+                the results rows of the final rung, best first
+        '''
+
+        if not os.path.isdir(self.output_dir):
+            os.makedirs(self.output_dir)
+
+        pool = None
+        if processes and processes > 1:
+            pool = multiprocessing.Pool(processes)
+
+        try:
+            # trial: weights to carry on training from
+            remaining = dict([(i, None) for i in range(len(self.trials))])
+            for rung in range(self.rungs):
+                order = sorted(remaining.keys())
+                tasks = [self._task(i, remaining[i], rung) for i in order]
+                if pool is not None:
+                    outcomes = pool.map(_train_trial, tasks, chunksize=1)
+                else:
+                    outcomes = [_train_trial(task) for task in tasks]
+
+                rows = []
+                for i, (weights, result) in zip(order, outcomes):
+                    remaining[i] = weights
+                    row = {'trial': i, 'rung': rung, 'epochs': self.rung_epochs(rung),
+                           'score': float(result[0] - result[1]) / self.eval_matches,
+                           'wins': result[0], 'losses': result[1]}
+                    row.update(self.trials[i])
+                    rows.append(row)
+
+                # Ties go to the earlier trial
+                rows.sort(key=lambda a: (-a['score'], a['trial']))
+                keep = len(rows) if rung == self.rungs - 1 else max(1, int(math.ceil(len(rows) / float(self.eta))))
+                for j, row in enumerate(rows):
+                    if rung == self.rungs - 1:
+                        row['status'] = 'final'
+                    else:
+                        row['status'] = 'promoted' if j < keep else 'pruned'
+
+                remaining = dict([(row['trial'], remaining[row['trial']]) for row in rows[:keep]])
+                self.results.extend(rows)
+                self.write_results()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        return rows
+
+
+    def write_results(self):
+        ''' Write every evaluation so far to the results table '''
+
+        with open(self.results_path, 'wb') as outfile:
+            writer = csv.DictWriter(outfile, RESULT_FIELDS + self.param_names)
+            writer.writeheader()
+            writer.writerows(self.results)
+
+
+def main(argv):
+    space_path = None
+    search = 'grid'
+    num_trials = 10
+    player = 'q_watkins_player.QWatkinsPlayer'
+    opponent = 'bayesball_player.BayesballPlayer'
+    train_args = {}
+    output_dir = 'sweep'
+    holes = 9
+    min_epochs = 10
+    eta = 3
+    rungs = 3
+    eval_matches = 10
+    seed = 0
+    processes = None
+
+    usage = 'python sweep.py --space=<search space json> --search=<grid or random> --trials=<random trials> ' \
+            '--player=<file.ClassName to train> --opponent=<file.ClassName> --train_args=<json train args for every trial> ' \
+            '--output_dir=<checkpoint and results directory> --holes=<holes per match> --min_epochs=<epochs in the first rung> ' \
+            '--eta=<1 / eta of the trials carry on each rung> --rungs=<number of rungs> --eval_matches=<matches per evaluation> ' \
+            '--seed=<base seed> --processes=<number of processes>'
+
+    try:
+        opts, args = getopt.getopt(argv, "h", ["space=", "search=", "trials=", "player=", "opponent=", "train_args=", "output_dir=",
+                                               "holes=", "min_epochs=", "eta=", "rungs=", "eval_matches=", "seed=", "processes="])
+    except getopt.GetoptError:
+        print usage
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print usage
+            sys.exit(2)
+        elif opt == "--space":
+            space_path = arg
+        elif opt == "--search":
+            search = arg
+        elif opt == "--trials":
+            num_trials = int(arg)
+        elif opt == "--player":
+            player = arg
+        elif opt == "--opponent":
+            opponent = arg
+        elif opt == "--train_args":
+            train_args = json.loads(arg)
+        elif opt == "--output_dir":
+            output_dir = arg
+        elif opt == "--holes":
+            holes = int(arg)
+        elif opt == "--min_epochs":
+            min_epochs = int(arg)
+        elif opt == "--eta":
+            eta = int(arg)
+        elif opt == "--rungs":
+            rungs = int(arg)
+        elif opt == "--eval_matches":
+            eval_matches = int(arg)
+        elif opt == "--seed":
+            seed = int(arg)
+        elif opt == "--processes":
+            processes = int(arg)
+
+    if not space_path or search not in ('grid', 'random'):
+        print usage
+        sys.exit(2)
+
+    with open(space_path, 'r') as infile:
+        space = json.load(infile)
+
+    if search == 'grid':
+        trials = grid_trials(space)
+    else:
+        trials = random_trials(space, num_trials, seed=seed)
+
+    sweep = Sweep({'player': player}, {'player': opponent}, trials, train_args=train_args, output_dir=output_dir, holes=holes,
+                  min_epochs=min_epochs, eta=eta, rungs=rungs, eval_matches=eval_matches, seed=seed)
+    rows = sweep.run(processes=processes)
+
+    print '\nResults written to {}'.format(sweep.results_path)
+    for row in rows:
+        print '{:>6.2f}  trial {}  {}'.format(row['score'], row['trial'], json.dumps(sweep.trials[row['trial']], sort_keys=True))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
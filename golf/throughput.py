@@ -0,0 +1,288 @@
+''' Measure the throughput of the engine, the players and the training loop, and compare
+    the results against a stored baseline to catch performance regressions
+'''
+import sys
+import os
+import copy
+import getopt
+import json
+import random
+import shutil
+import tempfile
+import time
+from board import Board
+from trainer import Trainer
+from golf.players.random_player import RandomPlayer
+from golf.players.bayesball_player import BayesballPlayer
+from golf.players.q_watkins_player import QWatkinsPlayer
+
+
+# Players whose decisions are benchmarked - name: factory.  The same recorded decisions are
+# replayed over and over, so decision caches are off - otherwise only cache hits are measured
+PLAYERS = {'random_player': RandomPlayer,
+           'bayesball_player': lambda: BayesballPlayer(cache_size=0),
+           'q_watkins_player': QWatkinsPlayer}
+
+# Cached players, benchmarked separately to track the cost of a cache hit
+CACHED_PLAYERS = {'bayesball_player': lambda: BayesballPlayer(cache_size=131072)}
+
+
+class _Silence(object):
+    ''' Swallow stdout - the trainer and match print every match '''
+
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+
+    def __exit__(self, *args):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+
+class _RecordingPlayer(BayesballPlayer):
+    ''' Bayesball player that keeps a copy of every decision it is asked to make '''
+
+    def __init__(self, *args, **kwargs):
+        super(_RecordingPlayer, self).__init__(*args, **kwargs)
+        self.decisions = []
+
+    def turn_phase_1(self, state, possible_moves=['face_up_card', 'face_down_card', 'knock']):
+        self.decisions.append((1, copy.deepcopy(state), None, possible_moves))
+        return super(_RecordingPlayer, self).turn_phase_1(state, possible_moves)
+
+    def turn_phase_2(self, card, state, possible_moves=['return_to_deck', 'swap']):
+        self.decisions.append((2, copy.deepcopy(state), card, possible_moves))
+        return super(_RecordingPlayer, self).turn_phase_2(card, state, possible_moves)
+
+
+def record_decisions(num_games=50, seed=0):
+    ''' Play some games and return the decisions made as a list of (phase, state, card, possible_moves) '''
+
+    random.seed(seed)
+    players = [_RecordingPlayer(), _RecordingPlayer()]
+    for _ in range(num_games):
+        Board(players, 2).play_game()
+
+    return players[0].decisions + players[1].decisions
+
+
+def _rate(func, min_time):
+    ''' Call func (which returns the number of units of work done) until min_time has passed
+        Returns:
+            units of work per second
+    '''
+
+    units = 0
+    start = time.time()
+    while True:
+        units += func()
+        elapsed = time.time() - start
+        if elapsed >= min_time:
+            return units / elapsed
+
+
+def bench_board(min_time=1.0, seed=0):
+    ''' Hands per second for Board.play_game between two random players '''
+
+    random.seed(seed)
+    players = [RandomPlayer(), RandomPlayer()]
+
+    def play():
+        Board(players, 2).play_game()
+        return 1
+
+    return _rate(play, min_time)
+
+
+def bench_snapshots(min_time=1.0, seed=0):
+    ''' Snapshots, restores and forks per second of a freshly dealt Board - with deep copies of
+        the board for comparison
+        Returns:
+            dict of benchmark name: units per second
+    '''
+
+    random.seed(seed)
+    board = Board([RandomPlayer(), RandomPlayer()], 2)
+    board.state.push_up(board.deck.draw())
+    board._deal_hands()
+    snapshot = board.snapshot()
+
+    def run(func):
+        def call():
+            for _ in range(100):
+                func()
+            return 100
+
+        return _rate(call, min_time)
+
+    return {'board.snapshots_per_sec': run(board.snapshot),
+            'board.restores_per_sec': run(lambda: board.restore(snapshot)),
+            'board.forks_per_sec': run(board.fork),
+            'board.deepcopies_per_sec': run(lambda: copy.deepcopy(board))}
+
+
+def bench_player(player, decisions, min_time=1.0):
+    ''' Decisions per second for a player over a set of recorded decisions '''
+
+    def decide():
+        for phase, state, card, possible_moves in decisions:
+            if phase == 1:
+                player.turn_phase_1(state, possible_moves)
+            else:
+                player.turn_phase_2(card, state, possible_moves)
+
+        return len(decisions)
+
+    return _rate(decide, min_time)
+
+
+def bench_update_weights(decisions, min_time=1.0):
+    ''' Weight updates per second for a training QWatkinsPlayer '''
+
+    checkpoint_dir = tempfile.mkdtemp()
+    try:
+        player = QWatkinsPlayer()
+        player.setup_trainer(checkpoint_dir=checkpoint_dir)
+
+        # update_weights needs a previous q-state to update from
+        phase, state, card, possible_moves = decisions[0]
+        player.turn_phase_1(state)
+
+        def update():
+            for phase, state, card, possible_moves in decisions:
+                if phase == 1:
+                    player.update_weights(state, card=None, reward=0, possible_moves=['knock'])
+                else:
+                    player.update_weights(state, card, reward=0, possible_moves=possible_moves)
+
+            return len(decisions)
+
+        return _rate(update, min_time)
+    finally:
+        shutil.rmtree(checkpoint_dir)
+
+
+def bench_train_epochs(num_epochs=2, holes=9, seed=0):
+    ''' Epochs per second for Trainer.train_k_epochs - QWatkinsPlayer against BayesballPlayer,
+        including the final checkpoint evaluation and save
+    '''
+
+    checkpoint_dir = tempfile.mkdtemp()
+    try:
+        random.seed(seed)
+        player = QWatkinsPlayer()
+        player.setup_trainer(checkpoint_dir=checkpoint_dir)
+        trainer = Trainer(player, BayesballPlayer(), trainable_player='player1', holes=holes)
+
+        start = time.time()
+        with _Silence():
+            trainer.train_k_epochs(num_epochs)
+
+        return num_epochs / (time.time() - start)
+    finally:
+        shutil.rmtree(checkpoint_dir)
+
+
+def run_suite(min_time=1.0, num_epochs=2):
+    ''' Run every benchmark
+        Returns:
+            dict of benchmark name: units per second
+    '''
+
+    decisions = record_decisions()
+
+    results = {'board.hands_per_sec': bench_board(min_time)}
+    results.update(bench_snapshots(min_time))
+    for name, player in sorted(PLAYERS.items()):
+        results['{}.decisions_per_sec'.format(name)] = bench_player(player(), decisions, min_time)
+    for name, player in sorted(CACHED_PLAYERS.items()):
+        results['{}.cached_decisions_per_sec'.format(name)] = bench_player(player(), decisions, min_time)
+
+    results['q_watkins_player.updates_per_sec'] = bench_update_weights(decisions, min_time)
+    results['trainer.epochs_per_sec'] = bench_train_epochs(num_epochs)
+
+    return results
+
+
+def save_results(results, path):
+    ''' Write benchmark results as json '''
+
+    with open(path, 'w') as outfile:
+        json.dump({'time': time.time(), 'results': results}, outfile, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    ''' Read benchmark results written by save_results '''
+
+    with open(path, 'r') as infile:
+        return json.load(infile)['results']
+
+
+def compare_results(results, baseline, tolerance=0.1):
+    ''' Compare results with a baseline
+        Args:
+            results: dict of benchmark name: units per second
+            baseline: dict in the same form
+            tolerance: fraction of the baseline throughput that may be lost before it counts as a regression
+        Returns:
+            list of (name, baseline, result) for every benchmark that regressed
+    '''
+
+    regressions = []
+    for name in sorted(baseline):
+        if name in results and results[name] < baseline[name] * (1 - tolerance):
+            regressions.append((name, baseline[name], results[name],))
+
+    return regressions
+
+
+def main(argv):
+    # Setup some defaults
+    output = None
+    baseline = None
+    tolerance = 0.1
+    min_time = 1.0
+    num_epochs = 2
+
+    usage = 'python throughput.py --output=<results json> --baseline=<baseline json> --tolerance=<allowed fraction lost> ' \
+            '--min_time=<seconds per benchmark> --epochs=<training epochs>'
+
+    try:
+        opts, args = getopt.getopt(argv, "h", ["output=", "baseline=", "tolerance=", "min_time=", "epochs="])
+    except getopt.GetoptError:
+        print usage
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print usage
+            sys.exit(2)
+        elif opt in ("--output"):
+            output = arg
+        elif opt in ("--baseline"):
+            baseline = arg
+        elif opt in ("--tolerance"):
+            tolerance = float(arg)
+        elif opt in ("--min_time"):
+            min_time = float(arg)
+        elif opt in ("--epochs"):
+            num_epochs = int(arg)
+
+    results = run_suite(min_time, num_epochs)
+    for name, value in sorted(results.items()):
+        print '{}: {:.2f}'.format(name, value)
+
+    if output:
+        save_results(results, output)
+
+    if baseline:
+        regressions = compare_results(results, load_results(baseline), tolerance)
+        for name, base, result in regressions:
+            print 'REGRESSION {}: {:.2f} -> {:.2f}'.format(name, base, result)
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
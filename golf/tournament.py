@@ -0,0 +1,262 @@
+''' Round-robin tournaments between many players, with Bradley-Terry ratings
+
+    Players are given as specs - {"player": "file.ClassName", "args": {"init": {init args}}} -
+    the same form match.py takes on the command line (--player1 and --player1_args).  Results are cached by the pair of spec keys, and
+    a spec key includes a hash of every file its args point at (e.g. a model_file checkpoint),
+    so adding a player only plays that player's pairings and a re-saved checkpoint is re-played.
+'''
+import os
+import sys
+import getopt
+import json
+import math
+import hashlib
+import itertools
+import multiprocessing
+import numpy as np
+from match import Match, match_seed
+
+
+def _file_hash(path):
+    ''' sha1 of a file's contents '''
+
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as infile:
+        for block in iter(lambda: infile.read(1 << 20), ''):
+            sha1.update(block)
+
+    return sha1.hexdigest()
+
+
+def spec_key(spec):
+    ''' Stable key for a player spec - changes when the spec or any file it refers to changes '''
+
+    args = spec.get('args', {})
+    files = dict([(name, _file_hash(value)) for name, value in args.get('init', {}).items()
+                  if isinstance(value, basestring) and os.path.isfile(value)])
+
+    digest = hashlib.sha1(json.dumps({'player': spec['player'], 'args': args, 'files': files}, sort_keys=True))
+    return '{}:{}'.format(spec['player'], digest.hexdigest()[:16])
+
+
+def load_player(spec):
+    ''' Create the player a spec describes '''
+
+    module, cls = spec['player'].split('.')
+    player = getattr(__import__('golf.players.{}'.format(module), fromlist=[cls]), cls)
+    return player(**spec.get('args', {}).get('init', {}))
+
+
+def _play_pairing(args):
+    ''' Pool worker - play the matches of one pairing
+        Returns:
+            tuple of the number of matches won by each player
+    '''
+
+    spec_a, spec_b, num_matches, holes, seed = args
+    match = Match(load_player(spec_a), load_player(spec_b), holes=holes)
+    return match.play_k_matches(num_matches, seed=seed)
+
+
+def bradley_terry(num_players, results, prior=0.5, iterations=10000, tolerance=1e-10):
+    ''' Fit Bradley-Terry strengths to pairwise results
+        Args:
+            num_players: number of players
+            results: dict of (i, j): (wins of i, wins of j, draws)
+            prior: virtual draws added to every played pairing (as half a win each), so that
+                   players who won or lost every match still get finite ratings
+        Returns:
+            (ratings, standard errors) - arrays on the Elo scale, with ratings centered on 0
+    '''
+
+    wins = np.zeros((num_players, num_players))
+    for (i, j), (wins_i, wins_j, draws) in results.items():
+        wins[i, j] += wins_i + (draws + prior) / 2.0
+        wins[j, i] += wins_j + (draws + prior) / 2.0
+
+    games = wins + wins.T
+    total_wins = wins.sum(axis=1)
+
+    # Minorization-maximization updates (Hunter 2004)
+    strength = np.ones(num_players)
+    for _ in range(iterations):
+        pair_sums = strength[:, np.newaxis] + strength[np.newaxis, :]
+        denominator = (games / pair_sums).sum(axis=1)
+        new_strength = np.where(denominator > 0, total_wins / np.maximum(denominator, 1e-300), strength)
+        new_strength /= np.exp(np.log(new_strength).mean())
+
+        converged = np.abs(new_strength - strength).max() < tolerance
+        strength = new_strength
+        if converged:
+            break
+
+    # Standard errors of the log strengths from the observed information - the ratings are only
+    # defined up to a constant, so the pseudo-inverse gives the errors for ratings centered on 0
+    pair_sums = strength[:, np.newaxis] + strength[np.newaxis, :]
+    information = -games * np.outer(strength, strength) / (pair_sums ** 2)
+    np.fill_diagonal(information, 0)
+    np.fill_diagonal(information, -information.sum(axis=1))
+    errors = np.sqrt(np.maximum(np.diag(np.linalg.pinv(information)), 0))
+
+    scale = 400 / math.log(10)
+    return scale * np.log(strength), scale * errors
+
+
+class Tournament(object):
+    ''' Every pair of players plays num_matches matches - results are cached in a json file '''
+
+    def __init__(self, specs, num_matches=10, holes=9, seed=0, cache_path=None):
+        ''' Args:
+                specs: list of player specs
+                num_matches: matches played by every pair of players
+                holes: holes per match
+                seed: base seed - every pairing is seeded from it and the pair's spec keys
+                cache_path: optional json file of results from earlier tournaments
+        '''
+
+        self.specs = specs
+        self.keys = [spec_key(spec) for spec in specs]
+        self.num_matches = num_matches
+        self.holes = holes
+        self.seed = seed
+        self.cache_path = cache_path
+
+        # results keyed by pairing key: (wins of the first player, wins of the second player)
+        self.cache = {}
+        if cache_path and os.path.isfile(cache_path):
+            with open(cache_path, 'r') as infile:
+                self.cache = json.load(infile)
+
+        # number of pairings actually played (rather than read from the cache) by run()
+        self.played = 0
+
+
+    def _pairing_key(self, key_a, key_b):
+        return '|'.join([key_a, key_b, str(self.num_matches), str(self.holes), str(self.seed)])
+
+
+    def pairings(self):
+        ''' Every pair of players as (i, j) - ordered by spec key so a pair always sits the same way '''
+
+        pairs = []
+        for i, j in itertools.combinations(range(len(self.specs)), 2):
+            if self.keys[j] < self.keys[i]:
+                i, j = j, i
+            pairs.append((i, j,))
+
+        return pairs
+
+
+    def run(self, processes=None):
+        ''' Play every pairing that is not in the cache
+            Args:
+                processes: optional number of processes to spread the pairings across
+            Returns:
+                dict of (i, j): (wins of i, wins of j, draws)
+        '''
+
+        tasks = []
+        pending = []
+        for i, j in self.pairings():
+            key = self._pairing_key(self.keys[i], self.keys[j])
+            if key not in self.cache:
+                tasks.append((self.specs[i], self.specs[j], self.num_matches, self.holes, match_seed(self.seed, key),))
+                pending.append(key)
+
+        if processes and processes > 1 and len(tasks) > 1:
+            pool = multiprocessing.Pool(processes)
+            try:
+                outcomes = pool.map(_play_pairing, tasks, chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            outcomes = [_play_pairing(task) for task in tasks]
+
+        for key, outcome in zip(pending, outcomes):
+            self.cache[key] = list(outcome)
+
+        self.played = len(tasks)
+        if self.cache_path:
+            with open(self.cache_path, 'w') as outfile:
+                json.dump(self.cache, outfile, indent=2, sort_keys=True)
+
+        return self.results()
+
+
+    def results(self):
+        ''' Cached results for the current players - dict of (i, j): (wins of i, wins of j, draws) '''
+
+        results = {}
+        for i, j in self.pairings():
+            key = self._pairing_key(self.keys[i], self.keys[j])
+            if key in self.cache:
+                wins_i, wins_j = self.cache[key]
+                results[(i, j)] = (wins_i, wins_j, self.num_matches - wins_i - wins_j)
+
+        return results
+
+
+    def ratings(self, confidence=1.96):
+        ''' Ratings of every player, best first
+            Returns:
+                list of (spec, rating, lower bound, upper bound)
+        '''
+
+        ratings, errors = bradley_terry(len(self.specs), self.results())
+        order = np.argsort(-ratings)
+        return [(self.specs[i], ratings[i], ratings[i] - confidence * errors[i], ratings[i] + confidence * errors[i])
+                for i in order]
+
+
+def main(argv):
+    specs_path = None
+    num_matches = 10
+    holes = 9
+    seed = 0
+    processes = None
+    cache_path = None
+
+    usage = 'python tournament.py --specs=<json list of player specs> -m <matches per pairing> --holes=<holes per match> ' \
+            '--seed=<base seed> --processes=<number of processes> --cache=<results cache json>'
+
+    try:
+        opts, args = getopt.getopt(argv, "hm:", ["specs=", "matches=", "holes=", "seed=", "processes=", "cache="])
+    except getopt.GetoptError:
+        print usage
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print usage
+            sys.exit(2)
+        elif opt in ("--specs"):
+            specs_path = arg
+        elif opt in ("-m", "--matches"):
+            num_matches = int(arg)
+        elif opt in ("--holes"):
+            holes = int(arg)
+        elif opt in ("--seed"):
+            seed = int(arg)
+        elif opt in ("--processes"):
+            processes = int(arg)
+        elif opt in ("--cache"):
+            cache_path = arg
+
+    if not specs_path:
+        print usage
+        sys.exit(2)
+
+    with open(specs_path, 'r') as infile:
+        specs = json.load(infile)
+
+    tournament = Tournament(specs, num_matches=num_matches, holes=holes, seed=seed, cache_path=cache_path)
+    tournament.run(processes=processes)
+
+    print '\nPlayed {} new pairings'.format(tournament.played)
+    for spec, rating, low, high in tournament.ratings():
+        print '{:>8.1f} [{:>8.1f}, {:>8.1f}]  {} {}'.format(rating, low, high, spec['player'], json.dumps(spec.get('args', {}), sort_keys=True))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
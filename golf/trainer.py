@@ -3,17 +3,37 @@
 import sys
 import getopt
 import json
+import multiprocessing
 from board import Board
 from benchmark import benchmark_player
+from profiling import PhaseTimer
+
+
+def _evaluate_checkpoint(players, trainable_player, epoch, benchmark_kwargs=None):
+    ''' Benchmark and save a frozen copy of the trainable player - run in a worker process
+        Returns:
+            evaluation results with the trainable player's score first
+    '''
+
+    result = list(benchmark_player(*players, **(benchmark_kwargs or {})))
+    if trainable_player == 1:
+        result.reverse()
+
+    players[trainable_player].save_checkpoint(epoch)
+    return result
 
 
 class Trainer(object):
 
-    def __init__(self, player1, player2, trainable_player=None, holes=9, checkpoint_epochs=None, verbose=False):
+    def __init__(self, player1, player2, trainable_player=None, holes=9, checkpoint_epochs=None, verbose=False, timer=None,
+                 async_checkpoints=False, sequential_eval=False):
         self.players = [player1, player2,]
         self.scores = [0,0]
         self.total_holes = holes # Since we're 0 indexed
         self.verbose = verbose
+
+        # Optional profiling.PhaseTimer - records the time spent in each phase of the training games
+        self.timer = timer
         self.trainable_player = trainable_player
 
         if self.trainable_player != None:
@@ -22,6 +42,18 @@ class Trainer(object):
         # array of tuples to hold the results from evaluation
         self.eval_results = []
 
+        # With async checkpoints a frozen copy of the trainable player is evaluated and saved in a
+        # worker process while training carries on - results join eval_results as they finish
+        self.async_checkpoints = async_checkpoints
+        self._checkpoint_pool = None
+        self._pending_checkpoints = []
+
+        # With sequential evaluation checkpoints are benchmarked until one player is found better
+        # (or a cap is reached) rather than for a fixed number of matches
+        self.benchmark_kwargs = {}
+        if sequential_eval:
+            self.benchmark_kwargs['sequential'] = True
+
         self.checkpoint_epochs = checkpoint_epochs
         if not self.checkpoint_epochs and self.verbose:
             print 'You chose training, but have not specified a number of epochs to save model at - saving and evaluation ' \
@@ -33,18 +65,19 @@ class Trainer(object):
             print 'Player 1 {}'.format(self.players[1])
 
 
-    def train_k_epochs(self, k):
-        ''' Play a lot of independent matches for a more fair comparison '''
-        for i in range(k):
-
-            if self.verbose or True:
-                print('\n **** Starting epoch # {} **** \n'.format(i))
-            scores = self.play_match(i)
+    def train_k_epochs(self, k, first_epoch=0):
+        ''' Play a lot of independent matches for a more fair comparison
+            Args:
+                k: number of epochs to train for
+                first_epoch: number of the first epoch - to carry on from earlier training
+        '''
+        for i, scores in self._play_epochs(k, first_epoch):
 
             if self.verbose or True:
                 print 'Player 1 Score: {} Player 2 Score: {}'.format(scores[0], scores[1])
 
             if self.trainable_player != None and self.trainable_player >= 0 and self.trainable_player < len(self.players):
+                self.collect_checkpoints()
                 self.players[self.trainable_player].update_learning_rate(i, self.eval_results)
 
             if self.checkpoint_epochs and i and not (i+1) % self.checkpoint_epochs:
@@ -58,23 +91,45 @@ class Trainer(object):
         if self.verbose or True:
             print 'Finished training player - going to run a final evaluation and save a checkpoint'
 
-        self.process_checkpoint(k)
+        self.process_checkpoint(first_epoch + k)
+        self.collect_checkpoints(wait=True)
+
+
+    def _play_epochs(self, k, first_epoch=0):
+        ''' Play the training match of each epoch in turn
+            Returns:
+                generator of (epoch, scores)
+        '''
+
+        for i in range(first_epoch, first_epoch + k):
+            if self.verbose or True:
+                print('\n **** Starting epoch # {} **** \n'.format(i))
+
+            yield i, self.play_match(i)
 
 
     def process_checkpoint(self, epoch):
         """ It's time for a checkpoint - so we will run evaluation and then save a checkpoint file """
 
+        if self.async_checkpoints and self.trainable_player != None and self.trainable_player >= 0 and self.trainable_player < len(self.players):
+            self._submit_checkpoint(epoch)
+            return
+
         # Let's run an evaulation - first we'll need to set both players to not be in training mode
         if self.trainable_player != None and self.trainable_player >= 0 and self.trainable_player < len(self.players):
             self.players[self.trainable_player].is_trainable = False
 
-        result = list(benchmark_player(*self.players))
+        benchmark = benchmark_player(*self.players, **self.benchmark_kwargs)
+        result = list(benchmark)
         if self.trainable_player == 1:
             result.reverse()
 
         self.eval_results.append(result)
 
         if self.verbose:
+            if self.benchmark_kwargs.get('sequential'):
+                print 'Evaluation stopped after {} matches ({}) with confidence {:.3f}'.format(
+                    benchmark.num_matches, benchmark.stop_reason, benchmark.confidence)
             print 'Evaluation results: '
             for i, player in enumerate(self.players):
                 print 'Player{}: {} : {}'.format(i, player, result[i])
@@ -88,13 +143,57 @@ class Trainer(object):
             print 'Finished saving checkpoint for epoch: {}'.format(epoch)
 
 
+    def _submit_checkpoint(self, epoch):
+        ''' Hand a frozen copy of the players to the checkpoint worker process '''
+
+        if self._checkpoint_pool is None:
+            self._checkpoint_pool = multiprocessing.Pool(1)
+
+        players = list(self.players)
+        players[self.trainable_player] = players[self.trainable_player].frozen_copy()
+
+        result = self._checkpoint_pool.apply_async(_evaluate_checkpoint, (players, self.trainable_player, epoch, self.benchmark_kwargs))
+        self._pending_checkpoints.append((epoch, result,))
+
+
+    def collect_checkpoints(self, wait=False):
+        ''' Move finished asynchronous checkpoint evaluations into eval_results, in the order they were started
+            Args:
+                wait: Boolean - block until every pending checkpoint has finished, then shut the worker down
+        '''
+
+        while self._pending_checkpoints and (wait or self._pending_checkpoints[0][1].ready()):
+            epoch, result = self._pending_checkpoints.pop(0)
+            result = result.get()
+            self.eval_results.append(result)
+
+            if self.verbose:
+                print 'Evaluation results for epoch {}: {}'.format(epoch, result)
+
+        if wait and self._checkpoint_pool is not None:
+            self._checkpoint_pool.close()
+            self._checkpoint_pool.join()
+            self._checkpoint_pool = None
+
+
     def play_match(self, match_num):
         ''' Play all of the holes for a single match '''
 
         scores = [0,0]
 
+        kwargs = {'verbose': self.verbose}
+        if self.timer:
+            kwargs['timer'] = self.timer
+
+        # One board plays every hole - reset with the seats swapped
+        board = None
         for turn in range(self.total_holes):
-            board = Board([self.players[(turn + match_num) % 2], self.players[((turn + match_num) + 1) % 2]], 2, verbose=self.verbose)
+            player_ids = [(turn + match_num) % 2, ((turn + match_num) + 1) % 2]
+            players = [self.players[i] for i in player_ids]
+            if board is None:
+                board = Board(players, 2, player_ids=player_ids, **kwargs)
+            else:
+                board.reset(players, player_ids=player_ids)
 
             game_scores = board.play_game()
             for i, score in enumerate(scores):
@@ -114,14 +213,24 @@ def main(argv):
     holes = None
     trainable_player = None
     checkpoint_epochs = None
+    profile = False
+    async_checkpoints = False
+    sequential_eval = False
+    processes = None
+    lock_updates = False
 
     try:
-        opts, args = getopt.getopt(argv, "e:v", ["player1=", "player2=", "player1_args=", "player2_args=", "epochs=", "holes=", "verbose", 'trainable=', "checkpoint_epochs="])
+        opts, args = getopt.getopt(argv, "e:v", ["player1=", "player2=", "player1_args=", "player2_args=", "epochs=", "holes=", "verbose", 'trainable=', "checkpoint_epochs=",
+                                                 "profile", "async_checkpoints", "sequential_eval", "processes=", "lock_updates"])
     except:
         print 'python golf/train.py --player1 <player1> --player1_args <player1 arg json> --player2 <player2> --player2_args <player2 arg json> ' \
-              '-e <number of training epochs> -=holes <number of holes> -v <verbose> --trainable= <trainable_player> --checkpoint_epochs <epochs between saving checkpoints>'
+              '-e <number of training epochs> -=holes <number of holes> -v <verbose> --trainable= <trainable_player> --checkpoint_epochs <epochs between saving checkpoints> ' \
+              '--profile <print phase timings> --async_checkpoints <evaluate checkpoints in a worker process> ' \
+              '--sequential_eval <benchmark checkpoints until one player is found better> ' \
+              '--processes <train in this many processes, sharing the weights> --lock_updates <lock shared weight updates>'
 
-    opts, args = getopt.getopt(argv, "e:v", ["player1=", "player2=", "player1_args=", "player2_args=", "epochs=", "holes=", "verbose", 'trainable=', "checkpoint_epochs="])
+    opts, args = getopt.getopt(argv, "e:v", ["player1=", "player2=", "player1_args=", "player2_args=", "epochs=", "holes=", "verbose", 'trainable=', "checkpoint_epochs=",
+                                             "profile", "async_checkpoints", "sequential_eval", "processes=", "lock_updates"])
 
     for opt, arg in opts:
         if opt == '-h':
@@ -151,6 +260,16 @@ def main(argv):
             trainable_player = str(arg)
         elif opt in ("--checkpoint_epochs"):
             checkpoint_epochs = int(arg)
+        elif opt == "--profile":
+            profile = True
+        elif opt == "--async_checkpoints":
+            async_checkpoints = True
+        elif opt == "--sequential_eval":
+            sequential_eval = True
+        elif opt == "--processes":
+            processes = int(arg)
+        elif opt == "--lock_updates":
+            lock_updates = True
 
     # Players need to be specified by file.ClassName
     player1 = player1.split('.')
@@ -172,11 +291,31 @@ def main(argv):
     kwargs = {'verbose': verbose}
     if holes:
         kwargs['holes'] = holes
-
-    trainer = Trainer(player1, player2, trainable_player=trainable_player, checkpoint_epochs=checkpoint_epochs, **kwargs)
+    if profile:
+        kwargs['timer'] = PhaseTimer()
+    if async_checkpoints:
+        kwargs['async_checkpoints'] = True
+    if sequential_eval:
+        kwargs['sequential_eval'] = True
+
+    if processes:
+        # Imported here - parallel_trainer builds on this module
+        from parallel_trainer import ParallelTrainer
+        trainer = ParallelTrainer(player1, player2, trainable_player=trainable_player, checkpoint_epochs=checkpoint_epochs,
+                                  processes=processes, lock=lock_updates, **kwargs)
+    else:
+        trainer = Trainer(player1, player2, trainable_player=trainable_player, checkpoint_epochs=checkpoint_epochs, **kwargs)
 
     trainer.train_k_epochs(num_epochs)
 
+    # Players with decision caches keep them for the next run
+    for player in (player1, player2):
+        if hasattr(player, 'save_cache'):
+            player.save_cache()
+
+    if profile:
+        print trainer.timer
+
 
 if __name__ == '__main__':
     main(sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,157 @@
+''' Tests for the Golf batch board - the batched game must play exactly like Board '''
+import random
+import unittest2
+import numpy as np
+from golf.board import Board
+from golf.batch_board import BatchBoard, random_decks, score_cards, card_counts, pile_counts, UNKNOWN_CARD
+from golf.players.bayesball_player import BayesballPlayer
+from golf.players.random_player import RandomPlayer
+from golf.players.batch_random_player import BatchRandomPlayer
+from golf.players.batch_greedy_player import BatchGreedyPlayer
+from golf.players.player_base import Player
+
+
+class NeverKnockPlayer(Player):
+    ''' Deterministic player that never knocks - games run through reshuffles to the turn limit '''
+
+    def turn_phase_1(self, state, possible_moves):
+        if state['deck_up'][-1] < 4:
+            return 'face_up_card'
+        return 'face_down_card'
+
+    def turn_phase_2(self, card, state, possible_moves):
+        if card > 6 and 'return_to_deck' in possible_moves:
+            return ('return_to_deck',)
+        return ('swap', card % 2, (card / 2) % 2)
+
+
+class TestBatchBoard(unittest2.TestCase):
+    ''' Test the batch board module against the reference Board '''
+
+    def _play_board(self, players, deck, seed):
+        ''' Play a regular board with a fixed deck and random seed '''
+
+        board = Board(players, 2)
+        board.deck_down = list(deck)
+        random.seed(seed)
+        scores = board.play_game()
+        return board, scores
+
+
+    def _play_batch_board(self, players, deck, seed):
+        ''' Play a single batch board with a fixed deck and random seed '''
+
+        random.seed(seed)
+        board = BatchBoard(players, 1, decks=[deck])
+        scores = board.play()
+        return board, scores[0]
+
+
+    def test_equivalent_to_board(self):
+        ''' Deterministic and random players should play identical games on both boards '''
+
+        decks = random_decks(20, np.random.RandomState(3))
+
+        for player_cls in (BayesballPlayer, RandomPlayer):
+            for i, deck in enumerate(decks.tolist()):
+                with self.subTest(msg='{} deck {}'.format(player_cls.__name__, i)):
+                    players = [player_cls(), player_cls()]
+                    board, scores = self._play_board(players, deck, i)
+                    batch_board, batch_scores = self._play_batch_board(players, deck, i)
+
+                    self.assertEqual(list(scores), list(batch_scores))
+                    for seat in range(2):
+                        self.assertEqual(board.hands[seat].cards, batch_board.hands[0, seat].tolist())
+                    self.assertEqual(board.deck_up, batch_board.deck_up[0, :batch_board.up_len[0]].tolist())
+
+
+    def test_forfeit_and_reshuffle(self):
+        ''' Games that never end are forfeit at the turn limit after reshuffling the deck many times '''
+
+        deck = random_decks(1, np.random.RandomState(11))[0].tolist()
+        players = [NeverKnockPlayer(), NeverKnockPlayer()]
+        board, scores = self._play_board(players, deck, 4)
+        batch_board, batch_scores = self._play_batch_board(players, deck, 4)
+
+        self.assertEqual(scores, [0, 0])
+        self.assertEqual(batch_scores.tolist(), [0, 0])
+        self.assertEqual(batch_board.turn[0], 1000)
+        for seat in range(2):
+            self.assertEqual(board.hands[seat].cards, batch_board.hands[0, seat].tolist())
+        self.assertEqual(board.deck_down, batch_board.deck_down[0, batch_board.down_pos[0]:batch_board.down_len[0]].tolist())
+
+
+    def test_get_state_for_player(self):
+        ''' Dict states should match the ones Board hands to its players '''
+
+        deck = random_decks(1, np.random.RandomState(5))[0].tolist()
+        board = Board([RandomPlayer(), RandomPlayer()], 2)
+        board.deck_down = list(deck)
+        board.state.push_up(board.deck.draw())
+        board._deal_hands()
+
+        batch_board = BatchBoard([RandomPlayer(), RandomPlayer()], 1, decks=[deck])
+        for seat in range(2):
+            self.assertEqual(board.get_state_for_player(seat), batch_board.get_state_for_player(0, seat))
+
+
+    def test_batch_random_player(self):
+        ''' Many boards played by batch players should all finish with every card accounted for '''
+
+        num_boards = 200
+        board = BatchBoard([BatchRandomPlayer(seed=1), BatchRandomPlayer(seed=2)], num_boards, seed=7)
+        scores = board.play()
+
+        self.assertTrue(board.done.all())
+        self.assertEqual(scores.shape, (num_boards, 2))
+
+        for i in range(num_boards):
+            cards = board.hands[i].flatten().tolist() + \
+                    board.deck_up[i, :board.up_len[i]].tolist() + \
+                    board.deck_down[i, board.down_pos[i]:board.down_len[i]].tolist()
+            self.assertEqual(sorted(cards), sorted(range(13) * 4))
+
+
+    def test_score_cards(self):
+        ''' Columns score 0, cards over 10 count as 10 and unknown cards are skipped '''
+
+        cards = np.array([[2, 2, 2, 2],
+                          [1, 2, 3, 4],
+                          [12, 11, 4, 5],
+                          [UNKNOWN_CARD, 5, 5, UNKNOWN_CARD]])
+        self.assertEqual(score_cards(cards).tolist(), [0, 10, 29, 10])
+
+
+    def test_pile_counts(self):
+        ''' Histograms of the start of every pile '''
+
+        piles = random_decks(5, np.random.RandomState(0))
+        lengths = np.array([0, 1, 10, 30, 52])
+        expected = [card_counts(piles[i:i + 1, :lengths[i]])[0].tolist() for i in range(5)]
+        self.assertEqual(pile_counts(piles, lengths).tolist(), expected)
+
+
+    def test_set_position(self):
+        ''' A board started from the position part way through another game plays out the same way '''
+
+        players = [BatchGreedyPlayer(), BatchGreedyPlayer(min_distance=4)]
+        source = BatchBoard(players, 1, seed=3)
+        source.board_shuffles = [np.random.RandomState(5).shuffle]
+        for _ in range(4):
+            source.step()
+        self.assertFalse(source.done[0])
+
+        start = source.down_pos[0]
+        target = BatchBoard(players, 1, seed=4)
+        target.board_shuffles = [np.random.RandomState(5).shuffle]
+        target.set_position(np.array([0]), source.hands, np.roll(source.deck_down, -start, axis=1),
+                            source.down_len - start, source.deck_up, source.up_len,
+                            source.self_revealed, source.opp_revealed, has_knocked=source.has_knocked)
+
+        self.assertEqual(target.up_counts.tolist(), source.up_counts.tolist())
+        self.assertEqual(target.play().tolist(), source.play().tolist())
+
+        # In phase 2 the turn has started - a knock before it makes it the last
+        target.set_position(np.array([0]), source.hands, source.deck_down, 10, source.deck_up, 1,
+                            source.self_revealed, source.opp_revealed, has_knocked=True, card=5, drew_face_down=True)
+        self.assertEqual((target.turn[0], target.end_game[0], target.card[0], target.drew_face_down[0]), (1, True, 5, True))
@@ -1,7 +1,7 @@
 ''' Tests for Golf benchmark
 '''
 import unittest2
-from golf.benchmark import benchmark_player
+from golf.benchmark import benchmark_player, sprt_decision, win_confidence
 from mock import call, patch, Mock
 
 class TestBenchmarkPlayer(unittest2.TestCase):
@@ -21,3 +21,50 @@ class TestBenchmarkPlayer(unittest2.TestCase):
         self.assertEqual(mock_match.call_count, 1)
         mock_match.assert_called_with('player1', 'player2')
         match_instance.play_k_matches.assert_called_with(20)
+
+
+    @patch('golf.benchmark.Match')
+    def test_sequential_stops_when_one_player_is_better(self, mock_match):
+        """ A lopsided sequential benchmark stops after the first test that finds a better player """
+
+        match_instance = Mock()
+        mock_match.return_value = match_instance
+        match_instance.play_k_matches.side_effect = [(8, 2), (18, 2), (28, 2)]
+
+        result = benchmark_player('player1', 'player2', 10, seed=3, sequential=True)
+
+        self.assertEqual(result, (18, 2,))
+        self.assertEqual(result.stop_reason, 'player1')
+        self.assertEqual(result.num_matches, 20)
+        self.assertGreater(result.confidence, 0.95)
+        match_instance.play_k_matches.assert_has_calls([call(10, first_match=0, seed=3), call(10, first_match=10, seed=3)])
+
+
+    @patch('golf.benchmark.Match')
+    def test_sequential_stops_at_max_matches(self, mock_match):
+        """ An even sequential benchmark plays up to the cap """
+
+        match_instance = Mock()
+        mock_match.return_value = match_instance
+        match_instance.play_k_matches.side_effect = [(5, 5), (10, 10), (13, 12)]
+
+        result = benchmark_player('player1', 'player2', 10, sequential=True, max_matches=25)
+
+        self.assertEqual(result.stop_reason, 'max_matches')
+        self.assertEqual(result.num_matches, 25)
+        self.assertLess(result.confidence, 0.5)
+        self.assertEqual(match_instance.play_k_matches.call_args_list[-1], call(5, first_match=20))
+
+
+    def test_sprt_and_confidence(self):
+        """ Test the sequential test decisions and the reported confidence """
+
+        self.assertIsNone(sprt_decision(5, 5))
+        self.assertEqual(sprt_decision(9, 1), 'player1')
+        self.assertEqual(sprt_decision(1, 9), 'player2')
+
+        self.assertEqual(win_confidence(0, 0), 0.0)
+        self.assertEqual(win_confidence(5, 5), 0.0)
+        # Two sided exact binomial - 10 of 10 has a p-value of 2 / 1024
+        self.assertAlmostEqual(win_confidence(10, 0), 1 - 2 / 1024.0)
+        self.assertAlmostEqual(win_confidence(0, 10), win_confidence(10, 0))
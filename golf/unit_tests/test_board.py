@@ -1,10 +1,17 @@
 ''' Tests for Golf board - will include unit and more integration style tests
     as this is the component where much of the logic comes together
 '''
+import random
 import unittest2
-from golf.board import Board
+import numpy as np
+from golf.board import Board, hidden_places, substitute_hidden, shuffle_hidden
+from golf.batch_board import random_decks
 from golf.hand import Hand
 from golf.players.player_base import Player
+from golf.players.player_utils import PlayerUtils
+from golf.players.random_player import RandomPlayer
+from golf.players.q_watkins_player import QWatkinsPlayer
+from golf.unit_tests.test_player.scripted_players import SwapUpPlayer
 
 
 class TestBoard(unittest2.TestCase):
@@ -172,3 +179,257 @@ class TestBoard(unittest2.TestCase):
         self.assertEqual(self.board.deck_visible[-1], self.new_card)
         self.assertEqual(len(self.board.deck_visible), 2)
 
+
+    def test_state_is_read_only(self):
+        ''' Players get a read-only state - mutating it should fail rather than change the board '''
+
+        self.board._deal_hands()
+        self.board.state.push_up(self.board.deck.draw())
+        state = self.board.get_state_for_player(0)
+
+        with self.assertRaises(TypeError):
+            state['deck_up'].append(3)
+        with self.assertRaises(TypeError):
+            state['self']['raw_cards'][0] = 3
+        with self.assertRaises(TypeError):
+            state['has_knocked'] = True
+
+        self.assertEqual(len(self.board.deck_visible), 1)
+
+        # copies are ordinary lists that can be changed freely
+        deck_up = list(state['deck_up'])
+        deck_up.append(3)
+        self.assertEqual(len(self.board.deck_visible), 1)
+
+
+    def test_state_is_updated_in_place(self):
+        ''' The state a player holds reflects swaps, discards and knocks as they happen '''
+
+        self.board._deal_hands()
+        self.board.state.push_up(self.board.deck.draw())
+        state = self.board.get_state_for_player(0)
+        opp_state = self.board.get_state_for_player(1)
+
+        self.board.hands[0].swap(1, 1, 12, source_revealed=True)
+        self.board.state.hand_changed(0)
+        self.assertEqual(state['self'], self.board.hands[0].get_state(is_self=True))
+        self.assertEqual(opp_state['opp'][0], self.board.hands[0].get_state(is_self=False))
+        self.assertEqual(opp_state['opp'][0]['raw_cards'][3], 12)
+
+        self.board.state.push_up(7)
+        self.assertEqual(state['deck_up'][-1], 7)
+
+        self.board.has_knocked = True
+        self.assertTrue(state['has_knocked'])
+        self.assertTrue(opp_state['has_knocked'])
+
+
+    def test_known_cards_count(self):
+        ''' The running count of known cards should always match counting the state from scratch '''
+
+        utils = PlayerUtils()
+        self.num_checks = 0
+
+        def _check(state):
+            scanned = dict((k, v) for k, v in state.items() if k != 'known_cards')
+            self.assertEqual(list(state['known_cards']), utils._calc_known_cards(scanned))
+            self.num_checks += 1
+
+        for player in self.players:
+            random_player = RandomPlayer()
+
+            def _phase_1(state, possible_moves, random_player=random_player):
+                _check(state)
+                return random_player.turn_phase_1(state, ('face_up_card', 'face_down_card',))
+
+            def _phase_2(card, state, possible_moves, random_player=random_player):
+                _check(state)
+                return random_player.turn_phase_2(card, state, possible_moves)
+
+            player.turn_phase_1 = _phase_1
+            player.turn_phase_2 = _phase_2
+
+        # Nobody knocks, so the game runs through several reshuffles to the turn limit
+        self.assertEqual(self.board.play_game(), [0, 0])
+        self.assertEqual(self.num_checks, 2000)
+
+
+    def test_given_deck(self):
+        ''' A board given a deck deals from it rather than shuffling '''
+
+        decks = random_decks(3, np.random.RandomState(5))
+        self.assertEqual(decks.shape, (3, 52))
+        for deck in decks:
+            self.assertEqual(sorted(deck.tolist()), sorted(range(13) * 4))
+        self.assertTrue((decks == random_decks(3, np.random.RandomState(5))).all())
+
+        board = Board(self.players, self.num_cols, deck=decks[0])
+        self.assertEqual(board.deck_down, decks[0].tolist())
+
+        board._deal_hands()
+        self.assertEqual(board.hands[0].cards, decks[0][:8:2].tolist())
+        self.assertEqual(board.hands[1].cards, decks[0][1:8:2].tolist())
+
+
+    def test_reset(self):
+        ''' A reset board plays a new game as a new board would '''
+
+        players = [RandomPlayer(), RandomPlayer()]
+        board = Board(players, self.num_cols)
+        decks = random_decks(2, np.random.RandomState(1))
+
+        random.seed(2)
+        scores = Board(players, self.num_cols, deck=decks[1]).play_game()
+
+        board.play_game()
+        board.reset(list(reversed(players)), deck=decks[1])
+        self.assertEqual(board.players, list(reversed(players)))
+        self.assertEqual(board.deck_down, decks[1].tolist())
+        self.assertFalse(board.has_knocked)
+        self.assertEqual(board.deck_visible, [])
+
+        random.seed(2)
+        self.assertEqual(board.play_game(), scores)
+
+
+    def _looping_players(self):
+        ''' Deterministic players that only ever swap the face up card into their first slot '''
+
+        return [SwapUpPlayer(), SwapUpPlayer()]
+
+
+    def test_cycle_detection(self):
+        ''' Looping games between deterministic players end as a forfeit once a position repeats '''
+
+        deck = random_decks(1, np.random.RandomState(3))[0]
+
+        board = Board(self._looping_players(), self.num_cols, deck=deck)
+        self.assertEqual(board.play_game(), [0, 0])
+        self.assertIsNotNone(board.cycle_turn)
+        self.assertLess(board.cycle_turn, 20)
+
+        # Without detection the same game runs to the turn limit
+        board = Board(self._looping_players(), self.num_cols, deck=deck, detect_cycles=False)
+        self.assertEqual(board.play_game(), [0, 0])
+        self.assertIsNone(board.cycle_turn)
+
+        # Players that are not deterministic might leave the loop, so it is played out
+        players = self._looping_players()
+        players[1].is_deterministic = False
+        board = Board(players, self.num_cols, deck=deck)
+        self.assertEqual(board.play_game(), [0, 0])
+        self.assertIsNone(board.cycle_turn)
+
+
+    def _snapshotting_players(self, at_turn, taken):
+        ''' Random players - the first to move on at_turn stores the board's snapshot and random state in taken '''
+
+        players = [RandomPlayer(), RandomPlayer()]
+        for player in players:
+            def turn_phase_1(state, possible_moves, player=player):
+                board = taken['board']
+                if board.turn == at_turn and 'snapshot' not in taken:
+                    taken['snapshot'] = board.snapshot()
+                    taken['random'] = random.getstate()
+                return RandomPlayer.turn_phase_1(player, state, possible_moves)
+
+            player.turn_phase_1 = turn_phase_1
+
+        return players
+
+
+    def test_snapshot_fork(self):
+        ''' A fork resumed from a snapshot plays out as the original game, without changing it '''
+
+        taken = {}
+        board = Board(self._snapshotting_players(6, taken), self.num_cols, deck=random_decks(1, np.random.RandomState(4))[0])
+        taken['board'] = board
+
+        random.seed(7)
+        scores = board.play_game()
+        snapshot = taken['snapshot']
+        self.assertEqual(snapshot.dtype, np.int16)
+        self.assertEqual(snapshot[1], 6)
+        self.assertEqual(len(snapshot), 9 + 52)
+
+        board.restore(snapshot)
+        self.assertTrue((board.snapshot() == snapshot).all())
+        fork = board.fork(players=[RandomPlayer(), RandomPlayer()])
+        self.assertTrue((fork.snapshot() == snapshot).all())
+        self.assertEqual(fork.turn, 6)
+        self.assertEqual(sorted(sum([h.cards for h in fork.hands], []) + fork.deck_down + list(fork.deck_up)),
+                         sorted(range(13) * 4))
+
+        random.setstate(taken['random'])
+        self.assertEqual(fork.play_game(resume=True), scores)
+
+        # Playing the fork left the original position alone
+        self.assertTrue((board.snapshot() == snapshot).all())
+        random.setstate(taken['random'])
+        self.assertEqual(board.play_game(resume=True), scores)
+
+
+    def test_fork_hidden_cards(self):
+        ''' Forks can deal the cards a player has not seen differently - never the cards they have seen '''
+
+        board = Board(self.players, self.num_cols, deck=random_decks(1, np.random.RandomState(6))[0])
+        board.state.push_up(board.deck.draw())
+        board._deal_hands()
+        snapshot = board.snapshot()
+
+        # Each player has only seen one row of their own hand
+        places = hidden_places(snapshot, 0)
+        self.assertEqual(len(places), 2 + 4 + 43)
+        self.assertEqual(places[:2].tolist(), [10, 12])
+        self.assertEqual(places[2:6].tolist(), [13, 14, 15, 16])
+
+        hidden = snapshot[places][::-1]
+        fork = board.fork(seat=0, hidden=hidden)
+        self.assertEqual(fork.hands[0].cards[0::2], board.hands[0].cards[0::2])
+        self.assertEqual(fork.hands[0].cards[1::2], hidden[:2].tolist())
+        self.assertEqual(fork.hands[1].cards, hidden[2:6].tolist())
+        self.assertEqual(fork.deck_up, board.deck_up)
+        self.assertEqual(fork.hands[0].masks(), board.hands[0].masks())
+
+        shuffled = shuffle_hidden(snapshot, 0, np.random.RandomState(1))
+        visible = np.ones(len(snapshot), dtype=bool)
+        visible[places] = False
+        self.assertTrue((shuffled[visible] == snapshot[visible]).all())
+        self.assertEqual(sorted(shuffled[places].tolist()), sorted(snapshot[places].tolist()))
+
+        with self.assertRaises(ValueError):
+            substitute_hidden(snapshot, 0, np.zeros(len(places)))
+        with self.assertRaises(ValueError):
+            board.fork(seat=0, hidden=hidden[1:])
+
+
+    def test_fork_freezes_trainable_players(self):
+        ''' By default a fork plays trainable players as frozen copies - the originals are not trained '''
+
+        player = QWatkinsPlayer()
+        player.setup_trainer(checkpoint_dir='my_checkpoint_dir', learning_rate=0.01, epsilon=0.1)
+        player.weights = np.array([1.0, 0.5, 0.25, -0.5, 0.1])
+        opponent = RandomPlayer()
+
+        board = Board([player, opponent], self.num_cols, deck=random_decks(1, np.random.RandomState(2))[0])
+        board.state.push_up(board.deck.draw())
+        board._deal_hands()
+
+        fork = board.fork()
+        self.assertIsNot(fork.players[0], player)
+        self.assertFalse(fork.players[0].is_trainable)
+        self.assertIs(fork.players[1], opponent)
+
+        random.seed(3)
+        fork.play_game(resume=True)
+
+        self.assertTrue(player.is_trainable)
+        self.assertTrue(np.array_equal(player.weights, [1.0, 0.5, 0.25, -0.5, 0.1]))
+
+
+    def test_resume_with_recorder(self):
+        ''' A resumed game has no deal to record '''
+
+        board = Board(self.players, self.num_cols, recorder=object())
+        with self.assertRaises(ValueError):
+            board.play_game(resume=True)
@@ -0,0 +1,62 @@
+''' Tests for the face down deck
+'''
+import random
+import unittest2
+from golf.deck import Deck, FULL_DECK, shuffle_region
+
+
+class TestDeck(unittest2.TestCase):
+    ''' test drawing, dealing and reshuffling the deck '''
+
+    def test_draw_and_deal(self):
+        ''' Cards come off the top in order without moving the rest '''
+
+        deck = Deck(range(10))
+        cards = deck.cards
+
+        self.assertEqual(deck.draw(), 0)
+        self.assertEqual(deck.deal(4), [1, 2, 3, 4])
+        self.assertEqual(len(deck), 5)
+        self.assertEqual(deck.remaining(), [5, 6, 7, 8, 9])
+        self.assertIs(deck.cards, cards)
+
+
+    def test_shuffle_matches_random_shuffle(self):
+        ''' Region shuffles use the random number generator exactly as random.shuffle does '''
+
+        random.seed(3)
+        expected = list(FULL_DECK)
+        random.shuffle(expected)
+
+        random.seed(3)
+        deck = Deck()
+        deck.reset()
+        self.assertEqual(deck.remaining(), expected)
+
+        cards = range(20)
+        random.seed(4)
+        shuffle_region(cards, 8)
+        random.seed(4)
+        expected = range(8)
+        random.shuffle(expected)
+        self.assertEqual(cards, expected + range(8, 20))
+
+
+    def test_refill(self):
+        ''' A refill shuffles the discard pile into the space of the drawn cards '''
+
+        deck = Deck()
+        deck.reset()
+        deck.deal(52)
+        self.assertEqual(len(deck), 0)
+
+        discard = [1, 2, 3, 4, 5, 6, 7]
+        deck.refill(discard)
+
+        self.assertEqual(len(deck), 7)
+        self.assertEqual(len(deck.cards), 52)
+        self.assertEqual(sorted(deck.remaining()), discard)
+
+        deck.reset()
+        self.assertEqual(len(deck), 52)
+        self.assertEqual(sorted(deck.remaining()), sorted(FULL_DECK))
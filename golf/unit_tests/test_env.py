@@ -0,0 +1,138 @@
+''' Tests for the reset / step environments - games must play exactly as they do on Board '''
+import random
+import itertools
+import unittest2
+import numpy as np
+from golf.board import Board
+from golf.batch_board import random_decks, PHASE_1_MOVES
+from golf.game_record import GameRecorder
+from golf.env import GolfEnv, VecGolfEnv, observation_size
+from golf.players.bayesball_player import BayesballPlayer
+from golf.players.batch_random_player import BatchRandomPlayer
+from golf.players.random_player import RandomPlayer
+
+
+def player_action(player, env, obs):
+    ''' The action a regular player takes in a game - given the dict state the board would give it '''
+
+    state = env.get_state()
+    if obs[0] == 0:
+        return PHASE_1_MOVES.index(player.turn_phase_1(state, PHASE_1_MOVES))
+
+    possible_moves = ('swap', 'return_to_deck',) if env.action_mask()[env.return_action] else ('swap',)
+    decision = player.turn_phase_2(int(obs[1]), state, possible_moves)
+    if decision[0] == 'swap':
+        return decision[2] * 2 + decision[1]
+
+    return env.return_action
+
+
+class TestEnv(unittest2.TestCase):
+    ''' Test the environments against the reference Board '''
+
+    def test_equivalent_to_board(self):
+        ''' A player acting through the environment plays the same game as on a Board '''
+
+        decks = random_decks(20, np.random.RandomState(3))
+        for opponent_cls, seat in itertools.product((BayesballPlayer, RandomPlayer), range(2)):
+            for i, deck in enumerate(decks):
+                with self.subTest(msg='{} seat {} deck {}'.format(opponent_cls.__name__, seat, i)):
+                    agent, opponent = BayesballPlayer(), opponent_cls()
+                    players = [opponent, agent] if seat else [agent, opponent]
+
+                    random.seed(i)
+                    recorder = GameRecorder()
+                    board = Board(players, 2, deck=deck, recorder=recorder, detect_cycles=False)
+                    scores = board.play_game()
+
+                    random.seed(i)
+                    env = GolfEnv(opponent, agent_seat=seat)
+                    obs = env.reset(deck)
+                    done = False
+                    while not done:
+                        obs, reward, done, info = env.step(player_action(agent, env, obs))
+
+                    self.assertEqual(info['scores'], scores)
+                    self.assertEqual(reward, scores[1 - seat] - scores[seat])
+                    self.assertEqual(info['turns'], len(recorder.records[0]))
+
+
+    def test_observations(self):
+        ''' Observations match the dict state and the legal actions follow the phase '''
+
+        env = GolfEnv(RandomPlayer(), seed=1)
+        obs = env.reset()
+        self.assertEqual(obs.shape, (observation_size(),))
+
+        state = env.get_state()
+        self.assertEqual(obs[0], 0)
+        self.assertEqual(obs[2], state['deck_up'][-1])
+        self.assertEqual(obs[4:8].tolist(), [-1 if a is None else a for a in state['self']['raw_cards']])
+        self.assertEqual(obs[-13:].tolist(), list(state['known_cards']))
+        self.assertEqual(env.action_mask().tolist(), [True, True, True, False, False])
+
+        obs, reward, done, info = env.step(1)
+        self.assertEqual(obs[0], 1)
+        self.assertNotEqual(obs[1], -1)
+        self.assertEqual(env.action_mask().tolist(), [True, True, True, True, True])
+
+        with self.assertRaises(ValueError):
+            GolfEnv(RandomPlayer(), seed=1).step(4)
+
+
+    def test_vectorized_seeds(self):
+        ''' Each game of a vectorized environment plays as the single environment with its seed '''
+
+        seeds = [5, 6, 7]
+
+        # A deterministic opponent, so the games only depend on the seeds and actions
+        vec_env = VecGolfEnv(3, BayesballPlayer(), seeds=seeds)
+        envs = [GolfEnv(BayesballPlayer(), seed=a) for a in seeds]
+
+        vec_obs = vec_env.reset()
+        obs = [env.reset() for env in envs]
+        rng = np.random.RandomState(2)
+        finished = 0
+
+        for _ in range(300):
+            self.assertEqual(vec_obs.tolist(), [a.tolist() for a in obs])
+
+            masks = vec_env.action_masks()
+            actions = [rng.choice(np.flatnonzero(mask)) for mask in masks]
+            vec_obs, rewards, dones, infos = vec_env.step(actions)
+
+            for i, env in enumerate(envs):
+                obs[i], reward, done, info = env.step(actions[i])
+                self.assertEqual(reward, rewards[i])
+                self.assertEqual(done, dones[i])
+                if done:
+                    finished += 1
+                    self.assertEqual(info['scores'], infos[i]['scores'])
+                    self.assertEqual(info['terminal_observation'].tolist(), infos[i]['terminal_observation'].tolist())
+
+        # Finished games were reset and played on
+        self.assertGreater(finished, 10)
+        self.assertEqual(vec_env.games, finished)
+
+
+    def test_batch_opponent(self):
+        ''' Many games against a batch player keep every card accounted for through auto-resets '''
+
+        vec_env = VecGolfEnv(64, BatchRandomPlayer(seed=1), seeds=range(64), agent_seat=1)
+        vec_env.reset()
+        rng = np.random.RandomState(3)
+        board = vec_env.board
+
+        for _ in range(100):
+            actions = [rng.choice(np.flatnonzero(mask)) for mask in vec_env.action_masks()]
+            vec_env.step(actions)
+
+            for i in range(vec_env.num_envs):
+                cards = board.hands[i].flatten().tolist() + \
+                        board.deck_up[i, :board.up_len[i]].tolist() + \
+                        board.deck_down[i, board.down_pos[i]:board.down_len[i]].tolist()
+                if vec_env.phase[i] == 2:
+                    cards.append(board.card[i])
+                self.assertEqual(sorted(cards), sorted(range(13) * 4))
+
+        self.assertGreater(vec_env.games, 64)
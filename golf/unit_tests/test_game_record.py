@@ -0,0 +1,143 @@
+''' Tests for recording and replaying games '''
+import os
+import copy
+import random
+import shutil
+import tempfile
+import unittest2
+from golf.board import Board
+from golf.match import Match
+from golf.game_record import GameRecord, GameRecorder, GameRecordWriter, read_records, replay
+from golf.players.bayesball_player import BayesballPlayer
+from golf.players.random_player import RandomPlayer
+from golf.unit_tests.test_player.scripted_players import SwapUpPlayer
+
+
+class NeverKnockPlayer(RandomPlayer):
+    ''' Random player that never knocks - games run through reshuffles to the turn limit '''
+
+    def turn_phase_1(self, state, possible_moves=['face_up_card', 'face_down_card', 'knock']):
+        return random.choice(['face_up_card', 'face_down_card'])
+
+
+class StateRecordingPlayer(BayesballPlayer):
+    ''' Keeps a copy of the state at the start of every turn, shared between both seats '''
+
+    def __init__(self, states, *args, **kwargs):
+        super(StateRecordingPlayer, self).__init__(*args, **kwargs)
+        self.states = states
+
+    def turn_phase_1(self, state, possible_moves=['face_up_card', 'face_down_card', 'knock']):
+        self.states.append(copy.deepcopy(state))
+        return super(StateRecordingPlayer, self).turn_phase_1(state, possible_moves)
+
+
+class TestGameRecord(unittest2.TestCase):
+    ''' Test game records and replays '''
+
+    def _play_recorded(self, players, seed):
+        random.seed(seed)
+        recorder = GameRecorder()
+        board = Board(players, 2, recorder=recorder)
+        scores = board.play_game()
+        return board, scores, recorder.records[0]
+
+
+    def test_replay(self):
+        ''' Replayed games end exactly as they were played '''
+
+        reshuffled = 0
+        for player_cls in (BayesballPlayer, RandomPlayer, NeverKnockPlayer):
+            for seed in range(10):
+                with self.subTest(msg='{} seed {}'.format(player_cls.__name__, seed)):
+                    board, scores, record = self._play_recorded([player_cls(), player_cls()], seed)
+                    self.assertEqual(record.scores, scores)
+
+                    replayed, replayed_scores = replay(record)
+                    self.assertEqual(replayed_scores, scores)
+                    self.assertEqual([h.cards for h in replayed.hands], [h.cards for h in board.hands])
+                    self.assertEqual(list(replayed.deck_up), list(board.deck_up))
+                    self.assertEqual(replayed.deck_down, board.deck_down)
+                    reshuffled += len(record.reshuffles)
+
+        # The forfeit games ran through reshuffles
+        self.assertEqual(len(record), 1000)
+        self.assertGreater(reshuffled, 0)
+
+
+    def test_replay_to_turn(self):
+        ''' Replays can stop at any turn with the state the player saw then '''
+
+        states = []
+        board, scores, record = self._play_recorded([StateRecordingPlayer(states), StateRecordingPlayer(states)], 3)
+        self.assertEqual(len(states), len(record))
+
+        state = random.getstate()
+        for turn in range(len(record)):
+            replayed, replayed_scores = replay(record, turn)
+            self.assertIsNone(replayed_scores)
+            self.assertEqual(replayed.get_state_for_player(turn % 2), states[turn])
+
+        # Replays leave the random state alone
+        self.assertEqual(random.getstate(), state)
+
+
+    def test_array_round_trip(self):
+        _, _, record = self._play_recorded([NeverKnockPlayer(), NeverKnockPlayer()], 1)
+
+        array = record.to_array()
+        self.assertEqual(array.dtype.name, 'int16')
+
+        copied = GameRecord.from_array(array)
+        for name in ('num_cols', 'deck', 'turns', 'reshuffles', 'scores'):
+            self.assertEqual(getattr(copied, name), getattr(record, name))
+
+
+    def test_writer(self):
+        ''' Records written in chunks are read back in order '''
+
+        record_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(record_dir, 'games.rec')
+            records = [self._play_recorded([RandomPlayer(), RandomPlayer()], i)[2] for i in range(10)]
+
+            with GameRecordWriter(path, chunk_size=3) as writer:
+                recorder = GameRecorder(writer)
+                for record in records:
+                    recorder.add(record)
+
+            read = list(read_records(path))
+            self.assertEqual([r.to_array().tolist() for r in read], [r.to_array().tolist() for r in records])
+        finally:
+            shutil.rmtree(record_dir)
+
+
+    def test_match_recording(self):
+        ''' Matches record every game, also when played across processes '''
+
+        records = []
+        for processes in (None, 2):
+            match = Match(RandomPlayer(), RandomPlayer(), holes=2, recorder=GameRecorder())
+            match.play_k_matches(3, processes=processes, seed=5)
+            records.append([r.to_array().tolist() for r in match.recorder.records])
+
+        self.assertEqual(len(records[0]), 6)
+        self.assertEqual(records[0], records[1])
+
+
+    def test_replay_cycle(self):
+        ''' Games cut short because a position repeated are replayed to the same turn '''
+
+        board, scores, record = self._play_recorded([SwapUpPlayer(), SwapUpPlayer()], 3)
+        self.assertEqual(scores, [0, 0])
+        self.assertTrue(record.ended_in_cycle())
+        self.assertEqual(len(record), board.cycle_turn)
+
+        replayed, replayed_scores = replay(record)
+        self.assertEqual(replayed_scores, [0, 0])
+        self.assertEqual(replayed.cycle_turn, board.cycle_turn)
+        self.assertEqual([h.cards for h in replayed.hands], [h.cards for h in board.hands])
+
+        # A game that ran to the turn limit is not
+        board, scores, record = self._play_recorded([NeverKnockPlayer(), NeverKnockPlayer()], 3)
+        self.assertFalse(record.ended_in_cycle())
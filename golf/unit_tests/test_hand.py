@@ -2,7 +2,7 @@
 import unittest2
 from random import shuffle
 
-from golf.hand import Hand, GolfHandOutOfIndexError
+from golf.hand import Hand, GolfHandOutOfIndexError, COLUMN_SCORES, UNKNOWN_CARD, _score_any_cards
 
 
 class TestHand(unittest2.TestCase):
@@ -109,6 +109,23 @@ class TestHand(unittest2.TestCase):
         self.assertEqual(self.hand.score(cards=[None, 5,5,None]), 10)
 
 
+    def test_column_score_table(self):
+        ''' The lookup table should agree with scoring the cards directly - including
+            unknown cards and estimated (float) card values
+        '''
+
+        for top in range(13):
+            for bottom in range(13):
+                self.assertEqual(COLUMN_SCORES[top][bottom], _score_any_cards([top, bottom]))
+            self.assertEqual(COLUMN_SCORES[top][UNKNOWN_CARD], min(top, 10))
+            self.assertEqual(COLUMN_SCORES[UNKNOWN_CARD][top], min(top, 10))
+        self.assertEqual(COLUMN_SCORES[UNKNOWN_CARD][UNKNOWN_CARD], 0)
+
+        self._load_hand(num_cols=2, cards_dealt=[2,3,4,5])
+        self.assertEqual(self.hand.score(cards=[6.5, 3, None, 6.5]), 16)
+        self.assertEqual(self.hand.score(cards=[6.0, 6, 4, None]), 4)
+
+
     def test_coord_to_index(self):
         ''' Test coords to index and index to coords methods -
             these methods should be able to access all cards, and should
@@ -166,6 +183,12 @@ class TestHand(unittest2.TestCase):
         self.hand.swap(0,0,10)
 
         self.assertEqual(self.hand.cards[self.hand._coords_to_index(0,0)], 10)
+        self.assertEqual(self.hand.self_revealed, [True, False, True, False])
+        self.assertEqual(self.hand.opp_revealed, [False] * 4)
+
+        self.hand.swap(1,1,12, source_revealed=True)
+        self.assertEqual(self.hand.self_revealed, [True, False, True, True])
+        self.assertEqual(self.hand.opp_revealed, [False, False, False, True])
 
 
     def test_state(self):
@@ -195,3 +218,16 @@ class TestHand(unittest2.TestCase):
         self.assertEqual([a for a in self.hand.visible(is_self=False)], state['raw_cards'])
         self.assertEqual(state['num_rows'], 2)
         self.assertEqual(state['num_cols'], 2)
+
+
+    def test_position_key(self):
+        ''' Hands share a position key only when their cards and what has been seen match '''
+
+        self._load_hand(num_cols=2, cards_dealt=[1,2,3,4])
+        key = self.hand.position_key()
+        self.assertEqual(key, Hand([1,2,3,4]).position_key())
+        self.assertNotEqual(key, Hand([1,2,4,3]).position_key())
+
+        self.hand.swap(0, 0, 1, source_revealed=True)
+        self.assertEqual(self.hand.cards, [1,2,3,4])
+        self.assertNotEqual(key, self.hand.position_key())
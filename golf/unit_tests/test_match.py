@@ -2,7 +2,10 @@
     as this is the component where much of the logic comes together
 '''
 import unittest2
-from golf.match import Match
+from golf.match import Match, match_seed
+from golf.players.random_player import RandomPlayer
+from golf.players.bayesball_player import BayesballPlayer
+from golf.unit_tests.test_player.scripted_players import SwapUpPlayer
 from mock import call, patch, Mock
 
 
@@ -13,6 +16,11 @@ class MockBoard(object):
         self.match_num = match_num
         self.cur_turn = 0
         self.player_scores = player_scores
+        self.resets = []
+        self.cycle_turn = None
+
+    def reset(self, players=None, deck=None, player_ids=None):
+        self.resets.append((players, deck,))
 
     def play_game(self):
         scores = [self.player_scores[(self.cur_turn + self.match_num + i) % 2] for i in range(2)]
@@ -55,12 +63,10 @@ class TestMatch(unittest2.TestCase):
         for i in range(2):
             self.assertEqual(scores[i], player_scores[i] * num_holes)
 
-        # We want to make sure that we're alternating calls to board
-        calls = [call([self.players['player1'], self.players['player2']],2,verbose=False),
-                 call([self.players['player2'], self.players['player1']],2,verbose=False)] * 5
-        calls = calls[:len(calls)-1]
-
-        board_mock.assert_has_calls(calls)
+        # One board plays every hole - created for the first and then reset with the seats alternating
+        board_mock.assert_called_with([self.players['player1'], self.players['player2']],2,player_ids=[0, 1],verbose=False)
+        resets = [([self.players['player2'], self.players['player1']], None,), ([self.players['player1'], self.players['player2']], None,)] * 4
+        self.assertEqual(board_mock.return_value.resets, resets)
 
 
 
@@ -78,12 +84,10 @@ class TestMatch(unittest2.TestCase):
         for i in range(2):
             self.assertEqual(scores[i], player_scores[i] * num_holes)
 
-        # We want to make sure that we're alternating calls to board
-        calls = [call([self.players['player2'], self.players['player1']],2,verbose=False),
-                 call([self.players['player1'], self.players['player2']],2,verbose=False)] * 5
-        calls = calls[:len(calls)-1]
-
-        board_mock.assert_has_calls(calls)
+        # One board plays every hole - created for the first and then reset with the seats alternating
+        board_mock.assert_called_with([self.players['player2'], self.players['player1']],2,player_ids=[1, 0],verbose=False)
+        resets = [([self.players['player1'], self.players['player2']], None,), ([self.players['player2'], self.players['player1']], None,)] * 4
+        self.assertEqual(board_mock.return_value.resets, resets)
 
 
     def test_play_k_matches(self):
@@ -107,8 +111,80 @@ class TestMatch(unittest2.TestCase):
         self.assertEqual(match.matches[1], 30)
 
 
+    def test_seeded_matches(self):
+        ''' Seeded matches should have the same results however many processes play them '''
+
+        def play(processes):
+            match = Match(RandomPlayer(), RandomPlayer(), holes=3)
+            results = match.play_k_matches(8, processes=processes, seed=42)
+            return results, match.match_scores
+
+        serial = play(None)
+        self.assertEqual(serial, play(None))
+        self.assertEqual(serial, play(2))
+        self.assertEqual(serial, play(3))
+
+
+    def test_cycle_counts(self):
+        ''' Looping games ended early are counted however many processes play them '''
+
+        def play(processes):
+            match = Match(SwapUpPlayer(), SwapUpPlayer(), holes=3)
+            match.play_k_matches(4, processes=processes, seed=1)
+            return match.cycles, match.cycle_turns_saved
+
+        cycles, turns_saved = play(None)
+        self.assertEqual(cycles, 12)
+        self.assertGreater(turns_saved, 12 * 900)
+        self.assertEqual(play(2), (cycles, turns_saved,))
+
+
+    def test_match_seed(self):
+        ''' Match seeds depend on both the base seed and the match index '''
+
+        self.assertEqual(match_seed(1, 2), match_seed(1, 2))
+        self.assertNotEqual(match_seed(1, 2), match_seed(2, 1))
+        self.assertNotEqual(match_seed(1, 2), match_seed(1, 3))
+
+
+    @patch('golf.match.Board')
+    def test_duplicate_deals(self, board_mock):
+        ''' Every deal is played twice with the seats swapped and the same deck for each hole '''
+
+        match = Match(holes=2, verbose=False, **self.players)
+        boards = []
+
+        def new_board(players, num_cols, deck=None, **kwargs):
+            boards.append(MockBoard(match_num=0, player_scores=[3, 10]))
+            boards[-1].resets.append((players, deck,))
+            return boards[-1]
+
+        board_mock.side_effect = new_board
+
+        result = match.play_duplicate(3, seed=7)
+
+        # a board per match, reset for the second hole
+        self.assertEqual(len(boards), 6)
+        for deal in range(3):
+            first, second = boards[deal * 2].resets, boards[deal * 2 + 1].resets
+            for hole in range(2):
+                self.assertEqual(first[hole][0], list(reversed(second[hole][0])))
+                self.assertTrue((first[hole][1] == second[hole][1]).all())
+            self.assertFalse((first[0][1] == first[1][1]).all())
 
+        # The seats score 3 and 10 in turn - so the seat swap makes every deal even
+        self.assertEqual(result.deals, 3)
+        self.assertEqual(result.wins, (0, 0))
+        self.assertEqual(result.mean, 0)
+        self.assertEqual(result.variance, 0)
 
 
+    def test_duplicate_identical_players(self):
+        ''' Identical deterministic players tie every duplicate deal '''
 
+        match = Match(BayesballPlayer(), BayesballPlayer(), holes=3)
+        result = match.play_duplicate(5, seed=1)
 
+        self.assertEqual(result.wins, (0, 0))
+        self.assertEqual(result.mean, 0)
+        self.assertEqual(result.std_error, 0)
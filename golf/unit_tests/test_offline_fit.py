@@ -0,0 +1,66 @@
+''' Tests for fitting QWatkinsPlayer weights offline '''
+import os
+import shutil
+import tempfile
+import unittest2
+import numpy as np
+from golf import offline_fit
+from golf.players.replay_buffer import ReplayBuffer
+from golf.players.q_watkins_player import QWatkinsPlayer
+
+
+class TestOfflineFit(unittest2.TestCase):
+    ''' Fit weights from transitions whose true q-values are known '''
+
+    def setUp(self):
+        self.replay_dir = tempfile.mkdtemp()
+        self.weights = np.array([0.5, -0.25, 0.1, 0.3, -0.2])
+        self.discount = 0.7
+
+        # Rewards are chosen so the transitions are consistent with self.weights exactly
+        rng = np.random.RandomState(0)
+        self.paths = []
+        for i in range(2):
+            path = os.path.join(self.replay_dir, 'replay_{}.dat'.format(i))
+            buf = ReplayBuffer(500, path=path)
+            for _ in range(400):
+                features, next_features = rng.rand(5) * 20, rng.rand(5) * 20
+                offset, next_offset = rng.rand() * 20, rng.rand() * 20
+                terminal = rng.rand() < 0.1
+
+                q_score = np.dot(offset - features, self.weights)
+                q_prime_score = 0 if terminal else np.dot(next_offset - next_features, self.weights)
+                buf.add(features, offset, q_score - self.discount * q_prime_score, next_features, next_offset, terminal)
+
+            buf.flush()
+            self.paths.append(path)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.replay_dir)
+
+
+    def test_stream_transitions(self):
+        chunks = list(offline_fit.stream_transitions(self.paths, chunk_size=150))
+        self.assertEqual([len(a) for a in chunks], [150, 150, 100] * 2)
+
+
+    def test_fit(self):
+        ''' Both methods recover the weights '''
+
+        for method in offline_fit.METHODS:
+            with self.subTest(msg=method):
+                weights, count = offline_fit.fit(self.paths, method, discount=self.discount, regularization=0, chunk_size=128)
+                self.assertEqual(count, 800)
+                self.assertTrue(np.allclose(weights, self.weights))
+
+
+    def test_save_weights(self):
+        ''' Fit weights are a checkpoint QWatkinsPlayer loads '''
+
+        weights, count = offline_fit.fit(self.paths, discount=self.discount)
+        path = os.path.join(self.replay_dir, 'fit.pkl')
+        offline_fit.save_weights(weights, path)
+
+        player = QWatkinsPlayer(model_file=path)
+        self.assertTrue(np.array_equal(player.weights, weights))
@@ -0,0 +1,88 @@
+''' Tests for Hogwild training in worker processes '''
+import multiprocessing
+import numpy as np
+import unittest2
+from golf.parallel_trainer import ParallelTrainer
+from golf.profiling import PhaseTimer
+from golf.players.q_watkins_player import QWatkinsPlayer
+from golf.players.bayesball_player import BayesballPlayer
+from golf.players.random_player import RandomPlayer
+from mock import patch
+
+
+class TestParallelTrainer(unittest2.TestCase):
+    ''' Workers train on shared weights, the parent keeps the epoch accounting '''
+
+    def _trainable_player(self):
+        player = QWatkinsPlayer()
+        player.setup_trainer(checkpoint_dir='my_checkpoint_dir', learning_rate=0.00001, epsilon=0.1)
+        return player
+
+
+    def test_share_weights(self):
+        ''' Updates land in the shared buffer, where every player sharing it sees them '''
+
+        buffer = multiprocessing.Array('d', 6, lock=False)
+        players = [self._trainable_player() for _ in range(2)]
+        for player in players:
+            player.share_weights(buffer)
+
+        version = players[1]._current_weights_version()
+        players[0]._apply_update(np.arange(5.0))
+        players[0]._apply_update(np.ones(5))
+
+        self.assertTrue(np.allclose(players[1].weights, np.arange(5.0) + 1))
+        self.assertTrue(np.allclose(np.frombuffer(buffer)[:5], np.arange(5.0) + 1))
+        self.assertEqual(players[1]._current_weights_version(), version + 2)
+
+        # A frozen copy is a snapshot, no longer shared
+        frozen = players[1].frozen_copy()
+        players[0]._apply_update(np.ones(5))
+        self.assertTrue(np.allclose(frozen.weights, np.arange(5.0) + 1))
+        self.assertTrue(np.allclose(players[1].weights, np.arange(5.0) + 2))
+
+
+    def test_invalid_players(self):
+        ''' Only a trainable player that can share its weights is trained in parallel '''
+
+        with self.assertRaises(ValueError):
+            ParallelTrainer(self._trainable_player(), BayesballPlayer(), processes=2)
+
+        with self.assertRaises(ValueError):
+            ParallelTrainer(RandomPlayer(), BayesballPlayer(), trainable_player='player1', processes=2)
+
+
+    @patch('golf.trainer.benchmark_player', return_value=(3, 7))
+    @patch.object(QWatkinsPlayer, 'save_checkpoint')
+    @patch.object(QWatkinsPlayer, 'update_learning_rate')
+    def test_train_k_epochs(self, update_mock, save_mock, benchmark_mock):
+        ''' Every epoch is played by a worker, and accounted for in order by the parent '''
+
+        player = self._trainable_player()
+        trainer = ParallelTrainer(BayesballPlayer(), player, trainable_player='player2', processes=2, holes=1,
+                                  checkpoint_epochs=2, seed=0)
+        trainer.train_k_epochs(4)
+
+        self.assertEqual([a[0][0] for a in update_mock.call_args_list], [0, 1, 2, 3])
+        self.assertEqual([a[0][0] for a in save_mock.call_args_list], [1, 3, 4])
+        self.assertEqual(trainer.eval_results, [[7, 3], [7, 3], [7, 3]])
+
+        # The parent's player holds the trained shared weights
+        self.assertGreater(trainer.num_updates, 0)
+        self.assertFalse(np.allclose(player.weights, 0))
+        self.assertTrue(np.allclose(player.weights, np.frombuffer(trainer._buffer)[:-1]))
+        self.assertTrue(player.is_trainable)
+
+
+    @patch('golf.trainer.benchmark_player', return_value=(3, 7))
+    @patch.object(QWatkinsPlayer, 'save_checkpoint')
+    def test_profile(self, save_mock, benchmark_mock):
+        ''' Phase timings of the matches played by the workers are merged into the parent's timer '''
+
+        timer = PhaseTimer()
+        trainer = ParallelTrainer(BayesballPlayer(), self._trainable_player(), trainable_player='player2', processes=2,
+                                  holes=1, seed=0, timer=timer)
+        trainer.train_k_epochs(3)
+
+        self.assertEqual(timer.counts[('deal', None, None)], 3)
+        self.assertGreater(sum([count for key, count in timer.counts.items() if key[0] == 'update_weights']), 0)
@@ -0,0 +1,14 @@
+''' Players with scripted decisions - shared by the board, match and game record tests '''
+from golf.players.random_player import RandomPlayer
+
+
+class SwapUpPlayer(RandomPlayer):
+    ''' Deterministic player that only ever swaps the face up card into its first slot - games loop '''
+
+    is_deterministic = True
+
+    def turn_phase_1(self, state, possible_moves=['face_up_card', 'face_down_card', 'knock']):
+        return 'face_up_card'
+
+    def turn_phase_2(self, card, state, possible_moves=['return_to_deck', 'swap']):
+        return ('swap', 0, 0,)
@@ -1,7 +1,8 @@
 ''' Bayesball player - makes decisions based on calculated probabilities, so
     appropriate unit tests would confirm the expected policies
 '''
-
+import random
+from golf.board import Board
 from golf.unit_tests.test_player.player_test_base import PlayerTestBase
 from golf.players.bayesball_player import BayesballPlayer
 
@@ -208,3 +209,27 @@ class TestBayesballPlayer(PlayerTestBase):
 
 
 
+
+
+    def test_decision_cache(self):
+        """ Cached decisions are the same as those calculated without a cache """
+
+        random.seed(2)
+        cached = [BayesballPlayer(cache_size=1000), BayesballPlayer(cache_size=1000)]
+        uncached = [BayesballPlayer(cache_size=0), BayesballPlayer(cache_size=0)]
+
+        for i in range(200):
+            board = Board(cached, 2)
+            deck = list(board.deck_down)
+            scores = board.play_game()
+
+            board = Board(uncached, 2)
+            board.deck_down = deck
+            self.assertEqual(board.play_game(), scores)
+
+        self.assertGreater(cached[0].decision_cache.hits, 0)
+        self.assertLessEqual(len(cached[0].decision_cache), 1000)
+        self.assertIsNone(uncached[0].decision_cache)
+
+        # Caching is opt-in
+        self.assertIsNone(BayesballPlayer().decision_cache)
@@ -0,0 +1,59 @@
+''' Tests for the decision cache '''
+import os
+import shutil
+import tempfile
+import unittest2
+from golf.players.decision_cache import DecisionCache
+
+
+class TestDecisionCache(unittest2.TestCase):
+    ''' Test lookups, eviction and snapshots '''
+
+    def test_get_and_put(self):
+        ''' Hits and misses are counted '''
+
+        cache = DecisionCache(10)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', 'knock')
+        self.assertEqual(cache.get('a'), 'knock')
+        self.assertEqual(cache.get('b', 'default'), 'default')
+
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertAlmostEqual(cache.hit_rate(), 1 / 3.0)
+
+
+    def test_eviction(self):
+        ''' The cache stays bounded and keeps recently used entries '''
+
+        cache = DecisionCache(6)
+        for i in range(3):
+            cache.put(i, i)
+
+        # 0 is used again so it survives the next generation being dropped
+        self.assertEqual(cache.get(0), 0)
+        for i in range(3, 6):
+            cache.put(i, i)
+
+        self.assertLessEqual(len(cache), 6)
+        self.assertIn(0, cache)
+        self.assertNotIn(1, cache)
+        self.assertIn(5, cache)
+
+
+    def test_snapshot(self):
+        ''' Snapshots are only loaded by caches with the same params '''
+
+        cache_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(cache_dir, 'cache.pkl')
+            cache = DecisionCache(10, path=path, params=(8, 1))
+            cache.put((1, 2), ('swap', 0, 1))
+            cache.save()
+
+            cache = DecisionCache(10, path=path, params=(8, 1))
+            self.assertEqual(cache.get((1, 2)), ('swap', 0, 1))
+
+            cache = DecisionCache(10, path=path, params=(4, 1))
+            self.assertEqual(len(cache), 0)
+        finally:
+            shutil.rmtree(cache_dir)
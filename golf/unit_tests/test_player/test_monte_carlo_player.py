@@ -0,0 +1,100 @@
+''' Monte Carlo player - looks ahead with batched rollouts
+'''
+import cPickle
+import numpy as np
+from golf.unit_tests.test_player.player_test_base import PlayerTestBase
+from golf.players.monte_carlo_player import MonteCarloPlayer
+from golf.players.bayesball_player import BayesballPlayer
+from golf.board import Board
+from golf.match import Match
+
+class TestMonteCarloPlayer(PlayerTestBase):
+    ''' Test the decisions of the Monte Carlo player '''
+
+    def setUp(self):
+        self.player = MonteCarloPlayer(rollouts=400, batch_size=64, seed=0)
+        self_state = self._generate_player_state(score=13,
+                                                 visible=[True,True,True,True],
+                                                 raw_cards=[12,3,4,4])
+        opp_state = self._generate_player_state(score=3,
+                                                visible=[True,False,True,False],
+                                                raw_cards=[1,None,2,None])
+        self.state = self._generate_game_state(self_state, [opp_state], deck_up=[5, 0], has_knocked=True)
+
+
+    def test_player_name(self):
+        ''' Basic test for setup '''
+
+        self.assertEqual(str(self.player), 'Monte Carlo Player')
+
+
+    def test_turn_phase_1(self):
+        ''' The opponent has knocked - take the king from the face up pile '''
+
+        self.assertEqual(self.player.turn_phase_1(self.state), 'face_up_card')
+        self.assertEqual(len(self.player.last_values), 3)
+        self.assertEqual(self.player.decisions, 1)
+        self.assertGreaterEqual(self.player.total_rollouts, 400)
+
+
+    def test_turn_phase_2(self):
+        ''' A king goes over the queen rather than breaking up the pair - and the return is only
+            considered when it is allowed
+        '''
+
+        self.assertEqual(self.player.turn_phase_2(0, self.state, ('swap',)), ('swap', 0, 0,))
+        self.assertEqual(len(self.player.last_values), 4)
+
+        self.assertEqual(self.player.turn_phase_2(0, self.state, ('swap', 'return_to_deck',)), ('swap', 0, 0,))
+        self.assertEqual(len(self.player.last_values), 5)
+        self.assertGreater(self.player.rollouts_per_second, 0)
+
+
+    def test_turn_phase_2_return(self):
+        ''' A queen drawn onto two pairs goes back to the deck - as a tuple, like every other player's moves '''
+
+        self_state = self._generate_player_state(score=2,
+                                                 visible=[True,True,True,True],
+                                                 raw_cards=[1,1,0,0])
+        state = self._generate_game_state(self_state, [self.state['opp'][0]], deck_up=[5], has_knocked=True)
+
+        decision = self.player.turn_phase_2(12, state, ('swap', 'return_to_deck',))
+        self.assertEqual(decision, ('return_to_deck',))
+        self.assertIsInstance(decision, tuple)
+
+
+    def test_processes(self):
+        ''' Rollouts split across worker processes - the pool is not copied with the player '''
+
+        player = MonteCarloPlayer(rollouts=400, batch_size=64, processes=2, seed=0)
+        try:
+            self.assertEqual(player.turn_phase_2(0, self.state, ('swap',)), ('swap', 0, 0,))
+            self.assertGreaterEqual(player.total_rollouts, 400)
+            self.assertIsNotNone(player._pool)
+            self.assertIsNone(cPickle.loads(cPickle.dumps(player))._pool)
+        finally:
+            player.close()
+
+
+    def test_play_game(self):
+        ''' A whole hole against another player '''
+
+        player = MonteCarloPlayer(rollouts=100, batch_size=32, seed=0)
+        scores = Board([player, BayesballPlayer()], 2).play_game()
+        self.assertEqual(len(scores), 2)
+        self.assertGreater(player.decisions, 0)
+
+
+    def test_unseeded_matches_repeat(self):
+        ''' Without a seed the rollouts use numpy's global random state - seeded matches repeat '''
+
+        results = []
+        for i in range(2):
+            # Different global state when the player is made, the same once the match is seeded
+            np.random.seed(i)
+            player = MonteCarloPlayer(rollouts=60, batch_size=20)
+            wins = Match(player, BayesballPlayer(), holes=2).play_k_matches(2, seed=3)
+            results.append((wins, player.last_values.tolist(),))
+
+        self.assertEqual(results[0], results[1])
+        self.assertIs(cPickle.loads(cPickle.dumps(player)).rng, np.random)
@@ -1,4 +1,6 @@
 ''' Test the utility functions found in PlayerUtils '''
+import random
+import numpy as np
 from golf.players.player_utils import PlayerUtils
 from golf.unit_tests.test_player.player_test_base import PlayerTestBase
 
@@ -95,6 +97,15 @@ class TestPlayerUtils(PlayerTestBase):
             ac[10] += 1
             self.assertEqual(ac.values(), cards)
 
+        with self.subTest(msg='Test calc known cards from the running count kept by the board'):
+            counted_state = dict(basic_state)
+            counted_state['known_cards'] = all_cards.values()
+            cards = self.player_utils._calc_known_cards(counted_state, 10)
+            ac = dict(all_cards)
+            ac[10] += 1
+            self.assertEqual(ac.values(), cards)
+            self.assertEqual(counted_state['known_cards'], all_cards.values())
+
 
     def test_calc_unknown_cards(self):
         """ Test calculating the unknown cards """
@@ -117,20 +128,29 @@ class TestPlayerUtils(PlayerTestBase):
         """ Test utility method to calculate the standard deviation of an array of unknown cards """
 
         def return_known_cards(*args, **kwargs):
-            return []
-
-        def return_unknown_cards(*args, **kwargs):
-            return range(10)
+            # leaves exactly one of each of the cards in range(10) unknown
+            return [3] * 10 + [4] * 3
 
         # over-write the standard methods
         self.player_utils._calc_known_cards = return_known_cards
-        self.player_utils._calc_unknown_cards = return_unknown_cards
+        self.assertEqual(self.player_utils._calc_unknown_cards(return_known_cards()), range(10))
 
         # By definition the Standard deviation of range(10) = 2.872281323
         self.assertEqual(round(self.player_utils._calc_std_dev(None), 5),
                          round(2.872281323, 5))
 
 
+    def test_calc_standard_dev_from_counts(self):
+        """ The standard deviation from card counts should match numpy on the unknown deck """
+
+        for _ in range(20):
+            known_cards = [random.randint(0, 4) for a in range(13)]
+            self.player_utils._calc_known_cards = lambda *args, **kwargs: known_cards
+            unknown_cards = self.player_utils._calc_unknown_cards(known_cards)
+
+            self.assertAlmostEqual(self.player_utils._calc_std_dev(None), np.std(unknown_cards))
+
+
     def test_calc_score_for_cards(self):
         """ Test score calculation for an arbitrary Hand of cards
             Should follow the column rules etc for golf
@@ -33,3 +33,155 @@ class TestQWatkinsPlayer(PlayerTestBase):
         self.assertEqual(self.q_watkins.learning_rate, 0.001)
         self.assertEqual(self.q_watkins.epsilon, 0.25)
         self.assertEqual(self.q_watkins.discount, 0.8)
+
+
+    def _setup_state(self):
+        ''' A state with hidden cards in both hands, and the derived values cached '''
+
+        self_state = self._generate_player_state(score=3,
+                                                 visible=[True,False,True,False],
+                                                 raw_cards=[1,None,2,None])
+        opp_state = self._generate_player_state(score=20,
+                                                visible=[True,True,False,False],
+                                                raw_cards=[10,12,None,None])
+        state = self._generate_game_state(self_state, [opp_state], deck_up=[5, 2], has_knocked=False)
+        self.q_watkins._cache_state_derivative_values(state)
+        return state
+
+
+    def test_calc_feature_tensor(self):
+        ''' Every feature should match scoring the hand with that replacement and substitution '''
+
+        state = self._setup_state()
+        replacements = [2, self.q_watkins.avg_card, None]
+        features = self.q_watkins._calc_feature_tensor(state, replacements)
+
+        self.assertEqual(features.shape, (3, 4, 5))
+        self.assertEqual(features.dtype, np.float64)
+
+        substitutions = [min(max(self.q_watkins.avg_card + (self.q_watkins.card_std_dev * val), 0), 12)
+                         for val in [0, 1, 2, -1, -2]]
+
+        for a, card in enumerate(replacements):
+            for i in range(4):
+                for j, sub in enumerate(substitutions):
+                    location = None if card == None else i
+                    expected = self.q_watkins._calc_score_with_replacement(state['self']['raw_cards'], card, location, sub)
+                    self.assertAlmostEqual(features[a, i, j], expected)
+
+
+    def test_calc_move_score(self):
+        ''' Actions are scored against the weights, draws take their best position '''
+
+        state = self._setup_state()
+        self.q_watkins.weights = np.array([1.0, 0.5, 0.25, -0.5, 0.1])
+
+        moves = self.q_watkins._calc_move_score(state, ('face_up_card', 'face_down_card', 'knock',))
+        self.assertEqual([m['action'] for m in moves], ['face_up_card', 'face_down_card', 'knock'])
+
+        features = self.q_watkins._calc_feature_tensor(state, [2])[0]
+        scores = [np.dot(self.q_watkins.min_opp_score - f, self.q_watkins.weights) for f in features]
+        self.assertAlmostEqual(moves[0]['score'], max(scores))
+        self.assertTrue(np.allclose(moves[0]['raw_features'], features[np.argmax(scores)]))
+
+        moves = self.q_watkins._calc_move_score(state, ('swap', 'return_to_deck',), card_in_hand=4)
+        self.assertEqual([m['action'] for m in moves],
+                         [('swap', 0, 0), ('swap', 1, 0), ('swap', 0, 1), ('swap', 1, 1), 'return_to_deck'])
+
+
+    def test_update_weights_batch(self):
+        ''' A minibatch update is the average of the single transition updates '''
+
+        self.q_watkins.setup_trainer(checkpoint_dir='my_checkpoint_dir', learning_rate=0.01, replay_size=10)
+        self.q_watkins.weights = np.array([1.0, 0.5, 0.25, -0.5, 0.1])
+        rng = np.random.RandomState(0)
+        for i in range(4):
+            self.q_watkins.replay.add(rng.rand(5), rng.rand() * 10, rng.rand(), rng.rand(5), rng.rand() * 10, i == 3)
+
+        transitions = self.q_watkins.replay.data[:4]
+        weights = self.q_watkins.weights
+        expected = np.zeros(5)
+        for t in transitions:
+            q_score = np.dot(t['offset'] - t['features'], weights)
+            q_prime_score = 0 if t['terminal'] else np.dot(t['next_offset'] - t['next_features'], weights)
+            expected += 0.01 * (t['reward'] + 0.7 * q_prime_score - q_score) * t['features']
+
+        self.q_watkins._update_weights_batch(transitions, 0.01)
+        self.assertTrue(np.allclose(self.q_watkins.weights, weights + expected / 4))
+
+
+    def test_online_update_matches_batch(self):
+        ''' An online update makes the same update as a one transition minibatch - terminal or not '''
+
+        self.q_watkins.setup_trainer(checkpoint_dir='my_checkpoint_dir', learning_rate=0.01, replay_size=10)
+        rng = np.random.RandomState(1)
+        for terminal in (False, True):
+            weights = np.array([1.0, 0.5, 0.25, -0.5, 0.1])
+            self.q_watkins.weights = weights
+            q_state = {'raw_features': rng.rand(5), 'offset': rng.rand() * 10}
+            q_prime_state = {'raw_features': rng.rand(5), 'offset': rng.rand() * 10}
+            q_prime_state['score'] = np.dot(q_prime_state['offset'] - q_prime_state['raw_features'], weights)
+            reward = rng.rand()
+
+            # The current opponent score is not the one the q-state was valued against
+            self.q_watkins.min_opp_score = 100.0
+            self.q_watkins._update_weights(q_state, q_prime_state, reward, 0.01, terminal=terminal)
+            online = self.q_watkins.weights
+
+            self.q_watkins.weights = weights
+            replay = self.q_watkins.replay
+            replay.add(q_state['raw_features'], q_state['offset'], reward,
+                       q_prime_state['raw_features'], q_prime_state['offset'], terminal)
+            self.q_watkins._update_weights_batch(replay.data[len(replay) - 1:len(replay)], 0.01)
+
+            self.assertTrue(np.allclose(online, self.q_watkins.weights), msg='terminal={}'.format(terminal))
+            self.assertFalse(np.allclose(online, weights))
+
+
+    def test_frozen_copy(self):
+        ''' A frozen copy plays optimally from a snapshot of the weights, without the replay buffer '''
+
+        self.q_watkins.setup_trainer(checkpoint_dir='my_checkpoint_dir', epsilon=0.25, replay_size=10)
+        frozen = self.q_watkins.frozen_copy()
+
+        self.assertFalse(frozen.is_trainable)
+        self.assertEqual(frozen.epsilon, 0)
+        self.assertIsNone(frozen.replay)
+        self.assertIsNotNone(self.q_watkins.replay)
+        self.assertTrue(self.q_watkins.is_trainable)
+        self.assertEqual(self.q_watkins.epsilon, 0.25)
+
+        frozen.weights[0] = 1
+        self.assertEqual(self.q_watkins.weights[0], 0)
+
+
+    def test_evaluate_cache(self):
+        ''' A repeated evaluation reuses the scored moves until the weights are replaced '''
+
+        state = self._setup_state()
+        self.q_watkins.weights = np.array([1.0, 0.5, 0.25, -0.5, 0.1])
+        moves = ('swap', 'return_to_deck',)
+
+        # The derived values are recached for the card in hand, then checked against scoring directly
+        first = self.q_watkins._evaluate(state, moves, card_in_hand=4)
+        expected = self.q_watkins._calc_move_score(state, moves, card_in_hand=4)
+        self.assertEqual([m['score'] for m in first], [m['score'] for m in expected])
+
+        # Same fingerprint and weights - the same scored moves, in a new list
+        first.sort(key=lambda x: x['score'])
+        second = self.q_watkins._evaluate(state, moves, card_in_hand=4)
+        self.assertEqual([m['action'] for m in second], [m['action'] for m in expected])
+        self.assertIs(second[0], self.q_watkins._evaluation['moves'][0])
+
+        # New weights - the moves are rescored
+        self.q_watkins.weights = self.q_watkins.weights * 2
+        third = self.q_watkins._evaluate(state, moves, card_in_hand=4)
+        self.assertIsNot(third[0], second[0])
+        for old, new in zip(second, third):
+            self.assertAlmostEqual(new['score'], old['score'] * 2)
+
+        # A different card in hand - a new evaluation
+        fourth = self.q_watkins._evaluate(state, moves, card_in_hand=9)
+        self.assertNotEqual(self.q_watkins._evaluation['fingerprint'][0], 4)
+        expected = self.q_watkins._calc_move_score(state, moves, card_in_hand=9)
+        self.assertEqual([m['score'] for m in fourth], [m['score'] for m in expected])
@@ -0,0 +1,59 @@
+''' Tests for the experience replay buffer '''
+import os
+import shutil
+import tempfile
+import unittest2
+import numpy as np
+from golf.players.replay_buffer import ReplayBuffer
+
+
+class TestReplayBuffer(unittest2.TestCase):
+    ''' Test storing, sampling and persisting transitions '''
+
+    def _add(self, buf, value, terminal=False):
+        buf.add(np.full(5, value), value, -value, np.full(5, value + 1), value + 1, terminal)
+
+
+    def test_ring_buffer(self):
+        ''' The oldest transitions are overwritten once the buffer is full '''
+
+        buf = ReplayBuffer(3, seed=0)
+        for i in range(5):
+            self._add(buf, i, terminal=(i == 4))
+
+        self.assertEqual(len(buf), 3)
+        self.assertEqual(sorted(buf.data['offset'].tolist()), [2, 3, 4])
+        self.assertEqual(buf.data['terminal'].tolist(), [False, True, False])
+
+        batch = buf.sample(50)
+        self.assertEqual(batch.shape, (50,))
+        self.assertTrue(set(batch['offset'].tolist()) <= set([2, 3, 4]))
+        self.assertTrue(np.array_equal(batch['next_features'][:, 0], batch['offset'] + 1))
+
+
+    def test_empty_sample(self):
+        with self.assertRaises(ValueError):
+            ReplayBuffer(3).sample(1)
+
+
+    def test_memory_mapped(self):
+        ''' A memory-mapped buffer is picked up again with its contents and fill level '''
+
+        replay_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(replay_dir, 'replay.dat')
+            buf = ReplayBuffer(4, path=path)
+            for i in range(3):
+                self._add(buf, i)
+            buf.flush()
+            del buf
+
+            buf = ReplayBuffer(4, path=path)
+            self.assertEqual(len(buf), 3)
+            self.assertEqual(buf.position, 3)
+            self.assertEqual(buf.data['reward'][:3].tolist(), [0, -1, -2])
+
+            with self.assertRaises(ValueError):
+                ReplayBuffer(8, path=path)
+        finally:
+            shutil.rmtree(replay_dir)
@@ -0,0 +1,85 @@
+''' Table player - looks decisions up in the solver tables
+'''
+import random
+import shutil
+import tempfile
+from golf.board import Board
+from golf.hand import Hand
+from golf import solver
+from golf.unit_tests.test_player.player_test_base import PlayerTestBase
+from golf.players.table_player import TablePlayer
+from golf.players.bayesball_player import BayesballPlayer
+
+
+class TestTablePlayer(PlayerTestBase):
+    ''' Test the policies for the table player '''
+
+    def setUp(self):
+        self.player = TablePlayer()
+
+
+    def test_player_name(self):
+        self.assertEqual(str(self.player), 'Table Player')
+
+
+    def _state(self, self_cards, opp_cards, deck_up=[5], has_knocked=False):
+        self_state = self._generate_player_state(score=Hand(self_cards).score(self_cards),
+                                                 visible=[a != None for a in self_cards],
+                                                 raw_cards=self_cards)
+        opp_state = self._generate_player_state(score=Hand(opp_cards).score(opp_cards),
+                                                visible=[True] * 4,
+                                                raw_cards=opp_cards)
+        return self._generate_game_state(self_state, [opp_state], deck_up=deck_up, has_knocked=has_knocked)
+
+
+    def test_turn_phase_1(self):
+        ''' Knock with a finished low hand, take a matching face up card '''
+
+        state = self._state([1, 1, 0, 0], [10, None, 9, None])
+        self.assertEqual(self.player.turn_phase_1(state), 'knock')
+
+        state = self._state([9, None, 3, None], [1, None, 2, None], deck_up=[9])
+        self.assertEqual(self.player.turn_phase_1(state), 'face_up_card')
+
+        # Knocking is never an option once the opponent has knocked
+        state = self._state([1, 1, 0, 0], [10, None, 9, None], deck_up=[12], has_knocked=True)
+        self.assertEqual(self.player.turn_phase_1(state), 'face_down_card')
+
+
+    def test_turn_phase_2(self):
+        ''' Pair the card in hand, or return a high card that does not help '''
+
+        state = self._state([9, None, 3, None], [1, None, 2, None])
+        self.assertEqual(self.player.turn_phase_2(9, state, ['return_to_deck', 'swap']), ('swap', 1, 0))
+        self.assertEqual(self.player.turn_phase_2(3, state, ['swap']), ('swap', 1, 1))
+
+        state = self._state([1, 0, 2, 0], [1, None, 2, None])
+        self.assertEqual(self.player.turn_phase_2(12, state, ['return_to_deck', 'swap']), ('return_to_deck',))
+
+
+    def test_play_game(self):
+        ''' Tables only ever give legal moves '''
+
+        random.seed(0)
+        for _ in range(20):
+            scores = Board([self.player, BayesballPlayer()], 2).play_game()
+            self.assertEqual(len(scores), 2)
+
+
+    def test_knock_horizon(self):
+        ''' The knock horizon must lie within the tables - solved or loaded '''
+
+        with self.assertRaises(ValueError):
+            TablePlayer(horizon=2, knock_horizon=3)
+
+        table_dir = tempfile.mkdtemp()
+        try:
+            solver.save_tables(self.player.tables, table_dir)
+            self.assertEqual(TablePlayer(table_dir=table_dir, knock_horizon=3).knock_horizon, 3)
+
+            # Loaded tables are checked against the horizon they were solved with, not the horizon arg
+            self.assertEqual(TablePlayer(table_dir=table_dir, horizon=1, knock_horizon=3).knock_horizon, 3)
+            with self.assertRaises(ValueError):
+                TablePlayer(table_dir=table_dir, horizon=5, knock_horizon=4)
+        finally:
+            shutil.rmtree(table_dir)
@@ -0,0 +1,93 @@
+''' Tests for the opt-in profiling hooks '''
+import os
+import random
+import shutil
+import tempfile
+import unittest2
+from golf.board import Board
+from golf.match import Match
+from golf.profiling import PhaseTimer
+from golf.players.random_player import RandomPlayer
+from golf.players.bayesball_player import BayesballPlayer
+
+
+class TestProfiling(unittest2.TestCase):
+    ''' Test the phase timer and the board / match hooks '''
+
+    def test_phase_timer(self):
+        ''' Times and counts accumulate per phase, seat and player, and timers can be merged '''
+
+        timer = PhaseTimer()
+        timer.add('phase_1', 'player', 0.5, 0)
+        timer.add('phase_1', 'player', 0.25, 0)
+        timer.add('phase_1', 'player', 0.125, 1)
+        timer.add('deal', None, 0.1)
+
+        other = PhaseTimer()
+        other.add('phase_1', 'player', 1.0, 0)
+        timer.merge(other)
+
+        self.assertEqual(timer.counts[('phase_1', 0, 'player')], 3)
+        self.assertAlmostEqual(timer.times[('phase_1', 0, 'player')], 1.75)
+        self.assertEqual(timer.counts[('phase_1', 1, 'player')], 1)
+        self.assertAlmostEqual(timer.phase_totals()['phase_1'], 1.875)
+        self.assertAlmostEqual(timer.phase_totals()['deal'], 0.1)
+        self.assertEqual(timer.report()[0][:4], ('phase_1', 0, 'player', 3))
+
+
+    def test_board_timer(self):
+        ''' Every decision is timed against the player that made it '''
+
+        random.seed(0)
+        timer = PhaseTimer()
+        players = [RandomPlayer(), BayesballPlayer()]
+        board = Board(players, 2, timer=timer)
+        board.play_game()
+
+        phase_1_calls = sum([timer.counts[('phase_1', i, str(p))] for i, p in enumerate(players)])
+        self.assertGreater(phase_1_calls, 0)
+        self.assertEqual(timer.counts[('deal', None, None)], 1)
+
+        # Every phase 1 decision that was not a knock was followed by a phase 2 decision
+        phase_2_calls = sum([timer.counts[('phase_2', i, str(p))] for i, p in enumerate(players)])
+        self.assertLessEqual(phase_2_calls, phase_1_calls)
+
+
+    def test_self_play_timer(self):
+        ''' Players with the same name are timed separately - by their index in the match, as the seats swap '''
+
+        class CountingPlayer(BayesballPlayer):
+            def __init__(self):
+                super(CountingPlayer, self).__init__()
+                self.calls = 0
+
+            def turn_phase_1(self, state, possible_moves=['face_up_card', 'face_down_card', 'knock']):
+                self.calls += 1
+                return super(CountingPlayer, self).turn_phase_1(state, possible_moves)
+
+        random.seed(1)
+        timer = PhaseTimer()
+        players = [CountingPlayer(), CountingPlayer()]
+        Match(players[0], players[1], holes=3, timer=timer).play_match(0)
+
+        self.assertEqual(str(players[0]), str(players[1]))
+        for i, player in enumerate(players):
+            self.assertGreater(player.calls, 0)
+            self.assertEqual(timer.counts[('phase_1', i, str(player))], player.calls)
+
+
+    def test_match_profiling(self):
+        ''' Matches are profiled into one file each, and timers come back from worker processes '''
+
+        profile_dir = tempfile.mkdtemp()
+        try:
+            for processes in (None, 2):
+                timer = PhaseTimer()
+                match = Match(RandomPlayer(), RandomPlayer(), holes=2, timer=timer, profile_dir=profile_dir)
+                match.play_k_matches(3, processes=processes, seed=1)
+
+                self.assertEqual(timer.counts[('deal', None, None)], 6)
+                for i in range(3):
+                    self.assertTrue(os.path.isfile(os.path.join(profile_dir, 'match_{}.prof'.format(i))))
+        finally:
+            shutil.rmtree(profile_dir)
@@ -0,0 +1,91 @@
+''' Tests for batched Monte Carlo rollouts '''
+import copy
+import random
+import unittest2
+import numpy as np
+from golf.board import Board
+from golf.rollout import RolloutEngine
+from golf.batch_board import FACE_DOWN_CARD, KNOCK, RETURN_TO_DECK
+from golf.players.bayesball_player import BayesballPlayer
+
+
+class RecordingPlayer(BayesballPlayer):
+    ''' Bayesball player that keeps a copy of every state it is given '''
+
+    def __init__(self, *args, **kwargs):
+        super(RecordingPlayer, self).__init__(*args, **kwargs)
+        self.phase_1 = []
+        self.phase_2 = []
+
+    def turn_phase_1(self, state, possible_moves):
+        self.phase_1.append(copy.deepcopy(state))
+        return super(RecordingPlayer, self).turn_phase_1(state, possible_moves)
+
+    def turn_phase_2(self, card, state, possible_moves):
+        self.phase_2.append((card, copy.deepcopy(state), possible_moves,))
+        return super(RecordingPlayer, self).turn_phase_2(card, state, possible_moves)
+
+
+class TestRolloutEngine(unittest2.TestCase):
+    ''' Determinizations and rollouts from a Board state '''
+
+    def setUp(self):
+        random.seed(2)
+        self.player = RecordingPlayer()
+        Board([self.player, BayesballPlayer()], 2).play_game()
+        self.state = self.player.phase_1[1]
+        self.engine = RolloutEngine(batch_size=64, seed=0)
+
+
+    def test_determinize(self):
+        ''' The unseen cards fill the hidden places - what the player can see is kept '''
+
+        card, state, possible_moves = self.player.phase_2[1]
+        position = self.engine.determinize(state, card, 20)
+        self.assertEqual(position['hands'].shape, (20, 2, 4))
+
+        for i in range(20):
+            hands = position['hands'][i]
+            cards = hands.flatten().tolist() + position['deck_down'][i, :position['down_len']].tolist() + \
+                    position['deck_up'][:position['up_len']].tolist() + [card]
+            self.assertEqual(sorted(cards), sorted(range(13) * 4))
+
+            for seat, hand in enumerate([state['self'], state['opp'][0]]):
+                for a, b in zip(hand['raw_cards'], hands[seat]):
+                    if a is not None:
+                        self.assertEqual(a, b)
+
+        # The hidden cards differ between determinizations
+        self.assertGreater(len(set([tuple(a) for a in position['hands'][:, 0, 1::2].tolist()])), 1)
+
+
+    def test_evaluate(self):
+        ''' Every action gets the same number of rollouts, and a seeded search repeats '''
+
+        actions = [FACE_DOWN_CARD, KNOCK]
+        sums, counts = self.engine.evaluate(self.state, actions, rollouts=200)
+        self.assertEqual(counts.tolist(), [100, 100])
+        self.assertEqual(self.engine.rollouts, 200)
+        self.assertGreater(self.engine.rollouts_per_second, 0)
+
+        engine = RolloutEngine(batch_size=64, seed=0)
+        self.assertEqual(engine.evaluate(self.state, actions, rollouts=200)[0].tolist(), sums.tolist())
+
+        # A time budget plays at least one full batch
+        sums, counts = self.engine.evaluate(self.state, actions, rollouts=None, time_budget=0)
+        self.assertEqual(counts.tolist(), [64, 64])
+
+        with self.assertRaises(ValueError):
+            self.engine.evaluate(self.state, actions, rollouts=None)
+
+
+    def test_phase_2_rollouts(self):
+        ''' Swapping a king over the worst known card beats returning it '''
+
+        cards = self.state['self']['raw_cards']
+        worst = max([i for i, a in enumerate(cards) if a is not None], key=lambda i: min(cards[i], 10))
+        self.assertGreater(cards[worst], 4)
+        self.assertLess(self.state['known_cards'][0], 4)
+
+        sums, counts = self.engine.evaluate(self.state, [worst, RETURN_TO_DECK], card=0, drew_face_down=True, rollouts=512)
+        self.assertGreater(sums[0] / counts[0], sums[1] / counts[1])
@@ -0,0 +1,66 @@
+''' Tests for the offline solver tables '''
+import shutil
+import tempfile
+import unittest2
+import numpy as np
+from golf import solver
+from golf.hand import Hand
+from golf.players.table_player import TablePlayer
+
+
+class TestSolver(unittest2.TestCase):
+    ''' Test the table layout and the solved values '''
+
+    @classmethod
+    def setUpClass(cls):
+        # Solved once per process and shared with the table player tests
+        cls.tables = TablePlayer().tables
+
+
+    def test_hand_index(self):
+        ''' Hand indices line up with the swap indices and the hand codes '''
+
+        codes = solver._hand_codes()
+        swaps = solver._swap_indices(codes)
+
+        raw_cards = [5, None, 12, 0]
+        index = solver.hand_index(raw_cards)
+        self.assertEqual(codes[index].tolist(), [5, 13, 12, 0])
+        self.assertEqual(swaps[index, 1, 7], solver.hand_index([5, 7, 12, 0]))
+
+
+    def test_rank_distribution(self):
+        for mean in (0.5, 4, 6.5, 9.5):
+            p = solver.rank_distribution(mean)
+            self.assertAlmostEqual(p.sum(), 1)
+            self.assertAlmostEqual(np.dot(p, solver.CARD_VALUES), mean, places=6)
+
+
+    def test_card_bucket(self):
+        self.assertEqual(solver.card_bucket([0] * 13), 6)
+        self.assertEqual(solver.card_bucket([4] * 10 + [0] * 3), 10)
+        self.assertEqual(solver.card_bucket([0] + [4] * 12), 0)
+
+
+    def test_values(self):
+        ''' Known hands are worth their score, and more turns never make a hand worse '''
+
+        values = self.tables['values']
+        for cards in ([1, 2, 3, 4], [5, 5, 12, 0], [10, 11, 3, 3]):
+            self.assertEqual(values[0, 6, solver.hand_index(cards)], Hand(cards).score())
+
+        self.assertTrue((np.diff(values, axis=0) <= 1e-4).all())
+
+
+    def test_save_and_load(self):
+        ''' Saved tables load back memory-mapped '''
+
+        table_dir = tempfile.mkdtemp()
+        try:
+            solver.save_tables(self.tables, table_dir)
+            loaded = solver.load_tables(table_dir)
+            for name in solver.TABLE_NAMES:
+                self.assertIsInstance(loaded[name], np.memmap)
+                self.assertTrue(np.array_equal(loaded[name], self.tables[name]))
+        finally:
+            shutil.rmtree(table_dir)
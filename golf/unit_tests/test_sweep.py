@@ -0,0 +1,99 @@
+''' Tests for hyperparameter sweeps '''
+import os
+import csv
+import shutil
+import tempfile
+import unittest2
+from golf import sweep
+from golf.sweep import Sweep, grid_trials, random_trials
+from mock import patch
+
+
+class TestSweep(unittest2.TestCase):
+    ''' Test the search spaces and successive halving '''
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+
+    def test_grid_trials(self):
+        ''' Every combination of the values '''
+
+        trials = grid_trials({'learning_rate': [0.1, 0.01], 'epsilon': [0.1, 0.2, 0.3]})
+        self.assertEqual(len(trials), 6)
+        self.assertEqual(trials[0], {'learning_rate': 0.1, 'epsilon': 0.1})
+        self.assertEqual(len(set([tuple(sorted(a.items())) for a in trials])), 6)
+
+        with self.assertRaises(ValueError):
+            grid_trials({'learning_rate': {'uniform': [0, 1]}})
+
+
+    def test_random_trials(self):
+        ''' Draws stay in the space and are reproducible from the seed '''
+
+        space = {'learning_rate': {'log_uniform': [1e-6, 1e-3]}, 'epsilon': {'uniform': [0.1, 0.3]}, 'discount': [0.7, 0.9]}
+        trials = random_trials(space, 20, seed=1)
+
+        self.assertEqual(trials, random_trials(space, 20, seed=1))
+        for trial in trials:
+            self.assertTrue(1e-6 <= trial['learning_rate'] <= 1e-3)
+            self.assertTrue(0.1 <= trial['epsilon'] <= 0.3)
+            self.assertIn(trial['discount'], [0.7, 0.9])
+
+
+    @patch('golf.sweep._train_trial')
+    def test_successive_halving(self, train_mock):
+        ''' The best third carry on from their weights each rung, and every evaluation is in the table '''
+
+        def train(args):
+            train_args, weights, first_epoch, epochs = args[2:6]
+            wins = int(train_args['learning_rate'] * 10)
+            return [first_epoch + epochs], [wins, 10 - wins]
+
+        train_mock.side_effect = train
+        trials = grid_trials({'learning_rate': [0.1 * a for a in range(9)]})
+        s = Sweep({'player': 'q_watkins_player.QWatkinsPlayer'}, {'player': 'random_player.RandomPlayer'}, trials,
+                  output_dir=self.output_dir, min_epochs=2, eta=3, rungs=3)
+        rows = s.run()
+
+        self.assertEqual([row['trial'] for row in rows], [8])
+        self.assertEqual(rows[0]['status'], 'final')
+        self.assertEqual(rows[0]['epochs'], 18)
+
+        tasks = [a[0][0] for a in train_mock.call_args_list]
+        self.assertEqual(len(tasks), 9 + 3 + 1)
+        self.assertEqual([task[2]['learning_rate'] for task in tasks[9:12]], [trials[i]['learning_rate'] for i in (6, 7, 8)])
+        self.assertEqual([task[3:6] for task in tasks[9:]], [([2], 2, 4)] * 3 + [([6], 6, 12)])
+        self.assertEqual(tasks[0][2]['checkpoint_dir'], os.path.join(self.output_dir, 'trial_0'))
+
+        with open(s.results_path, 'rb') as infile:
+            table = list(csv.DictReader(infile))
+        self.assertEqual(len(table), 13)
+        self.assertEqual([row['status'] for row in table].count('pruned'), 6 + 2)
+        self.assertEqual(table[-1]['learning_rate'], str(trials[8]['learning_rate']))
+
+
+    def test_run_trials(self):
+        ''' Real trials trained across processes, with a checkpoint from every rung '''
+
+        trials = [{'learning_rate': 0.00001}, {'learning_rate': 0.0001}]
+        s = Sweep({'player': 'q_watkins_player.QWatkinsPlayer'}, {'player': 'random_player.RandomPlayer'}, trials,
+                  train_args={'epsilon': 0.1}, output_dir=self.output_dir, holes=1, min_epochs=1, eta=2, rungs=2,
+                  eval_matches=2)
+        rows = s.run(processes=2)
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(len(s.results), 3)
+        best = rows[0]['trial']
+        self.assertEqual(len(os.listdir(os.path.join(self.output_dir, 'trial_{}'.format(best)))), 2)
+
+        # Seeded trials give the same results whichever process trains them
+        repeat = Sweep(s.player_spec, s.opponent_spec, trials, train_args={'epsilon': 0.1},
+                       output_dir=os.path.join(self.output_dir, 'repeat'), holes=1, min_epochs=1, eta=2, rungs=2,
+                       eval_matches=2)
+        repeat.run()
+        self.assertEqual(repeat.results, s.results)
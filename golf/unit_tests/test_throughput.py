@@ -0,0 +1,54 @@
+''' Tests for the throughput benchmarks '''
+import os
+import shutil
+import tempfile
+import unittest2
+from golf import throughput
+
+
+class TestThroughput(unittest2.TestCase):
+    ''' Test the benchmark suite and the regression comparison '''
+
+    def test_run_suite(self):
+        ''' A very short run should produce a positive rate for every benchmark '''
+
+        results = throughput.run_suite(min_time=0.01, num_epochs=1)
+
+        expected = ['board.hands_per_sec',
+                    'board.snapshots_per_sec',
+                    'board.restores_per_sec',
+                    'board.forks_per_sec',
+                    'board.deepcopies_per_sec',
+                    'bayesball_player.decisions_per_sec',
+                    'bayesball_player.cached_decisions_per_sec',
+                    'q_watkins_player.decisions_per_sec',
+                    'random_player.decisions_per_sec',
+                    'q_watkins_player.updates_per_sec',
+                    'trainer.epochs_per_sec']
+        self.assertEqual(sorted(results.keys()), sorted(expected))
+        for name, value in results.items():
+            self.assertGreater(value, 0, msg=name)
+
+
+    def test_save_and_load_results(self):
+        ''' Results should survive a round trip through the results file '''
+
+        results_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(results_dir, 'results.json')
+            throughput.save_results({'board.hands_per_sec': 1000.0}, path)
+            self.assertEqual(throughput.load_results(path), {'board.hands_per_sec': 1000.0})
+        finally:
+            shutil.rmtree(results_dir)
+
+
+    def test_compare_results(self):
+        ''' Only benchmarks that lost more than the tolerance count as regressions '''
+
+        baseline = {'a': 100.0, 'b': 100.0, 'c': 100.0, 'missing': 10.0}
+        results = {'a': 95.0, 'b': 85.0, 'c': 300.0}
+
+        self.assertEqual(throughput.compare_results(results, baseline, tolerance=0.1), [('b', 100.0, 85.0)])
+        self.assertEqual(throughput.compare_results(results, baseline, tolerance=0.2), [])
+        self.assertEqual(throughput.compare_results(results, baseline, tolerance=0.0),
+                         [('a', 100.0, 95.0), ('b', 100.0, 85.0)])
@@ -0,0 +1,89 @@
+''' Tests for round-robin tournaments and ratings '''
+import os
+import shutil
+import cPickle
+import tempfile
+import unittest2
+import numpy as np
+from golf import tournament
+from golf.tournament import Tournament, bradley_terry, spec_key
+
+
+class TestTournament(unittest2.TestCase):
+    ''' Test scheduling, caching and rating '''
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.cache_dir, 'results.json')
+        self.specs = [{'player': 'random_player.RandomPlayer'},
+                      {'player': 'bayesball_player.BayesballPlayer'},
+                      {'player': 'bayesball_player.BayesballPlayer', 'args': {'init': {'min_distance': 4}}}]
+
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+
+    def test_spec_key(self):
+        ''' Keys change with the args and with the contents of files the args refer to '''
+
+        model_file = os.path.join(self.cache_dir, 'model.pkl')
+        with open(model_file, 'wb') as outfile:
+            cPickle.dump(np.zeros(5), outfile)
+
+        spec = {'player': 'q_watkins_player.QWatkinsPlayer', 'args': {'init': {'model_file': model_file}}}
+        key = spec_key(spec)
+        self.assertEqual(key, spec_key(dict(spec)))
+        self.assertNotEqual(spec_key(self.specs[1]), spec_key(self.specs[2]))
+
+        with open(model_file, 'wb') as outfile:
+            cPickle.dump(np.ones(5), outfile)
+        self.assertNotEqual(key, spec_key(spec))
+
+        self.assertEqual(str(tournament.load_player(spec)), 'Q Watkins Player')
+
+
+    def test_cached_results(self):
+        ''' Only the new player's pairings are played when a player is added '''
+
+        t = Tournament(self.specs[:2], num_matches=3, holes=1, cache_path=self.cache_path)
+        results = t.run()
+        self.assertEqual(t.played, 1)
+        self.assertEqual(sum(results.values()[0]), 3)
+
+        t = Tournament(self.specs, num_matches=3, holes=1, cache_path=self.cache_path)
+        t.run(processes=2)
+        self.assertEqual(t.played, 2)
+        self.assertEqual(len(t.results()), 3)
+        self.assertEqual(len(t.ratings()), 3)
+
+        # Results are the same whichever process plays them
+        uncached = Tournament(self.specs, num_matches=3, holes=1)
+        self.assertEqual(uncached.run(), t.results())
+
+
+    def test_bradley_terry(self):
+        ''' Ratings follow the strengths results were drawn from, and tighten with more games '''
+
+        rng = np.random.RandomState(0)
+        strengths = np.array([1.0, 2.0, 4.0])
+
+        def results(num_games):
+            results = {}
+            for i in range(3):
+                for j in range(i + 1, 3):
+                    wins_i = rng.binomial(num_games, strengths[i] / (strengths[i] + strengths[j]))
+                    results[(i, j)] = (wins_i, num_games - wins_i, 0)
+            return results
+
+        ratings, errors = bradley_terry(3, results(2000))
+        self.assertAlmostEqual(ratings.sum(), 0)
+        self.assertTrue(np.allclose(ratings[1:] - ratings[:-1], 400 * np.log10(2), atol=25))
+
+        few_ratings, few_errors = bradley_terry(3, results(20))
+        self.assertTrue((few_errors > errors).all())
+
+        # Players who won everything still get a finite rating
+        ratings, errors = bradley_terry(2, {(0, 1): (10, 0, 0)})
+        self.assertTrue(np.isfinite(ratings).all())
+        self.assertGreater(ratings[0], ratings[1])
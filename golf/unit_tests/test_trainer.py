@@ -1,9 +1,14 @@
 ''' Tests for Golf training - will include unit and more integration style tests
     as this is the component where much of the logic comes together
 '''
+import os
+import shutil
+import tempfile
 import unittest2
 from golf.trainer import Trainer
 from golf.players.trainable_player_base import TrainablePlayer
+from golf.players.q_watkins_player import QWatkinsPlayer
+from golf.players.random_player import RandomPlayer
 from mock import call, patch, Mock
 
 
@@ -14,6 +19,10 @@ class MockBoard(object):
         self.match_num = match_num
         self.cur_turn = 0
         self.player_scores = player_scores
+        self.resets = []
+
+    def reset(self, players=None, deck=None, player_ids=None):
+        self.resets.append((players, deck,))
 
     def play_game(self):
         scores = [self.player_scores[(self.cur_turn + self.match_num + i) % 2] for i in range(2)]
@@ -76,12 +85,10 @@ class TestTrainer(unittest2.TestCase):
             for i in range(2):
                 self.assertEqual(scores[i], player_scores[i] * num_holes)
 
-            # We want to make sure that we're alternating calls to board
-            calls = [call([self.players[0], self.players[1]],2,verbose=False),
-                     call([self.players[1], self.players[0]],2,verbose=False)] * 5
-            calls = calls[:len(calls)-1]
-
-            board_mock.assert_has_calls(calls)
+            # One board plays every hole - created for the first and then reset with the seats alternating
+            board_mock.assert_called_with([self.players[0], self.players[1]],2,player_ids=[0, 1],verbose=False)
+            resets = [([self.players[1], self.players[0]], None,), ([self.players[0], self.players[1]], None,)] * 4
+            self.assertEqual(board_mock.return_value.resets, resets)
 
         with self.subTest(msg='Test a single match where player 2 goes first'):
             match_num = 1
@@ -90,12 +97,10 @@ class TestTrainer(unittest2.TestCase):
             for i in range(2):
                 self.assertEqual(scores[i], player_scores[i] * num_holes)
 
-            # We want to make sure that we're alternating calls to board
-            calls = [call([self.players[1], self.players[0]],2,verbose=False),
-                     call([self.players[0], self.players[1]],2,verbose=False)] * 5
-            calls = calls[:len(calls)-1]
-
-            board_mock.assert_has_calls(calls)
+            # One board plays every hole - created for the first and then reset with the seats alternating
+            board_mock.assert_called_with([self.players[1], self.players[0]],2,player_ids=[1, 0],verbose=False)
+            resets = [([self.players[0], self.players[1]], None,), ([self.players[1], self.players[0]], None,)] * 4
+            self.assertEqual(board_mock.return_value.resets, resets)
 
 
     def test_train_k_epochs(self):
@@ -165,3 +170,39 @@ class TestTrainer(unittest2.TestCase):
         self.assertEqual([False, True], self.trainer.players[1].calls)
         self.trainer.players[1].save_checkpoint.assert_called_with(10)
         self.assertEqual(self.trainer.eval_results, [[30, 12,]])
+
+
+    @patch('golf.trainer.benchmark_player')
+    def test_sequential_eval(self, benchmark_mock):
+        """ Sequential evaluation is passed on to the benchmark """
+
+        benchmark_mock.return_value = (12,30,)
+        self._setup_players_and_trainer(trainable_index=0,
+                                        trainer_args={'sequential_eval': True})
+        self.trainer.players[0].save_checkpoint = Mock()
+
+        self.trainer.process_checkpoint(10)
+
+        benchmark_mock.assert_called_with(self.trainer.players[0], self.trainer.players[1], sequential=True)
+        self.assertEqual(self.trainer.eval_results, [[12, 30,]])
+
+
+    def test_async_checkpoints(self):
+        """ Checkpoints evaluated in a worker process are saved and collected in order """
+
+        checkpoint_dir = tempfile.mkdtemp()
+        try:
+            player = QWatkinsPlayer()
+            player.setup_trainer(checkpoint_dir=checkpoint_dir)
+            trainer = Trainer(player, RandomPlayer(), trainable_player='player1', holes=1,
+                              checkpoint_epochs=2, async_checkpoints=True)
+
+            trainer.train_k_epochs(4)
+
+            # checkpoints after epochs 2 and 4, and the final one
+            self.assertEqual(len(trainer.eval_results), 3)
+            self.assertEqual(len(os.listdir(checkpoint_dir)), 3)
+            self.assertEqual(trainer._pending_checkpoints, [])
+            self.assertTrue(player.is_trainable)
+        finally:
+            shutil.rmtree(checkpoint_dir)